@@ -19,7 +19,7 @@ def upgrade() -> None:
     bind = op.get_bind()
     session = orm.Session(bind=bind)
     try:
-        upsert_default_vibes(session, commit=True)
+        upsert_default_vibes(session, commit=True, track_catalog=False)
     finally:
         session.close()
 
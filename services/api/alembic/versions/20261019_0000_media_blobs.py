@@ -0,0 +1,41 @@
+"""Content-addressed media blobs with reference counts."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0000"
+down_revision = "20241119_0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "media_blobs",
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.Column("storage_key", sa.String(), nullable=False),
+        sa.Column("url", sa.String(), nullable=False),
+        sa.Column("mime_type", sa.String(), nullable=True),
+        sa.Column("size_bytes", sa.BigInteger(), nullable=False),
+        sa.Column("average_color_hex", sa.String(), nullable=True),
+        sa.Column("ref_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("content_hash"),
+    )
+
+    op.add_column("media", sa.Column("content_hash", sa.String(length=64), nullable=True))
+    op.create_index(
+        "ix_media_content_hash",
+        "media",
+        ["content_hash"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_media_content_hash", table_name="media")
+    op.drop_column("media", "content_hash")
+
+    op.drop_table("media_blobs")
@@ -0,0 +1,39 @@
+"""Resumable media upload sessions."""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0001"
+down_revision = "20261019_0000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "media_upload_sessions",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("content_type", sa.String(), nullable=False),
+        sa.Column("total_bytes", sa.BigInteger(), nullable=False),
+        sa.Column("received_bytes", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("position", sa.SmallInteger(), nullable=False, server_default="0"),
+        sa.Column("event_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("user_profile_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("public_profile_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("media_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("completed_at", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["event_id"], ["event_items.id"]),
+        sa.ForeignKeyConstraint(["media_id"], ["media.id"]),
+        sa.ForeignKeyConstraint(["public_profile_id"], ["public_profiles.id"]),
+        sa.ForeignKeyConstraint(["user_profile_id"], ["public_profiles.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("media_upload_sessions")
@@ -0,0 +1,20 @@
+"""Direct-to-storage (signed URL) media uploads."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0003"
+down_revision = "20261019_0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("media_upload_sessions", sa.Column("storage_key", sa.String(), nullable=True))
+    op.add_column("media_upload_sessions", sa.Column("content_hash", sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("media_upload_sessions", "content_hash")
+    op.drop_column("media_upload_sessions", "storage_key")
@@ -0,0 +1,22 @@
+"""Reverse index on event_vibes for vibe-based event discovery."""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0006"
+down_revision = "20261019_0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_event_vibes_vibe_id_event_id",
+        "event_vibes",
+        ["vibe_id", "event_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_event_vibes_vibe_id_event_id", table_name="event_vibes")
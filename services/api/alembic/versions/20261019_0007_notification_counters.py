@@ -0,0 +1,46 @@
+"""Materialized unread-notification counters."""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0007"
+down_revision = "20261019_0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "notification_counters",
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("unread_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["public_profiles.id"]),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+
+    op.create_index(
+        "ix_user_notifications_unread",
+        "user_notifications",
+        ["user_id", sa.text("timestamp DESC")],
+        unique=False,
+        postgresql_where=sa.text("is_unread"),
+    )
+
+    # Backfill from existing rows so counters are correct from the first request.
+    op.execute(
+        """
+        INSERT INTO notification_counters (user_id, unread_count, updated_at)
+        SELECT user_id, count(*), now() AT TIME ZONE 'utc'
+        FROM user_notifications
+        WHERE is_unread
+        GROUP BY user_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_notifications_unread", table_name="user_notifications")
+    op.drop_table("notification_counters")
@@ -0,0 +1,31 @@
+"""Composite inbox index for keyset-paged notifications."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0008"
+down_revision = "20261019_0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_user_notifications_user_id_timestamp_id",
+        "user_notifications",
+        ["user_id", sa.text("timestamp DESC"), sa.text("id DESC")],
+        unique=False,
+    )
+    # The composite index's leading column makes this one redundant
+    op.drop_index("ix_user_notifications_user_id", table_name="user_notifications")
+
+
+def downgrade() -> None:
+    op.create_index(
+        "ix_user_notifications_user_id",
+        "user_notifications",
+        ["user_id"],
+        unique=False,
+    )
+    op.drop_index("ix_user_notifications_user_id_timestamp_id", table_name="user_notifications")
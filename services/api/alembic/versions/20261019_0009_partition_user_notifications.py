@@ -0,0 +1,162 @@
+"""Partition user_notifications by month and add rollup columns.
+
+Rebuilds the table as a RANGE-partitioned parent (the primary key becomes
+`(id, timestamp)`, as Postgres requires the partition key in it) and copies
+existing rows across. Also settles the metadata column on the name the model
+uses, `metadata`, whichever name the old table had.
+"""
+
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0009"
+down_revision = "20261019_0008"
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+COPIED_COLUMNS = (
+    'id, user_id, type_raw, "timestamp", is_unread, user_name, user_avatar, event_name, '
+    "event_id, event_color, title, subtitle, primary_action, secondary_action, "
+    "created_at, updated_at"
+)
+
+
+def _next_month(value: datetime) -> datetime:
+    return datetime(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def _create_indexes() -> None:
+    op.create_index(
+        "ix_user_notifications_user_id_timestamp_id",
+        "user_notifications",
+        ["user_id", sa.text("timestamp DESC"), sa.text("id DESC")],
+        unique=False,
+    )
+    op.create_index(
+        "ix_user_notifications_unread",
+        "user_notifications",
+        ["user_id", sa.text("timestamp DESC")],
+        unique=False,
+        postgresql_where=sa.text("is_unread"),
+    )
+
+
+def _drop_indexes() -> None:
+    op.drop_index("ix_user_notifications_unread", table_name="user_notifications")
+    op.drop_index("ix_user_notifications_user_id_timestamp_id", table_name="user_notifications")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = {column["name"] for column in sa.inspect(bind).get_columns("user_notifications")}
+    metadata_column = "metadata" if "metadata" in columns else "metadata_json"
+
+    _drop_indexes()
+    op.rename_table("user_notifications", "user_notifications_unpartitioned")
+    op.execute(
+        "ALTER TABLE user_notifications_unpartitioned "
+        "RENAME CONSTRAINT user_notifications_pkey TO user_notifications_unpartitioned_pkey"
+    )
+
+    op.execute(
+        """
+        CREATE TABLE user_notifications (
+            id uuid NOT NULL,
+            user_id uuid NOT NULL REFERENCES public_profiles (id),
+            type_raw smallint NOT NULL,
+            "timestamp" timestamp without time zone NOT NULL,
+            is_unread boolean NOT NULL DEFAULT true,
+            user_name varchar,
+            user_avatar varchar,
+            event_name varchar,
+            event_id uuid REFERENCES event_items (id),
+            event_color varchar,
+            title varchar NOT NULL,
+            subtitle text,
+            metadata text,
+            primary_action varchar,
+            secondary_action varchar,
+            rollup_key varchar,
+            rollup_count integer NOT NULL DEFAULT 1,
+            created_at timestamp without time zone NOT NULL,
+            updated_at timestamp without time zone NOT NULL,
+            PRIMARY KEY (id, "timestamp")
+        ) PARTITION BY RANGE ("timestamp")
+        """
+    )
+
+    oldest = bind.execute(sa.text('SELECT min("timestamp") FROM user_notifications_unpartitioned')).scalar()
+    now = datetime.utcnow()
+    month = datetime((oldest or now).year, (oldest or now).month, 1)
+    last = datetime(now.year, now.month, 1)
+    for _ in range(MONTHS_AHEAD):
+        last = _next_month(last)
+    while month <= last:
+        upper = _next_month(month)
+        op.execute(
+            f"CREATE TABLE user_notifications_p{month:%Y%m} PARTITION OF user_notifications "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{upper:%Y-%m-%d}')"
+        )
+        month = upper
+
+    op.execute(
+        f"INSERT INTO user_notifications ({COPIED_COLUMNS}, metadata) "
+        f"SELECT {COPIED_COLUMNS}, {metadata_column} FROM user_notifications_unpartitioned"
+    )
+    op.drop_table("user_notifications_unpartitioned")
+
+    _create_indexes()
+    op.create_index(
+        "ix_user_notifications_rollup",
+        "user_notifications",
+        ["user_id", "rollup_key"],
+        unique=False,
+        postgresql_where=sa.text("is_unread AND rollup_key IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_notifications_rollup", table_name="user_notifications")
+    _drop_indexes()
+    op.rename_table("user_notifications", "user_notifications_partitioned")
+    op.execute(
+        "ALTER TABLE user_notifications_partitioned "
+        "RENAME CONSTRAINT user_notifications_pkey TO user_notifications_partitioned_pkey"
+    )
+
+    op.execute(
+        """
+        CREATE TABLE user_notifications (
+            id uuid NOT NULL PRIMARY KEY,
+            user_id uuid NOT NULL REFERENCES public_profiles (id),
+            type_raw smallint NOT NULL,
+            "timestamp" timestamp without time zone NOT NULL,
+            is_unread boolean NOT NULL DEFAULT true,
+            user_name varchar,
+            user_avatar varchar,
+            event_name varchar,
+            event_id uuid REFERENCES event_items (id),
+            event_color varchar,
+            title varchar NOT NULL,
+            subtitle text,
+            metadata text,
+            primary_action varchar,
+            secondary_action varchar,
+            created_at timestamp without time zone NOT NULL,
+            updated_at timestamp without time zone NOT NULL
+        )
+        """
+    )
+    op.execute(
+        f"INSERT INTO user_notifications ({COPIED_COLUMNS}, metadata) "
+        f"SELECT {COPIED_COLUMNS}, metadata FROM user_notifications_partitioned"
+    )
+    # Dropping the parent drops every partition with it
+    op.drop_table("user_notifications_partitioned")
+
+    _create_indexes()
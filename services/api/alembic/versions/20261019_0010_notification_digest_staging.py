@@ -0,0 +1,42 @@
+"""Staging table for notification digests."""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0010"
+down_revision = "20261019_0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "notification_digest_staging",
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("digest_key", sa.String(), nullable=False),
+        sa.Column("type_raw", sa.SmallInteger(), nullable=False),
+        sa.Column("event_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("event_name", sa.String(), nullable=True),
+        sa.Column("event_color", sa.String(), nullable=True),
+        sa.Column("user_name", sa.String(), nullable=True),
+        sa.Column("user_avatar", sa.String(), nullable=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("window_start", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["event_id"], ["event_items.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["public_profiles.id"]),
+        sa.PrimaryKeyConstraint("user_id", "digest_key"),
+    )
+    op.create_index(
+        "ix_notification_digest_staging_window_start",
+        "notification_digest_staging",
+        ["window_start"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_notification_digest_staging_window_start", table_name="notification_digest_staging")
+    op.drop_table("notification_digest_staging")
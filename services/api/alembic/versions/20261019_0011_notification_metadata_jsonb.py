@@ -0,0 +1,49 @@
+"""Store notification metadata as JSONB with a GIN index."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0011"
+down_revision = "20261019_0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Databases built from the initial migration named the column
+    # metadata_json while the model has always mapped "metadata".
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("user_notifications")}
+    if "metadata_json" in columns and "metadata" not in columns:
+        op.alter_column("user_notifications", "metadata_json", new_column_name="metadata")
+
+    # Text that isn't valid JSON is kept under a "legacy" key instead of failing the cast.
+    op.execute(
+        """
+        CREATE FUNCTION pg_temp.notification_metadata_jsonb(value text) RETURNS jsonb
+        LANGUAGE plpgsql IMMUTABLE AS $$
+        BEGIN
+            RETURN value::jsonb;
+        EXCEPTION WHEN others THEN
+            RETURN jsonb_build_object('legacy', value);
+        END
+        $$
+        """
+    )
+    op.execute(
+        "ALTER TABLE user_notifications ALTER COLUMN metadata TYPE jsonb "
+        "USING pg_temp.notification_metadata_jsonb(metadata)"
+    )
+    op.create_index(
+        "ix_user_notifications_metadata",
+        "user_notifications",
+        ["metadata"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"metadata": "jsonb_path_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_notifications_metadata", table_name="user_notifications")
+    op.execute("ALTER TABLE user_notifications ALTER COLUMN metadata TYPE text USING metadata::text")
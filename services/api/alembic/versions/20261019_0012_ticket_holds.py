@@ -0,0 +1,42 @@
+"""Time-limited ticket holds."""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0012"
+down_revision = "20261019_0011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("tickets", sa.Column("held", sa.Integer(), nullable=False, server_default="0"))
+
+    op.create_table(
+        "ticket_holds",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("ticket_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("payment_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["payment_id"], ["payments.id"]),
+        sa.ForeignKeyConstraint(["ticket_id"], ["tickets.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["public_profiles.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("payment_id", name="uq_ticket_holds_payment_id"),
+    )
+    op.create_index(
+        "ix_ticket_holds_expires_at",
+        "ticket_holds",
+        ["expires_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ticket_holds_expires_at", table_name="ticket_holds")
+    op.drop_table("ticket_holds")
+    op.drop_column("tickets", "held")
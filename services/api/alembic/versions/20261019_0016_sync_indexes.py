@@ -0,0 +1,21 @@
+"""(updated_at, id) indexes for the delta sync feed."""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0016"
+down_revision = "20261019_0015"
+branch_labels = None
+depends_on = None
+
+TABLES = ("places", "vibes", "event_items", "members", "invites", "media")
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.create_index(f"ix_{table}_updated_at_id", table, ["updated_at", "id"], unique=False)
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_index(f"ix_{table}_updated_at_id", table_name=table)
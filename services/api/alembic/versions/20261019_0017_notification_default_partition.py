@@ -0,0 +1,25 @@
+"""Default partition and last_rolled_up_at for user_notifications.
+
+The default partition catches inserts outside every monthly partition, so
+a stalled partition job no longer makes notification writes fail.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0017"
+down_revision = "20261019_0016"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("user_notifications", sa.Column("last_rolled_up_at", sa.DateTime(), nullable=True))
+    op.execute("CREATE TABLE user_notifications_default PARTITION OF user_notifications DEFAULT")
+
+
+def downgrade() -> None:
+    # Rows in the default partition have nowhere else to go and are dropped with it
+    op.execute("DROP TABLE user_notifications_default")
+    op.drop_column("user_notifications", "last_rolled_up_at")
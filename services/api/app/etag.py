@@ -0,0 +1,113 @@
+"""ETags computed from the exact response bytes, and conditional GET.
+
+Routes opt in with the `conditional_get` dependency (per route or per
+router). For those, `ConditionalGetMiddleware` hashes the body that is
+actually sent with BLAKE2b, adds it as the `ETag`, and turns a matching
+`If-None-Match` into a bodiless 304. A route that already knows its ETag
+(for example one cached next to a pre-serialized body) sets the header
+itself and the middleware uses it instead of hashing.
+"""
+
+from __future__ import annotations
+
+from hashlib import blake2b
+from typing import Optional
+
+from fastapi import Request
+
+STATE_KEY = "conditional_get"
+
+# Dropped from 304s, which carry no body
+_ENTITY_HEADERS = {b"content-length", b"content-type"}
+
+
+def compute_etag(body: bytes) -> str:
+    """Strong ETag for a serialized body."""
+    return '"' + blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an `If-None-Match` header against an ETag (RFC 9110)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def conditional_get(request: Request) -> None:
+    """Dependency marking a route's GET responses for ETag handling."""
+    setattr(request.state, STATE_KEY, True)
+
+
+class ConditionalGetMiddleware:
+    """ASGI middleware applying ETags and 304s to opted-in GET responses.
+
+    Only successful (200) GETs are buffered; everything else streams
+    through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        # Shared with `request.state` in the route, so the opt-in is visible here
+        state = scope.setdefault("state", {})
+        start: Optional[dict] = None
+        passthrough = False
+        chunks: list[bytes] = []
+
+        async def send_with_etag(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                if not state.get(STATE_KEY) or message["status"] != 200:
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(chunks)
+            headers = [(name, value) for name, value in start["headers"] if name.lower() != b"etag"]
+            etag = next(
+                (value.decode("latin-1") for name, value in start["headers"] if name.lower() == b"etag"),
+                None,
+            ) or compute_etag(body)
+            headers.append((b"etag", etag.encode("latin-1")))
+
+            if etag_matches(_header(scope, b"if-none-match"), etag):
+                headers = [(name, value) for name, value in headers if name.lower() not in _ENTITY_HEADERS]
+                await send({"type": "http.response.start", "status": 304, "headers": headers})
+                await send({"type": "http.response.body", "body": b""})
+            else:
+                await send({**start, "headers": headers})
+                await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_with_etag)
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
@@ -0,0 +1,154 @@
+"""`Idempotency-Key` handling for mutating routes.
+
+Routes opt in with the `idempotent` dependency. The first request with a
+key claims it in `idempotency_keys` and runs; `IdempotencyMiddleware`
+stores its response before the last byte goes out. Retries with the same
+key and request replay that response without running the handler, and a
+retry arriving while the first is still running waits for it. Server
+errors are not stored, so the client can retry them. Requests without the
+header are not affected.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from hashlib import blake2b
+from typing import Optional
+from uuid import UUID
+
+from fastapi import Depends, Header, HTTPException, Request
+from fastapi.responses import Response
+
+from .database import SessionLocal
+from .services import idempotency as store
+
+STATE_KEY = "idempotency"
+REPLAYED_HEADER = "Idempotent-Replayed"
+WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+POLL_SECONDS = 0.1
+
+# Not stored with a response; recomputed by the server on replay
+_UNSTORED_HEADERS = {"content-length", "date", "server"}
+
+
+class IdempotentReplay(Exception):
+    """Raised by the dependency to answer with a stored response."""
+
+    def __init__(self, response: store.StoredResponse):
+        self.response = response
+
+
+def get_user_id_from_auth() -> UUID:
+    """Extract user ID from auth token (mock implementation)."""
+    return UUID("00000000-0000-0000-0000-000000000001")
+
+
+def _claim(user_id: UUID, key: str, request_hash: str):
+    with SessionLocal() as db:
+        return store.claim(db, user_id, key, request_hash)
+
+
+def _complete(user_id: UUID, key: str, response: store.StoredResponse) -> None:
+    with SessionLocal() as db:
+        store.complete(db, user_id, key, response)
+
+
+def _release(user_id: UUID, key: str) -> None:
+    with SessionLocal() as db:
+        store.release(db, user_id, key)
+
+
+async def idempotent(
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    user_id: UUID = Depends(get_user_id_from_auth),
+) -> None:
+    """Dependency: run the route once per `Idempotency-Key`, replaying it afterwards."""
+    if not idempotency_key:
+        return
+
+    digest = blake2b(digest_size=16)
+    for part in (request.method, request.url.path, request.url.query):
+        digest.update(part.encode() + b"\0")
+    digest.update(await request.body())
+    request_hash = digest.hexdigest()
+
+    deadline = time.monotonic() + WAIT_SECONDS
+    while True:
+        try:
+            outcome, stored = await asyncio.to_thread(_claim, user_id, idempotency_key, request_hash)
+        except store.IdempotencyConflict:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+        if outcome == store.CLAIMED:
+            setattr(request.state, STATE_KEY, (user_id, idempotency_key))
+            return
+        if outcome == store.COMPLETED:
+            raise IdempotentReplay(stored)
+        if time.monotonic() >= deadline:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+        await asyncio.sleep(POLL_SECONDS)
+
+
+async def replay_stored_response(request: Request, exc: IdempotentReplay) -> Response:
+    """Exception handler turning `IdempotentReplay` into the stored response."""
+    response = Response(content=exc.response.body, status_code=exc.response.status_code)
+    # Raw list rather than a mapping, so repeated headers are replayed unchanged
+    response.raw_headers = [
+        *response.raw_headers,
+        *((name.encode("latin-1"), value.encode("latin-1")) for name, value in exc.response.headers),
+        (REPLAYED_HEADER.lower().encode("latin-1"), b"true"),
+    ]
+    return response
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware storing the responses of requests that claimed a key."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+
+        # Shared with `request.state` in the dependency
+        state = scope.setdefault("state", {})
+        start: Optional[dict] = None
+        chunks: list[bytes] = []
+        finished = False
+
+        async def send_and_store(message):
+            nonlocal start, finished
+            claimed = state.get(STATE_KEY)
+            if claimed is not None and not finished:
+                if message["type"] == "http.response.start":
+                    start = message
+                elif message["type"] == "http.response.body":
+                    chunks.append(message.get("body", b""))
+                    if not message.get("more_body", False):
+                        # Stored before the client sees the end, so its retry finds it
+                        finished = True
+                        await self._finish(claimed, start, b"".join(chunks))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_store)
+        finally:
+            claimed = state.get(STATE_KEY)
+            if claimed is not None and not finished:
+                await asyncio.to_thread(_release, *claimed)
+
+    @staticmethod
+    async def _finish(claimed: tuple[UUID, str], start: dict, body: bytes) -> None:
+        if start["status"] >= 500:
+            await asyncio.to_thread(_release, *claimed)
+            return
+        headers = [
+            (name.decode("latin-1"), value.decode("latin-1"))
+            for name, value in start["headers"]
+            if name.decode("latin-1").lower() not in _UNSTORED_HEADERS
+        ]
+        await asyncio.to_thread(_complete, *claimed, store.StoredResponse(start["status"], headers, body))
@@ -1,6 +1,6 @@
 """SQLAlchemy database models."""
-from sqlalchemy import Column, String, Integer, BigInteger, Boolean, DateTime, ForeignKey, Text, Float, SmallInteger
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Integer, BigInteger, Boolean, DateTime, ForeignKey, Text, Float, SmallInteger, LargeBinary, Index, text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -26,6 +26,9 @@ class PublicProfile(Base):
     sync_status_raw = Column(SmallInteger, default=0, nullable=False)
     last_cloud_synced_at = Column(DateTime, nullable=True)
     schema_version = Column(SmallInteger, default=1, nullable=False)
+    version = Column(Integer, nullable=False)  # bumped on every write; backs the /me ETag
+    
+    __mapper_args__ = {"version_id_col": version}
 
 
 class UserSettings(Base):
@@ -44,8 +47,11 @@ class UserSettings(Base):
     map_max_distance = Column(Float, nullable=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     schema_version = Column(SmallInteger, default=1, nullable=False)
+    version = Column(Integer, nullable=False)  # bumped on every write; backs the /me ETag
     
     user = relationship("PublicProfile", backref="settings")
+    
+    __mapper_args__ = {"version_id_col": version}
 
 
 class UserLogin(Base):
@@ -60,13 +66,20 @@ class UserLogin(Base):
     email_verified_at = Column(DateTime, nullable=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     schema_version = Column(SmallInteger, default=1, nullable=False)
+    version = Column(Integer, nullable=False)  # bumped on every write; backs the /me ETag
     
     user = relationship("PublicProfile", backref="login")
+    
+    __mapper_args__ = {"version_id_col": version}
 
 
 class Place(Base):
     """Place/venue location."""
     __tablename__ = "places"
+    __table_args__ = (
+        # Keyset scans for GET /sync/changes
+        Index("ix_places_updated_at_id", "updated_at", "id"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String, nullable=False)
@@ -92,6 +105,10 @@ class Place(Base):
 class Vibe(Base):
     """Vibe/tag for events."""
     __tablename__ = "vibes"
+    __table_args__ = (
+        # Keyset scans for GET /sync/changes
+        Index("ix_vibes_updated_at_id", "updated_at", "id"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String, nullable=False)
@@ -109,9 +126,23 @@ class Vibe(Base):
     events = relationship("EventItem", secondary="event_vibes", back_populates="vibes")
 
 
+class CatalogVersion(Base):
+    """Version counter for a cached catalog, bumped on every write to it."""
+    __tablename__ = "catalog_versions"
+    
+    name = Column(String, primary_key=True)
+    version = Column(BigInteger, default=0, nullable=False)
+    seed_hash = Column(String(64), nullable=True)  # hash of the last seed list applied
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
 class EventItem(Base):
     """Event."""
     __tablename__ = "event_items"
+    __table_args__ = (
+        # Keyset scans for GET /sync/changes
+        Index("ix_event_items_updated_at_id", "updated_at", "id"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     schedule_status_raw = Column(SmallInteger, default=0, nullable=False)
@@ -147,12 +178,18 @@ event_vibes = Table(
     Base.metadata,
     Column("event_id", UUID(as_uuid=True), ForeignKey("event_items.id"), primary_key=True),
     Column("vibe_id", UUID(as_uuid=True), ForeignKey("vibes.id"), primary_key=True),
+    # Reverse index for "events tagged with vibe X" lookups
+    Index("ix_event_vibes_vibe_id_event_id", "vibe_id", "event_id"),
 )
 
 
 class Member(Base):
     """Event member."""
     __tablename__ = "members"
+    __table_args__ = (
+        # Keyset scans for GET /sync/changes
+        Index("ix_members_updated_at_id", "updated_at", "id"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     role_raw = Column(SmallInteger, default=2, nullable=False)  # 0=host, 1=staff, 2=guest
@@ -175,6 +212,10 @@ class Member(Base):
 class Invite(Base):
     """Event invitation."""
     __tablename__ = "invites"
+    __table_args__ = (
+        # Keyset scans for GET /sync/changes
+        Index("ix_invites_updated_at_id", "updated_at", "id"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("public_profiles.id"), nullable=False)
@@ -197,12 +238,19 @@ class Invite(Base):
 class Media(Base):
     """Media (images/videos) for events or profiles."""
     __tablename__ = "media"
+    __table_args__ = (
+        # Lets the storage GC find soft-deleted rows without scanning live media
+        Index("ix_media_deleted_at", "deleted_at", postgresql_where=text("deleted_at IS NOT NULL")),
+        # Keyset scans for GET /sync/changes
+        Index("ix_media_updated_at_id", "updated_at", "id"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     url = Column(String, nullable=False)
     position = Column(SmallInteger, default=0, nullable=False)
     mime_type = Column(String, nullable=True)
     average_color_hex = Column(String, nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True)  # media_blobs.content_hash
     event_id = Column(UUID(as_uuid=True), ForeignKey("event_items.id"), nullable=True)
     user_profile_id = Column(UUID(as_uuid=True), ForeignKey("public_profiles.id"), nullable=True)
     public_profile_id = Column(UUID(as_uuid=True), ForeignKey("public_profiles.id"), nullable=True)
@@ -218,14 +266,82 @@ class Media(Base):
     public_profile = relationship("PublicProfile", foreign_keys=[public_profile_id], backref="public_media")
 
 
+class MediaBlob(Base):
+    """Content-addressed media blob shared by every Media row with the same bytes."""
+    __tablename__ = "media_blobs"
+    
+    content_hash = Column(String(64), primary_key=True)  # SHA-256 hex digest
+    storage_key = Column(String, nullable=False)
+    url = Column(String, nullable=False)
+    mime_type = Column(String, nullable=True)
+    size_bytes = Column(BigInteger, nullable=False)
+    average_color_hex = Column(String, nullable=True)
+    ref_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class MediaUploadSession(Base):
+    """Media upload in progress: resumable (chunked) or direct-to-storage (signed URL)."""
+    __tablename__ = "media_upload_sessions"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    content_type = Column(String, nullable=False)
+    total_bytes = Column(BigInteger, nullable=False)
+    received_bytes = Column(BigInteger, default=0, nullable=False)
+    position = Column(SmallInteger, default=0, nullable=False)
+    event_id = Column(UUID(as_uuid=True), ForeignKey("event_items.id"), nullable=True)
+    user_profile_id = Column(UUID(as_uuid=True), ForeignKey("public_profiles.id"), nullable=True)
+    public_profile_id = Column(UUID(as_uuid=True), ForeignKey("public_profiles.id"), nullable=True)
+    media_id = Column(UUID(as_uuid=True), ForeignKey("media.id"), nullable=True)
+    storage_key = Column(String, nullable=True)  # set for direct-to-storage uploads
+    content_hash = Column(String(64), nullable=True)  # client-declared SHA-256, if any
+    expires_at = Column(DateTime, nullable=False)
+    completed_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
 class UserNotification(Base):
     """User notification."""
     __tablename__ = "user_notifications"
+    __table_args__ = (
+        # Inbox order; its user_id prefix also serves plain per-user lookups
+        Index(
+            "ix_user_notifications_user_id_timestamp_id",
+            "user_id",
+            text("timestamp DESC"),
+            text("id DESC"),
+        ),
+        # Covers unread lookups and counter reconciliation without touching read rows
+        Index(
+            "ix_user_notifications_unread",
+            "user_id",
+            text("timestamp DESC"),
+            postgresql_where=text("is_unread"),
+        ),
+        # Finds the open rollup row for a repeated notification
+        Index(
+            "ix_user_notifications_rollup",
+            "user_id",
+            "rollup_key",
+            postgresql_where=text("is_unread AND rollup_key IS NOT NULL"),
+        ),
+        # Containment (@>) lookups on metadata, e.g. dedup by invite_id
+        Index(
+            "ix_user_notifications_metadata",
+            "metadata",
+            postgresql_using="gin",
+            postgresql_ops={"metadata": "jsonb_path_ops"},
+        ),
+        # Monthly partitions are created and dropped by services/notification_retention.py
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("public_profiles.id"), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("public_profiles.id"), nullable=False)
     type_raw = Column(SmallInteger, nullable=False)  # NotificationType enum
-    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
+    timestamp = Column(DateTime, default=datetime.utcnow, primary_key=True)  # partition key
     is_unread = Column(Boolean, default=True, nullable=False)
     user_name = Column(String, nullable=True)
     user_avatar = Column(String, nullable=True)
@@ -234,9 +350,13 @@ class UserNotification(Base):
     event_color = Column(String, nullable=True)
     title = Column(String, nullable=False)
     subtitle = Column(Text, nullable=True)
-    metadata_json = Column("metadata", Text, nullable=True)  # JSON string
+    metadata_json = Column("metadata", JSONB, nullable=True)  # NotificationMetadata
     primary_action = Column(String, nullable=True)
     secondary_action = Column(String, nullable=True)
+    rollup_key = Column(String, nullable=True)  # set for types that coalesce while unread
+    rollup_count = Column(Integer, default=1, nullable=False)
+    # Last time a repeat was folded in; `timestamp` stays put since it is the partition key
+    last_rolled_up_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
@@ -244,6 +364,32 @@ class UserNotification(Base):
     event = relationship("EventItem", backref="notifications")
 
 
+class NotificationDigestStaging(Base):
+    """Occurrences buffered by a worker and waiting for their digest window to close."""
+    __tablename__ = "notification_digest_staging"
+    
+    user_id = Column(UUID(as_uuid=True), ForeignKey("public_profiles.id"), primary_key=True)
+    digest_key = Column(String, primary_key=True)  # same format as UserNotification.rollup_key
+    type_raw = Column(SmallInteger, nullable=False)
+    event_id = Column(UUID(as_uuid=True), ForeignKey("event_items.id"), nullable=True)
+    event_name = Column(String, nullable=True)
+    event_color = Column(String, nullable=True)
+    user_name = Column(String, nullable=True)  # latest actor
+    user_avatar = Column(String, nullable=True)
+    count = Column(Integer, nullable=False)
+    window_start = Column(DateTime, nullable=False, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class NotificationCounter(Base):
+    """Materialized unread-notification count per user."""
+    __tablename__ = "notification_counters"
+    
+    user_id = Column(UUID(as_uuid=True), ForeignKey("public_profiles.id"), primary_key=True)
+    unread_count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
 class Ticket(Base):
     """Ticket type for events."""
     __tablename__ = "tickets"
@@ -254,6 +400,7 @@ class Ticket(Base):
     price_cents = Column(BigInteger, nullable=False)
     quantity = Column(Integer, nullable=False)
     sold = Column(Integer, default=0, nullable=False)
+    held = Column(Integer, default=0, nullable=False)  # active TicketHold rows; sold + held <= quantity
     expires_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -270,7 +417,7 @@ class Payment(Base):
     ticket_id = Column(UUID(as_uuid=True), ForeignKey("tickets.id"), nullable=False)
     user_id = Column(UUID(as_uuid=True), ForeignKey("public_profiles.id"), nullable=False)
     stripe_payment_intent_id = Column(String, nullable=True, unique=True, index=True)
-    status = Column(String, nullable=False)  # pending, succeeded, failed, refunded
+    status = Column(String, nullable=False)  # pending, succeeded, failed, refunded, oversold
     amount_cents = Column(BigInteger, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -279,6 +426,59 @@ class Payment(Base):
     user = relationship("PublicProfile", backref="payments")
 
 
+class StripeWebhookEvent(Base):
+    """Verified Stripe webhook event waiting to be (or already) applied."""
+    __tablename__ = "stripe_webhook_events"
+    __table_args__ = (
+        # Oldest pending event per payment intent, for in-order claiming
+        Index(
+            "ix_stripe_webhook_events_pending",
+            "payment_intent_id",
+            "stripe_created",
+            postgresql_where=text("processed_at IS NULL"),
+        ),
+    )
+    
+    event_id = Column(String, primary_key=True)  # Stripe's evt_... ID, for dedup
+    type = Column(String, nullable=False)
+    payment_intent_id = Column(String, nullable=True)
+    payload = Column(JSONB, nullable=False)  # event.data.object
+    stripe_created = Column(DateTime, nullable=False)
+    received_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    processed_at = Column(DateTime, nullable=True)
+
+
+class IdempotencyKey(Base):
+    """Outcome of a request made with an `Idempotency-Key`, replayed on retries."""
+    __tablename__ = "idempotency_keys"
+    
+    user_id = Column(UUID(as_uuid=True), primary_key=True)
+    key = Column(String, primary_key=True)
+    request_hash = Column(String, nullable=False)  # method, path, query and body
+    state = Column(String, nullable=False)  # in_progress, completed
+    locked_until = Column(DateTime, nullable=True)  # in_progress lease; stale leases can be taken over
+    status_code = Column(SmallInteger, nullable=True)
+    response_headers = Column(JSONB, nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class TicketHold(Base):
+    """A ticket reserved for a pending payment until it succeeds, fails or expires."""
+    __tablename__ = "ticket_holds"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    ticket_id = Column(UUID(as_uuid=True), ForeignKey("tickets.id"), nullable=False)
+    payment_id = Column(UUID(as_uuid=True), ForeignKey("payments.id"), nullable=False, unique=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("public_profiles.id"), nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
 
 
 
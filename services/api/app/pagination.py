@@ -0,0 +1,47 @@
+"""Opaque keyset cursors and sync watermarks over `(timestamp, id)` pairs."""
+
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Mapping
+from uuid import UUID
+
+
+def encode_cursor(timestamp: datetime, row_id: UUID) -> str:
+    """Cursor pointing just past the row with this sort key."""
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """Inverse of `encode_cursor`; raises ValueError for anything malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, row_id = raw.split("|")
+        return datetime.fromisoformat(timestamp), UUID(row_id)
+    except ValueError as exc:  # also covers bad base64 and bad UTF-8
+        raise ValueError("Invalid cursor") from exc
+
+
+def encode_watermark(positions: Mapping[str, tuple[datetime, UUID]]) -> str:
+    """Opaque token holding one `(timestamp, id)` position per named stream."""
+    raw = json.dumps(
+        {name: f"{timestamp.isoformat()}|{row_id}" for name, (timestamp, row_id) in sorted(positions.items())},
+        separators=(",", ":"),
+    ).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_watermark(watermark: str) -> dict[str, tuple[datetime, UUID]]:
+    """Inverse of `encode_watermark`; raises ValueError for anything malformed."""
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(watermark + "=" * (-len(watermark) % 4)))
+        positions = {}
+        for name, position in raw.items():
+            timestamp, row_id = position.split("|")
+            positions[name] = (datetime.fromisoformat(timestamp), UUID(row_id))
+        return positions
+    except (ValueError, AttributeError) as exc:  # also bad base64/JSON and non-object payloads
+        raise ValueError("Invalid watermark") from exc
@@ -6,10 +6,13 @@ from uuid import UUID
 from datetime import datetime
 
 from ..database import get_db
+from ..etag import conditional_get
+from ..idempotency import idempotent
 from ..models import EventItem as EventItemModel, Member as MemberModel
 from ..schemas import EventItem, EventItemCreate, EventItemUpdate
+from ..services.vibe_discovery import events_tagged_with, upcoming_event_filter, vibe_event_counts
 
-router = APIRouter(prefix="/events", tags=["events"])
+router = APIRouter(prefix="/events", tags=["events"], dependencies=[Depends(conditional_get)])
 
 
 def get_user_id_from_auth() -> UUID:
@@ -33,6 +36,8 @@ def check_user_can_modify_event(user_id: UUID, event_id: UUID, db: Session) -> b
 async def list_events(
     status: Optional[str] = Query(None, description="Filter by status: upcoming, live, past"),
     user_id: Optional[UUID] = Query(None, description="Filter by user ID (member of)"),
+    vibes: Optional[str] = Query(None, description="Filter by comma-separated vibe slugs"),
+    match: str = Query("any", pattern="^(any|all)$", description="Match any or all of the vibes"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     db: Session = Depends(get_db)
@@ -43,11 +48,7 @@ async def list_events(
     now = datetime.utcnow()
     
     if status == "upcoming":
-        query = query.filter(
-            EventItemModel.start_time > now,
-            EventItemModel.schedule_status_raw != 2,  # not cancelled
-            EventItemModel.schedule_status_raw != 3   # not ended
-        )
+        query = query.filter(*upcoming_event_filter(now))
     elif status == "live":
         query = query.filter(
             EventItemModel.start_time <= now,
@@ -61,6 +62,11 @@ async def list_events(
             (EventItemModel.end_time < now) | (EventItemModel.schedule_status_raw == 3)
         )
     
+    if vibes:
+        slugs = {slug.strip() for slug in vibes.split(",") if slug.strip()}
+        if slugs:
+            query = query.filter(EventItemModel.id.in_(events_tagged_with(slugs, match)))
+    
     if user_id:
         # Filter events where user is a member
         query = query.join(MemberModel).filter(
@@ -85,7 +91,7 @@ async def get_event(event_id: UUID, db: Session = Depends(get_db)):
     return event
 
 
-@router.post("", response_model=EventItem, status_code=201)
+@router.post("", response_model=EventItem, status_code=201, dependencies=[Depends(idempotent)])
 async def create_event(
     event: EventItemCreate,
     db: Session = Depends(get_db),
@@ -173,6 +179,7 @@ async def update_event(
         setattr(event, key, value)
     
     db.commit()
+    vibe_event_counts.invalidate()
     db.refresh(event)
     return event
 
@@ -199,6 +206,7 @@ async def delete_event(
     event.deleted_at = datetime.utcnow()
     event.schedule_status_raw = 2  # cancelled
     db.commit()
+    vibe_event_counts.invalidate()
     return None
 
 
@@ -0,0 +1,308 @@
+"""Current-user router: public profile, settings and login.
+
+Each row carries a `version` that SQLAlchemy bumps on every write, and the
+ETag is derived from it, so answering `If-None-Match` is a one-column
+lookup instead of loading and hashing the resource.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi.responses import Response
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+from typing import Optional
+from uuid import UUID
+from datetime import datetime
+
+from ..database import get_db
+from ..etag import etag_matches
+from ..idempotency import idempotent
+from ..models import (
+    PublicProfile as PublicProfileModel,
+    UserLogin as UserLoginModel,
+    UserSettings as UserSettingsModel,
+)
+
+router = APIRouter(prefix="/me", tags=["me"])
+
+
+# Pydantic models matching iOS DTOs
+class PublicProfileDTO(BaseModel):
+    id: UUID
+    avatarURL: Optional[str] = None
+    username: Optional[str] = None
+    displayName: str
+    bio: Optional[str] = None
+    ageYears: Optional[int] = None
+    gender: Optional[str] = None
+    reputationScore: int = 0
+    isVerified: bool
+    createdAt: datetime
+    updatedAt: datetime
+    deletedAt: Optional[datetime] = None
+    syncStatusRaw: int
+    lastCloudSyncedAt: Optional[datetime] = None
+    schemaVersion: int
+
+class PublicProfileUpdateDTO(BaseModel):
+    username: Optional[str] = None
+    avatarURL: Optional[str] = None
+    displayName: str
+    bio: Optional[str] = None
+    ageYears: Optional[int] = None
+    gender: Optional[str] = None
+    isVerified: bool
+    updatedAt: datetime
+    idempotencyKey: str
+
+class UserSettingsDTO(BaseModel):
+    id: UUID
+    appearanceModeRaw: int
+    mapStyleRaw: int
+    mapCenterLatitude: float
+    mapCenterLongitude: float
+    mapZoomLevel: float
+    mapStartDate: Optional[datetime] = None
+    mapEndDate: Optional[datetime] = None
+    mapMaxDistance: Optional[float] = None
+    updatedAt: datetime
+    schemaVersion: int
+
+class SettingsUpdateDTO(BaseModel):
+    appearanceModeRaw: int
+    mapStyleRaw: int
+    mapCenterLatitude: float
+    mapCenterLongitude: float
+    mapZoomLevel: float
+    mapStartDate: Optional[datetime] = None
+    mapEndDate: Optional[datetime] = None
+    mapMaxDistance: Optional[float] = None
+    updatedAt: datetime
+    idempotencyKey: str
+
+class UserLoginDTO(BaseModel):
+    id: UUID
+    lastLoginAt: Optional[datetime] = None
+    phoneE164Hashed: str
+    phoneVerifiedAt: Optional[datetime] = None
+    emailAddressHashed: Optional[str] = None
+    emailDomain: Optional[str] = None
+    emailVerifiedAt: Optional[datetime] = None
+    updatedAt: datetime
+    schemaVersion: int
+
+
+def get_user_id_from_auth() -> UUID:
+    """Extract user ID from auth token (mock implementation)."""
+    return UUID("00000000-0000-0000-0000-000000000001")
+
+
+def make_etag(kind: str, row_id: UUID, version: int) -> str:
+    """Strong ETag for one stored row at one version."""
+    return f'"{kind}-{row_id}-v{version}"'
+
+
+def _profile_dto(profile: PublicProfileModel) -> PublicProfileDTO:
+    return PublicProfileDTO(
+        id=profile.id,
+        avatarURL=profile.avatar_url,
+        username=profile.username,
+        displayName=profile.display_name,
+        bio=profile.bio,
+        ageYears=profile.age_years,
+        gender=profile.gender,
+        reputationScore=profile.reputation_score,
+        isVerified=profile.is_verified,
+        createdAt=profile.created_at,
+        updatedAt=profile.updated_at,
+        deletedAt=profile.deleted_at,
+        syncStatusRaw=profile.sync_status_raw,
+        lastCloudSyncedAt=profile.last_cloud_synced_at,
+        schemaVersion=profile.schema_version,
+    )
+
+
+def _settings_dto(settings: UserSettingsModel) -> UserSettingsDTO:
+    return UserSettingsDTO(
+        id=settings.user_id,
+        appearanceModeRaw=settings.appearance_mode_raw,
+        mapStyleRaw=settings.map_style_raw,
+        mapCenterLatitude=settings.map_center_latitude,
+        mapCenterLongitude=settings.map_center_longitude,
+        mapZoomLevel=settings.map_zoom_level,
+        mapStartDate=settings.map_start_date,
+        mapEndDate=settings.map_end_date,
+        mapMaxDistance=settings.map_max_distance,
+        updatedAt=settings.updated_at,
+        schemaVersion=settings.schema_version,
+    )
+
+
+def _login_dto(login: UserLoginModel) -> UserLoginDTO:
+    # lastLoginAt and emailDomain are local-only, not synced
+    return UserLoginDTO(
+        id=login.id,
+        lastLoginAt=None,
+        phoneE164Hashed=login.phone_e164_hashed,
+        phoneVerifiedAt=login.phone_verified_at,
+        emailAddressHashed=login.email_address_hashed,
+        emailDomain=None,
+        emailVerifiedAt=login.email_verified_at,
+        updatedAt=login.updated_at,
+        schemaVersion=login.schema_version,
+    )
+
+
+def _conditional_get(db: Session, model, kind: str, owner_column, user_id: UUID, if_none_match: Optional[str], to_dto, not_found: str):
+    """Serve a `/me` resource, answering a matching If-None-Match from its version alone."""
+    if if_none_match:
+        current = db.execute(select(model.id, model.version).where(owner_column == user_id)).first()
+        if current is None:
+            raise HTTPException(status_code=404, detail=not_found)
+        etag = make_etag(kind, current.id, current.version)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+    row = db.query(model).filter(owner_column == user_id).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    return Response(
+        content=to_dto(row).model_dump_json(),
+        media_type="application/json",
+        headers={"ETag": make_etag(kind, row.id, row.version)},
+    )
+
+
+def _save(db: Session, row, kind: str, to_dto) -> Response:
+    """Commit a created or changed row and return it with its new ETag."""
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Resource was modified concurrently; retry")
+    db.refresh(row)
+    return Response(
+        content=to_dto(row).model_dump_json(),
+        media_type="application/json",
+        headers={"ETag": make_etag(kind, row.id, row.version)},
+    )
+
+
+def _require_profile(db: Session, user_id: UUID) -> None:
+    if db.execute(select(PublicProfileModel.id).where(PublicProfileModel.id == user_id)).first() is None:
+        raise HTTPException(status_code=404, detail="Public profile not found")
+
+
+@router.get("/public-profile", response_model=PublicProfileDTO)
+async def get_public_profile(
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    db: Session = Depends(get_db),
+):
+    """Get user public profile with ETag support."""
+    user_id = get_user_id_from_auth()
+    return _conditional_get(
+        db, PublicProfileModel, "profile", PublicProfileModel.id, user_id, if_none_match,
+        _profile_dto, "Public profile not found",
+    )
+
+
+@router.put("/public-profile", response_model=PublicProfileDTO, dependencies=[Depends(idempotent)])
+async def update_public_profile(
+    update: PublicProfileUpdateDTO,
+    idempotency_key: str = Header(..., alias="Idempotency-Key"),
+    db: Session = Depends(get_db),
+):
+    """Create or update user public profile."""
+    user_id = get_user_id_from_auth()
+
+    profile = db.query(PublicProfileModel).filter(PublicProfileModel.id == user_id).first()
+    if profile is None:
+        profile = PublicProfileModel(id=user_id)
+        db.add(profile)
+
+    profile.avatar_url = update.avatarURL
+    profile.username = update.username
+    profile.display_name = update.displayName
+    profile.bio = update.bio
+    profile.age_years = update.ageYears
+    profile.gender = update.gender
+    profile.is_verified = update.isVerified
+    profile.last_cloud_synced_at = datetime.utcnow()
+
+    return _save(db, profile, "profile", _profile_dto)
+
+
+@router.get("/settings", response_model=UserSettingsDTO)
+async def get_settings(
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    db: Session = Depends(get_db),
+):
+    """Get user settings with ETag support."""
+    user_id = get_user_id_from_auth()
+    return _conditional_get(
+        db, UserSettingsModel, "settings", UserSettingsModel.user_id, user_id, if_none_match,
+        _settings_dto, "Settings not found",
+    )
+
+
+@router.put("/settings", response_model=UserSettingsDTO, dependencies=[Depends(idempotent)])
+async def update_settings(
+    update: SettingsUpdateDTO,
+    idempotency_key: str = Header(..., alias="Idempotency-Key"),
+    db: Session = Depends(get_db),
+):
+    """Create or update user settings."""
+    user_id = get_user_id_from_auth()
+
+    settings = db.query(UserSettingsModel).filter(UserSettingsModel.user_id == user_id).first()
+    if settings is None:
+        _require_profile(db, user_id)
+        settings = UserSettingsModel(user_id=user_id)
+        db.add(settings)
+
+    settings.appearance_mode_raw = update.appearanceModeRaw
+    settings.map_style_raw = update.mapStyleRaw
+    settings.map_center_latitude = update.mapCenterLatitude
+    settings.map_center_longitude = update.mapCenterLongitude
+    settings.map_zoom_level = update.mapZoomLevel
+    settings.map_start_date = update.mapStartDate
+    settings.map_end_date = update.mapEndDate
+    settings.map_max_distance = update.mapMaxDistance
+
+    return _save(db, settings, "settings", _settings_dto)
+
+
+@router.get("/login", response_model=UserLoginDTO)
+async def get_login(
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    db: Session = Depends(get_db),
+):
+    """Get user login with ETag support."""
+    user_id = get_user_id_from_auth()
+    return _conditional_get(
+        db, UserLoginModel, "login", UserLoginModel.user_id, user_id, if_none_match,
+        _login_dto, "Login not found",
+    )
+
+
+@router.put("/login", response_model=UserLoginDTO, dependencies=[Depends(idempotent)])
+async def upsert_login(
+    login: UserLoginDTO,
+    idempotency_key: str = Header(..., alias="Idempotency-Key"),
+    db: Session = Depends(get_db),
+):
+    """Upsert user login data (hashed phone/email for contact matching)."""
+    user_id = get_user_id_from_auth()
+
+    row = db.query(UserLoginModel).filter(UserLoginModel.user_id == user_id).first()
+    if row is None:
+        _require_profile(db, user_id)
+        row = UserLoginModel(id=login.id, user_id=user_id)
+        db.add(row)
+
+    row.phone_e164_hashed = login.phoneE164Hashed
+    row.phone_verified_at = login.phoneVerifiedAt
+    row.email_address_hashed = login.emailAddressHashed
+    row.email_verified_at = login.emailVerifiedAt
+
+    return _save(db, row, "login", _login_dto)
@@ -1,46 +1,94 @@
 """Media router."""
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, Query, Request, UploadFile, File, Form
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import BinaryIO, List, Optional
 from uuid import UUID
-from datetime import datetime
-import os
-from google.cloud import storage
+from datetime import datetime, timedelta
+import re
+import tempfile
 
 from ..database import get_db
-from ..models import Media as MediaModel, EventItem as EventItemModel
-from ..schemas import Media, MediaCreate, MediaUpdate
+from ..models import (
+    Media as MediaModel,
+    EventItem as EventItemModel,
+    MediaUploadSession as MediaUploadSessionModel,
+)
+from ..schemas import (
+    Media,
+    MediaCreate,
+    MediaUpdate,
+    MediaUploadSession,
+    MediaUploadSessionCreate,
+    SignedUpload,
+    SignedUploadCreate,
+)
+from ..services.media_blobs import (
+    EXTENSIONS,
+    BlobTooLarge,
+    claim_blob,
+    collect_blob,
+    hash_fileobj,
+    hash_upload,
+    release_blob,
+)
+from ..services.media_storage import (
+    assemble_parts,
+    blob_size,
+    copy_blob,
+    delete_blob,
+    delete_prefix,
+    generate_upload_url,
+    open_blob,
+    parts_prefix,
+    store_blob,
+    store_part,
+    verify_local_upload_signature,
+)
 
 router = APIRouter(prefix="/media", tags=["media"])
 
-# Google Cloud Storage configuration
-GCS_BUCKET_NAME = os.getenv("GCS_BUCKET_NAME", "seshy-media")
-GCS_CLIENT = storage.Client() if os.getenv("GOOGLE_APPLICATION_CREDENTIALS") else None
+ALLOWED_CONTENT_TYPES = ["image/jpeg", "image/png", "image/gif", "image/webp"]
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+MAX_CHUNK_BYTES = 8 * 1024 * 1024
+UPLOAD_SESSION_TTL = timedelta(hours=24)
+SIGNED_UPLOAD_TTL = timedelta(minutes=15)
 
 
-def upload_to_gcs(file_data: bytes, filename: str, content_type: str) -> str:
-    """Upload file to Google Cloud Storage and return public URL."""
-    if not GCS_CLIENT:
-        # Fallback to local storage for development
-        os.makedirs("uploads", exist_ok=True)
-        filepath = f"uploads/{filename}"
-        with open(filepath, "wb") as f:
-            f.write(file_data)
-        return f"http://localhost:8000/uploads/{filename}"
-    
-    bucket = GCS_CLIENT.bucket(GCS_BUCKET_NAME)
-    blob = bucket.blob(filename)
-    blob.upload_from_string(file_data, content_type=content_type)
-    blob.make_public()
-    return blob.public_url
-
-
-def calculate_average_color(file_data: bytes) -> Optional[str]:
+def calculate_average_color(fileobj: BinaryIO) -> Optional[str]:
     """Calculate average color hex from image (simplified - would use PIL in production)."""
     # TODO: Implement actual color calculation using PIL/Pillow
     return None
 
 
+def validate_media_target(
+    event_id: Optional[UUID],
+    user_profile_id: Optional[UUID],
+    public_profile_id: Optional[UUID]
+) -> None:
+    """Validate exactly one relationship is set."""
+    relationship_count = sum([
+        event_id is not None,
+        user_profile_id is not None,
+        public_profile_id is not None
+    ])
+    
+    if relationship_count != 1:
+        raise HTTPException(
+            status_code=400,
+            detail="Exactly one of event_id, user_profile_id, or public_profile_id must be provided"
+        )
+
+
+def validate_content_type(content_type: Optional[str]) -> None:
+    """Validate file type (only images allowed)."""
+    if content_type not in ALLOWED_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File type {content_type} not allowed. Allowed types: {ALLOWED_CONTENT_TYPES}"
+        )
+
+
 @router.get("/events/{event_id}", response_model=List[Media])
 async def list_event_media(event_id: UUID, db: Session = Depends(get_db)):
     """List all media for an event."""
@@ -76,50 +124,36 @@ async def upload_media(
     db: Session = Depends(get_db)
 ):
     """Upload media file."""
-    # Validate exactly one relationship is set
-    relationship_count = sum([
-        event_id is not None,
-        user_profile_id is not None,
-        public_profile_id is not None
-    ])
-    
-    if relationship_count != 1:
-        raise HTTPException(
-            status_code=400,
-            detail="Exactly one of event_id, user_profile_id, or public_profile_id must be provided"
-        )
-    
-    # Validate file type (only images allowed)
-    allowed_types = ["image/jpeg", "image/png", "image/gif", "image/webp"]
-    if file.content_type not in allowed_types:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File type {file.content_type} not allowed. Allowed types: {allowed_types}"
-        )
+    validate_media_target(event_id, user_profile_id, public_profile_id)
+    validate_content_type(file.content_type)
     
-    # Validate file size (10MB max)
-    file_data = await file.read()
-    if len(file_data) > 10 * 1024 * 1024:
+    # Hash while streaming; validates file size (10MB max)
+    try:
+        content_hash, size_bytes = await hash_upload(file, MAX_UPLOAD_BYTES)
+    except BlobTooLarge:
         raise HTTPException(status_code=400, detail="File size exceeds 10MB limit")
     
-    # Generate filename
-    file_ext = os.path.splitext(file.filename)[1] if file.filename else ".bin"
-    filename = f"{UUID().hex}{file_ext}"
+    def average_color() -> Optional[str]:
+        file.file.seek(0)
+        return calculate_average_color(file.file)
     
-    # Upload to storage
-    url = upload_to_gcs(file_data, filename, file.content_type)
-    
-    # Calculate average color (for images)
-    average_color_hex = None
-    if file.content_type and file.content_type.startswith("image/"):
-        average_color_hex = calculate_average_color(file_data)
+    # Identical bytes share one stored blob; duplicates skip the storage write
+    blob = claim_blob(
+        db,
+        content_hash,
+        size_bytes,
+        file.content_type,
+        store=lambda key: store_blob(file.file, key, file.content_type),
+        average_color=average_color,
+    )
     
     # Create media record
     media_data = {
-        "url": url,
+        "url": blob.url,
         "position": position,
         "mime_type": file.content_type,
-        "average_color_hex": average_color_hex,
+        "average_color_hex": blob.average_color_hex,
+        "content_hash": content_hash,
         "event_id": event_id,
         "user_profile_id": user_profile_id,
         "public_profile_id": public_profile_id
@@ -156,7 +190,11 @@ async def update_media(
 
 
 @router.delete("/{media_id}", status_code=204)
-async def delete_media(media_id: UUID, db: Session = Depends(get_db)):
+async def delete_media(
+    media_id: UUID,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
     """Delete media."""
     media = db.query(MediaModel).filter(
         MediaModel.id == media_id,
@@ -166,10 +204,13 @@ async def delete_media(media_id: UUID, db: Session = Depends(get_db)):
     if not media:
         raise HTTPException(status_code=404, detail="Media not found")
     
-    # TODO: Delete file from storage
-    
     media.deleted_at = datetime.utcnow()
+    unreferenced = media.content_hash is not None and release_blob(db, media.content_hash)
     db.commit()
+    
+    # Garbage-collect the stored file once no media row points at it
+    if unreferenced:
+        background_tasks.add_task(collect_blob, media.content_hash)
     return None
 
 
@@ -180,3 +221,317 @@ async def delete_media(media_id: UUID, db: Session = Depends(get_db)):
 
 
 
+
+
+def get_upload_session(upload_id: UUID, db: Session, lock: bool = False) -> MediaUploadSessionModel:
+    """Load an unexpired upload session or raise 404."""
+    query = db.query(MediaUploadSessionModel).filter(MediaUploadSessionModel.id == upload_id)
+    if lock:
+        query = query.with_for_update()
+    session = query.first()
+    
+    if not session or (session.completed_at is None and session.expires_at < datetime.utcnow()):
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    
+    return session
+
+
+def upload_offset_conflict(session: MediaUploadSessionModel) -> JSONResponse:
+    """409 telling the client which byte to resume from."""
+    return JSONResponse(
+        status_code=409,
+        content={
+            "detail": f"Upload offset mismatch; resume from byte {session.received_bytes}",
+            "received_bytes": session.received_bytes,
+        },
+        headers={"Upload-Offset": str(session.received_bytes)},
+    )
+
+
+@router.post("/uploads", response_model=MediaUploadSession, status_code=201)
+async def create_upload_session(
+    upload: MediaUploadSessionCreate,
+    db: Session = Depends(get_db)
+):
+    """Start a resumable upload; chunks are then sent with PUT /media/uploads/{id}."""
+    validate_media_target(upload.event_id, upload.user_profile_id, upload.public_profile_id)
+    validate_content_type(upload.content_type)
+    
+    if upload.total_bytes < 1 or upload.total_bytes > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=400, detail="File size must be between 1 byte and 10MB")
+    
+    session = MediaUploadSessionModel(
+        **upload.model_dump(),
+        expires_at=datetime.utcnow() + UPLOAD_SESSION_TTL
+    )
+    db.add(session)
+    db.commit()
+    db.refresh(session)
+    return session
+
+
+@router.get("/uploads/{upload_id}", response_model=MediaUploadSession)
+async def get_upload_session_status(upload_id: UUID, db: Session = Depends(get_db)):
+    """Get upload progress; `received_bytes` is the offset to resume from."""
+    session = get_upload_session(upload_id, db)
+    return JSONResponse(
+        content=MediaUploadSession.model_validate(session).model_dump(mode="json"),
+        headers={"Upload-Offset": str(session.received_bytes)},
+    )
+
+
+@router.put("/uploads/{upload_id}", response_model=MediaUploadSession)
+async def upload_chunk(
+    upload_id: UUID,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    db: Session = Depends(get_db)
+):
+    """Append the request body to an upload at byte `Upload-Offset`.
+    
+    Chunks must arrive in order; a mismatched offset returns 409 with the
+    offset the server has acknowledged so the client can resume from there.
+    """
+    # Refuse oversized chunks before reading any of the body
+    content_length = request.headers.get("content-length")
+    if content_length is not None:
+        try:
+            declared = int(content_length)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Content-Length")
+        if declared > MAX_CHUNK_BYTES:
+            raise HTTPException(status_code=413, detail="Chunk exceeds 8MB limit")
+
+    # Chunked bodies have no length up front; stop reading once over the limit
+    data = bytearray()
+    async for part in request.stream():
+        data += part
+        if len(data) > MAX_CHUNK_BYTES:
+            raise HTTPException(status_code=413, detail="Chunk exceeds 8MB limit")
+    if not data:
+        raise HTTPException(status_code=400, detail="Chunk body is empty")
+    data = bytes(data)
+
+    # Row lock serializes chunks for this upload while the part is written
+    session = get_upload_session(upload_id, db, lock=True)
+    
+    if session.completed_at is not None:
+        raise HTTPException(status_code=409, detail="Upload is already finalized")
+    
+    if upload_offset != session.received_bytes:
+        return upload_offset_conflict(session)
+    
+    if upload_offset + len(data) > session.total_bytes:
+        raise HTTPException(status_code=400, detail="Chunk exceeds declared upload size")
+    
+    store_part(str(session.id), upload_offset, data)
+    session.received_bytes = upload_offset + len(data)
+    db.commit()
+    db.refresh(session)
+    
+    return JSONResponse(
+        content=MediaUploadSession.model_validate(session).model_dump(mode="json"),
+        headers={"Upload-Offset": str(session.received_bytes)},
+    )
+
+
+@router.post("/uploads/{upload_id}/finalize", response_model=Media, status_code=201)
+async def finalize_upload(
+    upload_id: UUID,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """Assemble an upload's chunks and create its media record."""
+    session = get_upload_session(upload_id, db, lock=True)
+    
+    # Finalizing twice returns the same media (e.g. after a dropped response)
+    if session.media_id is not None:
+        return db.query(MediaModel).filter(MediaModel.id == session.media_id).first()
+    
+    if session.received_bytes != session.total_bytes:
+        return upload_offset_conflict(session)
+    
+    upload_key = str(session.id)
+    try:
+        assembled_key = assemble_parts(upload_key, session.total_bytes)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=f"Upload is incomplete: {e}")
+    with open_blob(assembled_key) as f:
+        content_hash, size_bytes = hash_fileobj(f)
+    
+    def average_color() -> Optional[str]:
+        with open_blob(assembled_key) as f:
+            return calculate_average_color(f)
+    
+    blob = claim_blob(
+        db,
+        content_hash,
+        size_bytes,
+        session.content_type,
+        store=lambda key: copy_blob(assembled_key, key, session.content_type),
+        average_color=average_color,
+    )
+    
+    db_media = MediaModel(
+        url=blob.url,
+        position=session.position,
+        mime_type=session.content_type,
+        average_color_hex=blob.average_color_hex,
+        content_hash=content_hash,
+        event_id=session.event_id,
+        user_profile_id=session.user_profile_id,
+        public_profile_id=session.public_profile_id,
+    )
+    db.add(db_media)
+    db.flush()
+    
+    session.media_id = db_media.id
+    session.completed_at = datetime.utcnow()
+    db.commit()
+    db.refresh(db_media)
+    
+    background_tasks.add_task(delete_prefix, parts_prefix(upload_key))
+    return db_media
+
+
+@router.post("/upload-urls", response_model=SignedUpload, status_code=201)
+async def create_signed_upload(
+    upload: SignedUploadCreate,
+    db: Session = Depends(get_db)
+):
+    """Issue a short-lived signed URL so the client uploads bytes straight to storage.
+    
+    The bytes are always uploaded: a digest alone proves nothing about
+    having the content. If `sha256` is sent, finalize checks the uploaded
+    bytes against it.
+    """
+    validate_media_target(upload.event_id, upload.user_profile_id, upload.public_profile_id)
+    validate_content_type(upload.content_type)
+    
+    if upload.size_bytes < 1 or upload.size_bytes > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=400, detail="File size must be between 1 byte and 10MB")
+    
+    content_hash = upload.sha256.lower() if upload.sha256 else None
+    if content_hash is not None and not re.fullmatch(r"[0-9a-f]{64}", content_hash):
+        raise HTTPException(status_code=400, detail="sha256 must be a hex SHA-256 digest")
+    
+    session = MediaUploadSessionModel(
+        content_type=upload.content_type,
+        total_bytes=upload.size_bytes,
+        position=upload.position,
+        event_id=upload.event_id,
+        user_profile_id=upload.user_profile_id,
+        public_profile_id=upload.public_profile_id,
+        content_hash=content_hash,
+        expires_at=datetime.utcnow() + SIGNED_UPLOAD_TTL
+    )
+    db.add(session)
+    db.flush()
+    
+    session.storage_key = f"direct/{session.id}{EXTENSIONS[upload.content_type]}"
+    upload_url = generate_upload_url(session.storage_key, upload.content_type, SIGNED_UPLOAD_TTL)
+    db.commit()
+    
+    return SignedUpload(
+        upload_id=session.id,
+        upload_required=True,
+        upload_url=upload_url,
+        headers={"Content-Type": upload.content_type},
+        expires_at=session.expires_at,
+    )
+
+
+@router.post("/upload-urls/{upload_id}/finalize", response_model=Media, status_code=201)
+async def finalize_signed_upload(
+    upload_id: UUID,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """Record the media row once the client has uploaded to its signed URL.
+    
+    The uploaded object is hashed here and then deduplicated through the
+    blob index like any other upload, so identical bytes are stored once.
+    """
+    session = get_upload_session(upload_id, db, lock=True)
+    
+    # Finalizing twice returns the same media (e.g. after a dropped response)
+    if session.media_id is not None:
+        return db.query(MediaModel).filter(MediaModel.id == session.media_id).first()
+    
+    if session.storage_key is None:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    
+    size = blob_size(session.storage_key)
+    if size is None:
+        raise HTTPException(status_code=409, detail="File has not been uploaded yet")
+    if size != session.total_bytes:
+        delete_blob(session.storage_key)
+        raise HTTPException(status_code=400, detail="Uploaded file size does not match declared size")
+    
+    with open_blob(session.storage_key) as f:
+        content_hash, size_bytes = hash_fileobj(f)
+    if session.content_hash is not None and content_hash != session.content_hash:
+        delete_blob(session.storage_key)
+        raise HTTPException(status_code=400, detail="Uploaded file does not match declared sha256")
+    
+    def average_color() -> Optional[str]:
+        with open_blob(session.storage_key) as f:
+            return calculate_average_color(f)
+    
+    blob = claim_blob(
+        db,
+        content_hash,
+        size_bytes,
+        session.content_type,
+        store=lambda key: copy_blob(session.storage_key, key, session.content_type),
+        average_color=average_color,
+    )
+    
+    db_media = MediaModel(
+        url=blob.url,
+        position=session.position,
+        mime_type=session.content_type,
+        average_color_hex=blob.average_color_hex,
+        content_hash=content_hash,
+        event_id=session.event_id,
+        user_profile_id=session.user_profile_id,
+        public_profile_id=session.public_profile_id,
+    )
+    db.add(db_media)
+    db.flush()
+    
+    session.media_id = db_media.id
+    session.content_hash = content_hash
+    session.completed_at = datetime.utcnow()
+    session.received_bytes = session.total_bytes
+    db.commit()
+    db.refresh(db_media)
+    
+    # The blob index holds its own copy now
+    background_tasks.add_task(delete_blob, session.storage_key)
+    return db_media
+
+
+@router.put("/direct-uploads/{key:path}", status_code=200)
+async def local_direct_upload(
+    key: str,
+    request: Request,
+    expires: int = Query(...),
+    signature: str = Query(...),
+    content_type: str = Header(..., alias="Content-Type")
+):
+    """Local stand-in for a signed storage URL (only active without GCS credentials)."""
+    if not verify_local_upload_signature(key, content_type, expires, signature):
+        raise HTTPException(status_code=403, detail="Invalid or expired upload signature")
+    
+    with tempfile.SpooledTemporaryFile(max_size=MAX_CHUNK_BYTES) as buffer:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail="File size exceeds 10MB limit")
+            buffer.write(chunk)
+        buffer.seek(0)
+        store_blob(buffer, key, content_type)
+    
+    return {"message": "Upload stored"}
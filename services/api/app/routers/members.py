@@ -8,6 +8,7 @@ from datetime import datetime
 from ..database import get_db
 from ..models import Member as MemberModel, EventItem as EventItemModel
 from ..schemas import Member, MemberCreate, MemberUpdate
+from ..services.notification_digest import notification_digest
 
 router = APIRouter(prefix="/events/{event_id}/members", tags=["members"])
 
@@ -101,6 +102,24 @@ async def create_member(
     db.add(db_member)
     db.commit()
     db.refresh(db_member)
+    
+    if db_member.role_raw == 2:  # guest joins are digested for the hosts
+        host_ids = db.query(MemberModel.user_id).filter(
+            MemberModel.event_id == event_id,
+            MemberModel.role_raw == 0,
+            MemberModel.deleted_at.is_(None)
+        ).all()
+        for (host_id,) in host_ids:
+            notification_digest.add(
+                host_id,
+                10,  # newMemberJoined
+                event_id=event_id,
+                event_name=event.name,
+                event_color=event.brand_color,
+                user_name=db_member.display_name,
+                user_avatar=db_member.avatar_url,
+            )
+    
     return db_member
 
 
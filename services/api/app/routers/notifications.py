@@ -1,16 +1,44 @@
 """Notifications router."""
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import json
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi.responses import Response, StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import tuple_, update
+from sqlalchemy.orm import Session, load_only
 from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
 
 from ..database import get_db
-from ..models import UserNotification as UserNotificationModel
-from ..schemas import UserNotification, UserNotificationCreate, UserNotificationUpdate
+from ..pagination import decode_cursor, encode_cursor
+from ..models import (
+    UserNotification as UserNotificationModel,
+    EventItem as EventItemModel,
+    Member as MemberModel,
+)
+from ..schemas import (
+    NotificationFanOutCreate,
+    UserNotification,
+    UserNotificationCompact,
+    UserNotificationCreate,
+    UserNotificationUpdate,
+)
+from ..services.notification_counters import add_unread, get_unread_count, subtract_unread
+from ..services.notification_fanout import run_fan_out
+from ..services.notification_rollup import record_notification
+from ..services.notification_stream import notification_hub, publish_created
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
+_notification_list = TypeAdapter(List[UserNotification])
+_compact_list = TypeAdapter(List[UserNotificationCompact])
+
+COMPACT_COLUMNS = [
+    getattr(UserNotificationModel, name)
+    for name in UserNotificationCompact.model_fields
+]
+
 
 def get_user_id_from_auth() -> UUID:
     """Extract user ID from auth token (mock implementation)."""
@@ -20,12 +48,22 @@ def get_user_id_from_auth() -> UUID:
 @router.get("", response_model=List[UserNotification])
 async def list_notifications(
     unread_only: bool = False,
+    metadata_contains: Optional[str] = None,
+    cursor: Optional[str] = None,
+    compact: bool = False,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
     user_id: UUID = Depends(get_user_id_from_auth)
 ):
-    """List user notifications."""
+    """List user notifications, newest first.
+    
+    Pass the `X-Next-Cursor` response header back as `cursor` to fetch the
+    next page (`skip` is only honoured without a cursor). `compact=true`
+    returns the inbox projection without subtitle and metadata.
+    `metadata_contains` is a JSON object the metadata must contain, e.g.
+    `{"invite_id": "..."}`.
+    """
     query = db.query(UserNotificationModel).filter(
         UserNotificationModel.user_id == user_id
     )
@@ -33,7 +71,69 @@ async def list_notifications(
     if unread_only:
         query = query.filter(UserNotificationModel.is_unread == True)
     
-    return query.order_by(UserNotificationModel.timestamp.desc()).offset(skip).limit(limit).all()
+    if metadata_contains:
+        try:
+            contains = json.loads(metadata_contains)
+        except ValueError:
+            contains = None
+        if not isinstance(contains, dict):
+            raise HTTPException(status_code=400, detail="metadata_contains must be a JSON object")
+        query = query.filter(UserNotificationModel.metadata_json.contains(contains))
+    
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(
+            tuple_(UserNotificationModel.timestamp, UserNotificationModel.id) < after
+        )
+    elif skip:
+        query = query.offset(skip)
+    
+    if compact:
+        query = query.options(load_only(*COMPACT_COLUMNS))
+    
+    notifications = query.order_by(
+        UserNotificationModel.timestamp.desc(),
+        UserNotificationModel.id.desc()
+    ).limit(limit).all()
+    
+    adapter = _compact_list if compact else _notification_list
+    headers = {}
+    if notifications and len(notifications) == limit:
+        last = notifications[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last.timestamp, last.id)
+    return Response(
+        content=adapter.dump_json(adapter.validate_python(notifications, from_attributes=True)),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+@router.get("/unread-count")
+async def unread_count(
+    db: Session = Depends(get_db),
+    user_id: UUID = Depends(get_user_id_from_auth)
+):
+    """Unread notification count for the app badge."""
+    return {"unread_count": get_unread_count(db, user_id)}
+
+
+@router.get("/stream")
+async def stream_notifications(
+    user_id: UUID = Depends(get_user_id_from_auth)
+):
+    """Push new notifications as Server-Sent Events.
+    
+    Holds no database session. A `resync` event means the client missed
+    notifications and should refetch the list before reconnecting.
+    """
+    return StreamingResponse(
+        notification_hub.stream(user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/{notification_id}", response_model=UserNotification)
@@ -61,6 +161,21 @@ async def mark_notification_read(
     user_id: UUID = Depends(get_user_id_from_auth)
 ):
     """Mark notification as read."""
+    # Only the request that actually flips the flag decrements the counter
+    marked = db.execute(
+        update(UserNotificationModel)
+        .where(
+            UserNotificationModel.id == notification_id,
+            UserNotificationModel.user_id == user_id,
+            UserNotificationModel.is_unread == True
+        )
+        .values(is_unread=False, updated_at=datetime.utcnow())
+        .returning(UserNotificationModel.id)
+    ).scalar()
+    if marked:
+        subtract_unread(db, user_id)
+        db.commit()
+    
     notification = db.query(UserNotificationModel).filter(
         UserNotificationModel.id == notification_id,
         UserNotificationModel.user_id == user_id
@@ -69,9 +184,6 @@ async def mark_notification_read(
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     
-    notification.is_unread = False
-    db.commit()
-    db.refresh(notification)
     return notification
 
 
@@ -81,10 +193,13 @@ async def mark_all_read(
     user_id: UUID = Depends(get_user_id_from_auth)
 ):
     """Mark all notifications as read."""
-    db.query(UserNotificationModel).filter(
+    marked = db.query(UserNotificationModel).filter(
         UserNotificationModel.user_id == user_id,
         UserNotificationModel.is_unread == True
-    ).update({"is_unread": False})
+    ).update({"is_unread": False}, synchronize_session=False)
+    # Subtract what was marked rather than zeroing, so notifications created
+    # concurrently stay counted
+    subtract_unread(db, user_id, marked)
     db.commit()
     return {"message": "All notifications marked as read"}
 
@@ -95,13 +210,59 @@ async def create_notification(
     db: Session = Depends(get_db)
 ):
     """Create a notification (internal use)."""
-    db_notification = UserNotificationModel(**notification.model_dump())
-    db.add(db_notification)
+    values = notification.model_dump(exclude={"metadata"})
+    values["metadata_json"] = (
+        notification.metadata.model_dump(mode="json", exclude_none=True)
+        if notification.metadata else None
+    )
+    db_notification, created = record_notification(db, values)
+    if created:
+        add_unread(db, {db_notification.user_id: 1})
+    publish_created(db, [(db_notification.id, db_notification.user_id)])
     db.commit()
     db.refresh(db_notification)
     return db_notification
 
 
+@router.post("/events/{event_id}/fan-out", status_code=202)
+async def fan_out_event_notification(
+    event_id: UUID,
+    fan_out: NotificationFanOutCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    user_id: UUID = Depends(get_user_id_from_auth)
+):
+    """Notify an event's members (by role) in the background (host/staff only)."""
+    event = db.query(EventItemModel).filter(
+        EventItemModel.id == event_id,
+        EventItemModel.deleted_at.is_(None)
+    ).first()
+    
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    
+    sender = db.query(MemberModel).filter(
+        MemberModel.event_id == event_id,
+        MemberModel.user_id == user_id,
+        MemberModel.deleted_at.is_(None),
+        MemberModel.role_raw.in_([0, 1])  # host or staff
+    ).first()
+    
+    if not sender:
+        raise HTTPException(status_code=403, detail="Only hosts and staff can notify event members")
+    
+    background_tasks.add_task(
+        run_fan_out,
+        event_id,
+        **fan_out.model_dump(mode="json", exclude_none=True),
+        exclude_user_ids=[user_id],
+        user_name=sender.display_name,
+        user_avatar=sender.avatar_url,
+    )
+    
+    return {"message": "Notification fan-out queued"}
+
+
 # Helper function to create notifications for events
 def create_event_notification(
     db: Session,
@@ -115,8 +276,8 @@ def create_event_notification(
     user_name: Optional[str] = None,
     user_avatar: Optional[str] = None
 ):
-    """Helper to create event-related notifications."""
-    notification = UserNotificationModel(
+    """Helper to create event-related notifications (repeats roll up while unread)."""
+    notification, created = record_notification(db, dict(
         user_id=user_id,
         type_raw=type_raw,
         event_id=event_id,
@@ -127,8 +288,10 @@ def create_event_notification(
         user_name=user_name,
         user_avatar=user_avatar,
         is_unread=True
-    )
-    db.add(notification)
+    ))
+    if created:
+        add_unread(db, {user_id: 1})
+    publish_created(db, [(notification.id, user_id)])
     db.commit()
     return notification
 
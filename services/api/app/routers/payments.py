@@ -4,19 +4,20 @@ from sqlalchemy.orm import Session
 from typing import List
 from uuid import UUID
 from datetime import datetime
-import os
+import json
 import stripe
 
 from ..database import get_db
+from ..idempotency import idempotent
 from ..models import Payment as PaymentModel, Ticket as TicketModel, EventItem as EventItemModel
 from ..schemas import Payment, PaymentCreate, PaymentUpdate
+from ..services.stripe_service import STRIPE_WEBHOOK_SECRET, PaymentProviderError, get_stripe_client
+from ..services.stripe_webhooks import HANDLED_TYPES, record_event, webhook_workers
+from ..services.ticket_availability import ticket_availability
+from ..services.ticket_holds import place_hold, release_hold
 
 router = APIRouter(prefix="/payments", tags=["payments"])
 
-# Stripe configuration
-stripe.api_key = os.getenv("STRIPE_SECRET_KEY", "sk_test_...")
-STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "whsec_...")
-
 
 def get_user_id_from_auth() -> UUID:
     """Extract user ID from auth token (mock implementation)."""
@@ -41,7 +42,7 @@ async def get_payment(
     return payment
 
 
-@router.post("/tickets/{ticket_id}/purchase", response_model=Payment, status_code=201)
+@router.post("/tickets/{ticket_id}/purchase", response_model=Payment, status_code=201, dependencies=[Depends(idempotent)])
 async def purchase_ticket(
     ticket_id: UUID,
     db: Session = Depends(get_db),
@@ -53,8 +54,10 @@ async def purchase_ticket(
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
     
-    # Check availability
-    if ticket.sold >= ticket.quantity:
+    # Fast-path availability check from the cache; the hold below is the
+    # authoritative one
+    availability = ticket_availability.get(db, ticket_id)
+    if availability.available <= 0:
         raise HTTPException(status_code=400, detail="Ticket is sold out")
     
     # Check expiration
@@ -69,43 +72,51 @@ async def purchase_ticket(
         status="pending"
     )
     db.add(payment)
+    db.flush()
+    
+    # Reserve the ticket until the payment resolves or the hold expires
+    if place_hold(db, ticket_id, payment.id, user_id) is None:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Ticket is sold out")
+    
     db.commit()
     db.refresh(payment)
     
-    # Create Stripe Payment Intent
+    # Create Stripe Payment Intent (async, keyed by payment so retries are safe)
     try:
-        intent = stripe.PaymentIntent.create(
-            amount=ticket.price_cents,
-            currency="usd",
+        intent = await get_stripe_client().create_payment_intent(
+            ticket.price_cents,
             metadata={
                 "payment_id": str(payment.id),
                 "ticket_id": str(ticket_id),
                 "user_id": str(user_id)
-            }
+            },
+            idempotency_key=f"payment-{payment.id}",
         )
         
-        payment.stripe_payment_intent_id = intent.id
+        payment.stripe_payment_intent_id = intent["id"]
         db.commit()
         db.refresh(payment)
         
         return {
             **payment.__dict__,
-            "client_secret": intent.client_secret
+            "client_secret": intent["client_secret"]
         }
-    except stripe.error.StripeError as e:
+    except PaymentProviderError as e:
         payment.status = "failed"
+        release_hold(db, payment.id)
         db.commit()
         raise HTTPException(status_code=400, detail=f"Stripe error: {str(e)}")
 
 
 @router.post("/webhook")
 async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
-    """Handle Stripe webhook events."""
+    """Verify a Stripe webhook event and queue it for the inbox workers."""
     payload = await request.body()
     sig_header = request.headers.get("stripe-signature")
     
     try:
-        event = stripe.Webhook.construct_event(
+        stripe.Webhook.construct_event(
             payload, sig_header, STRIPE_WEBHOOK_SECRET
         )
     except ValueError:
@@ -113,56 +124,10 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
     except stripe.error.SignatureVerificationError:
         raise HTTPException(status_code=400, detail="Invalid signature")
     
-    # Handle the event
-    if event["type"] == "payment_intent.succeeded":
-        payment_intent = event["data"]["object"]
-        payment_id = payment_intent["metadata"].get("payment_id")
-        
-        if payment_id:
-            payment = db.query(PaymentModel).filter(
-                PaymentModel.id == UUID(payment_id)
-            ).first()
-            
-            if payment and payment.status == "pending":
-                payment.status = "succeeded"
-                
-                # Update ticket sold count
-                ticket = db.query(TicketModel).filter(
-                    TicketModel.id == payment.ticket_id
-                ).first()
-                if ticket:
-                    ticket.sold += 1
-                
-                # Update event capacity if needed
-                event = db.query(EventItemModel).filter(
-                    EventItemModel.id == ticket.event_id
-                ).first()
-                if event and event.max_capacity > 0:
-                    # Ticket purchase counts toward event capacity
-                    pass  # This is handled by member creation
-                
-                db.commit()
-    
-    elif event["type"] == "payment_intent.payment_failed":
-        payment_intent = event["data"]["object"]
-        payment_id = payment_intent["metadata"].get("payment_id")
-        
-        if payment_id:
-            payment = db.query(PaymentModel).filter(
-                PaymentModel.id == UUID(payment_id)
-            ).first()
-            
-            if payment:
-                payment.status = "failed"
-                db.commit()
+    # Store the event (ignoring Stripe retries) and acknowledge right away;
+    # the inbox workers apply it in order per payment intent
+    event = json.loads(payload)
+    if event["type"] in HANDLED_TYPES and record_event(db, event):
+        webhook_workers.wake()
     
     return {"status": "success"}
-
-
-
-
-
-
-
-
-
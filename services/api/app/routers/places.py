@@ -6,10 +6,11 @@ from uuid import UUID
 from math import radians, cos, sin, asin, sqrt
 
 from ..database import get_db
+from ..etag import conditional_get
 from ..models import Place as PlaceModel
 from ..schemas import Place, PlaceCreate, PlaceUpdate
 
-router = APIRouter(prefix="/places", tags=["places"])
+router = APIRouter(prefix="/places", tags=["places"], dependencies=[Depends(conditional_get)])
 
 
 def haversine(lat1, lon1, lat2, lon2):
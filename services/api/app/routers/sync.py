@@ -0,0 +1,48 @@
+"""Delta sync router."""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from uuid import UUID
+
+from ..pagination import decode_watermark
+from ..services.sync_changes import DEFAULT_LIMIT, SYNC_TYPES, stream_changes
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+
+def get_user_id_from_auth() -> UUID:
+    """Extract user ID from auth token (mock implementation)."""
+    return UUID("00000000-0000-0000-0000-000000000001")
+
+
+@router.get("/changes")
+async def list_changes(
+    since: Optional[str] = None,
+    types: Optional[str] = Query(None, description="Comma-separated, e.g. events,members,places"),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=50000, description="Maximum rows per type"),
+    user_id: UUID = Depends(get_user_id_from_auth),
+):
+    """Stream rows changed since a watermark as NDJSON, ending with the next watermark.
+
+    Only rows the caller may see are included (see `sync_changes`).
+    Omit `since` for a full initial sync. Soft-deleted rows are sent as
+    `delete` tombstones. When the last line has `has_more`, call again with
+    its watermark straight away.
+    """
+    if types:
+        requested = [name.strip() for name in types.split(",") if name.strip()]
+        unknown = [name for name in requested if name not in SYNC_TYPES]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown sync types: {', '.join(unknown)}")
+    else:
+        requested = list(SYNC_TYPES)
+
+    try:
+        positions = decode_watermark(since) if since else {}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid since watermark")
+
+    return StreamingResponse(
+        stream_changes(user_id, list(dict.fromkeys(requested)), positions, limit=limit),
+        media_type="application/x-ndjson",
+    )
@@ -1,12 +1,15 @@
 """Tickets router."""
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
 from typing import List
 from uuid import UUID
 
 from ..database import get_db
 from ..models import Ticket as TicketModel, EventItem as EventItemModel, Member as MemberModel
-from ..schemas import Ticket, TicketCreate, TicketUpdate
+from ..schemas import Ticket, TicketAvailability, TicketCreate, TicketTierAvailability, TicketUpdate
+from ..services.ticket_availability import ticket_availability
+from ..services.ticket_inventory import set_quantity
 
 router = APIRouter(prefix="/events/{event_id}/tickets", tags=["tickets"])
 
@@ -37,6 +40,15 @@ async def list_tickets(event_id: UUID, db: Session = Depends(get_db)):
     return tickets
 
 
+@router.get("/availability", response_model=List[TicketTierAvailability])
+async def get_event_availability(event_id: UUID, db: Session = Depends(get_db)):
+    """Unexpired ticket tiers with remaining inventory, from a short-lived cache."""
+    return Response(
+        content=ticket_availability.get_event(db, event_id),
+        media_type="application/json",
+    )
+
+
 @router.get("/{ticket_id}", response_model=Ticket)
 async def get_ticket(
     event_id: UUID,
@@ -55,6 +67,21 @@ async def get_ticket(
     return ticket
 
 
+@router.get("/{ticket_id}/availability", response_model=TicketAvailability)
+async def get_ticket_availability(
+    event_id: UUID,
+    ticket_id: UUID,
+    db: Session = Depends(get_db)
+):
+    """Tickets left to buy (quantity minus sold and held), cached briefly."""
+    availability = ticket_availability.get(db, ticket_id)
+    
+    if not availability or availability.event_id != event_id:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    
+    return availability
+
+
 @router.post("", response_model=Ticket, status_code=201)
 async def create_ticket(
     event_id: UUID,
@@ -91,6 +118,7 @@ async def create_ticket(
     db.add(db_ticket)
     db.commit()
     db.refresh(db_ticket)
+    ticket_availability.invalidate_event(event_id)
     return db_ticket
 
 
@@ -119,19 +147,24 @@ async def update_ticket(
     if ticket_update.price_cents is not None and ticket_update.price_cents < 0:
         raise HTTPException(status_code=400, detail="Price must be >= 0")
     
-    # Validate quantity (can't set below sold count)
-    if ticket_update.quantity is not None:
-        if ticket_update.quantity < ticket.sold:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Cannot set quantity below sold count ({ticket.sold})"
-            )
+    # Validate quantity (can't set below sold count, checked atomically so a
+    # concurrent sale can't slip under it)
+    updates = ticket_update.model_dump(exclude_unset=True)
+    quantity = updates.pop("quantity", None)
+    if quantity is not None and not set_quantity(db, ticket_id, quantity):
+        db.refresh(ticket)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot set quantity below sold count ({ticket.sold})"
+        )
     
-    for key, value in ticket_update.model_dump(exclude_unset=True).items():
+    for key, value in updates.items():
         setattr(ticket, key, value)
     
     db.commit()
     db.refresh(ticket)
+    ticket_availability.invalidate(ticket_id)
+    ticket_availability.invalidate_event(event_id)
     return ticket
 
 
@@ -1,21 +1,27 @@
 """Vibes router."""
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi.responses import Response
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
 import re
 
 from ..database import get_db
+from ..etag import conditional_get, etag_matches
 from ..models import (
     Vibe as VibeModel,
     EventItem as EventItemModel,
     PublicProfile as PublicProfileModel,
     event_vibes,
 )
-from ..schemas import Vibe, VibeCreate, VibeUpdate
+from ..schemas import EventVibesReplace, Vibe, VibeCreate, VibeEventCount, VibeUpdate
+from ..services.vibe_catalog import bump_catalog_version, vibe_catalog
+from ..services.vibe_discovery import vibe_event_counts
 
-router = APIRouter(prefix="/vibes", tags=["vibes"])
+router = APIRouter(prefix="/vibes", tags=["vibes"], dependencies=[Depends(conditional_get)])
 
 MIN_REPUTATION_FOR_CUSTOM_VIBE = 200
 
@@ -37,18 +43,22 @@ def slugify(text: str) -> str:
 async def list_vibes(
     active_only: bool = True,
     system_only: bool = False,
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
     db: Session = Depends(get_db)
 ):
-    """List all vibes."""
-    query = db.query(VibeModel).filter(VibeModel.deleted_at.is_(None))
+    """List all vibes with ETag support (served from the in-memory catalog)."""
+    etag, body = vibe_catalog.get(db, active_only, system_only)
     
-    if active_only:
-        query = query.filter(VibeModel.is_active == True)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
     
-    if system_only:
-        query = query.filter(VibeModel.system_defined == True)
-    
-    return query.all()
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+@router.get("/event-counts", response_model=List[VibeEventCount])
+async def list_vibe_event_counts(db: Session = Depends(get_db)):
+    """Upcoming-event counts per vibe (for the vibe picker)."""
+    return vibe_event_counts.get(db)
 
 
 @router.get("/{vibe_id}", response_model=Vibe)
@@ -104,7 +114,9 @@ async def create_vibe(
         slug=slug
     )
     db.add(db_vibe)
+    bump_catalog_version(db)
     db.commit()
+    vibe_catalog.invalidate()
     db.refresh(db_vibe)
     return db_vibe
 
@@ -142,7 +154,9 @@ async def update_vibe(
     for key, value in vibe_update.model_dump(exclude_unset=True).items():
         setattr(vibe, key, value)
     
+    bump_catalog_version(db)
     db.commit()
+    vibe_catalog.invalidate()
     db.refresh(vibe)
     return vibe
 
@@ -186,10 +200,68 @@ async def add_vibe_to_event(
     stmt = event_vibes.insert().values(event_id=event_id, vibe_id=vibe_id)
     db.execute(stmt)
     db.commit()
+    vibe_event_counts.invalidate()
     
     return {"message": "Vibe added to event"}
 
 
+@router.put("/events/{event_id}/vibes", response_model=List[Vibe])
+async def replace_event_vibes(
+    event_id: UUID,
+    vibe_set: EventVibesReplace,
+    db: Session = Depends(get_db)
+):
+    """Replace an event's full set of vibes in one transaction."""
+    event = db.query(EventItemModel.id).filter(
+        EventItemModel.id == event_id,
+        EventItemModel.deleted_at.is_(None)
+    ).first()
+    
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    
+    # Validate every requested vibe with a single IN query
+    requested = set(vibe_set.vibe_ids)
+    vibes = db.query(VibeModel).filter(
+        VibeModel.id.in_(requested),
+        VibeModel.deleted_at.is_(None),
+        VibeModel.is_active == True
+    ).all() if requested else []
+    
+    missing = requested - {vibe.id for vibe in vibes}
+    if missing:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Vibes not found: {', '.join(sorted(str(vibe_id) for vibe_id in missing))}"
+        )
+    
+    # Apply only the difference from the current set
+    current = set(db.execute(
+        select(event_vibes.c.vibe_id).where(event_vibes.c.event_id == event_id)
+    ).scalars())
+    removed = current - requested
+    added = requested - current
+    
+    if removed:
+        db.execute(delete(event_vibes).where(
+            event_vibes.c.event_id == event_id,
+            event_vibes.c.vibe_id.in_(removed)
+        ))
+    
+    if added:
+        db.execute(
+            insert(event_vibes)
+            .values([{"event_id": event_id, "vibe_id": vibe_id} for vibe_id in added])
+            .on_conflict_do_nothing()
+        )
+    
+    db.commit()
+    if added or removed:
+        vibe_event_counts.invalidate()
+    
+    return vibes
+
+
 @router.delete("/events/{event_id}/vibes/{vibe_id}", status_code=204)
 async def remove_vibe_from_event(
     event_id: UUID,
@@ -205,6 +277,7 @@ async def remove_vibe_from_event(
     )
     result = db.execute(stmt)
     db.commit()
+    vibe_event_counts.invalidate()
     
     if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Vibe is not associated with this event")
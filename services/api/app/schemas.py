@@ -1,6 +1,6 @@
 """Pydantic schemas for request/response models."""
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import AliasChoices, BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
 from uuid import UUID
 
@@ -153,6 +153,17 @@ class Vibe(VibeBase):
         from_attributes = True
 
 
+class EventVibesReplace(BaseModel):
+    vibe_ids: List[UUID]
+
+
+class VibeEventCount(BaseModel):
+    vibe_id: UUID
+    slug: str
+    name: str
+    upcoming_events: int
+
+
 # Event Schemas
 class EventItemBase(BaseModel):
     name: str
@@ -273,6 +284,7 @@ class MediaUpdate(MediaBase):
 
 class Media(MediaBase):
     id: UUID
+    content_hash: Optional[str] = None
     created_at: datetime
     updated_at: datetime
     deleted_at: Optional[datetime] = None
@@ -284,7 +296,60 @@ class Media(MediaBase):
         from_attributes = True
 
 
+class MediaUploadSessionCreate(BaseModel):
+    content_type: str
+    total_bytes: int
+    position: int = 0
+    event_id: Optional[UUID] = None
+    user_profile_id: Optional[UUID] = None
+    public_profile_id: Optional[UUID] = None
+
+
+class MediaUploadSession(MediaUploadSessionCreate):
+    id: UUID
+    received_bytes: int
+    media_id: Optional[UUID] = None
+    expires_at: datetime
+    completed_at: Optional[datetime] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class SignedUploadCreate(BaseModel):
+    content_type: str
+    size_bytes: int
+    sha256: Optional[str] = None
+    position: int = 0
+    event_id: Optional[UUID] = None
+    user_profile_id: Optional[UUID] = None
+    public_profile_id: Optional[UUID] = None
+
+
+class SignedUpload(BaseModel):
+    upload_id: UUID
+    upload_required: bool
+    upload_url: Optional[str] = None
+    method: str = "PUT"
+    headers: dict[str, str] = {}
+    expires_at: datetime
+
+
 # Notification Schemas
+class NotificationMetadata(BaseModel):
+    """Structured references carried by a notification; unknown keys are kept."""
+    invite_id: Optional[UUID] = None
+    member_id: Optional[UUID] = None
+    media_id: Optional[UUID] = None
+    ticket_id: Optional[UUID] = None
+    payment_id: Optional[UUID] = None
+
+    class Config:
+        extra = "allow"
+
+
 class UserNotificationBase(BaseModel):
     type_raw: int
     user_name: Optional[str] = None
@@ -294,7 +359,10 @@ class UserNotificationBase(BaseModel):
     event_color: Optional[str] = None
     title: str
     subtitle: Optional[str] = None
-    metadata: Optional[str] = None
+    # Read from the model's `metadata_json` attribute (`metadata` is SQLAlchemy's)
+    metadata: Optional[NotificationMetadata] = Field(
+        None, validation_alias=AliasChoices("metadata_json", "metadata")
+    )
     primary_action: Optional[str] = None
     secondary_action: Optional[str] = None
 
@@ -303,6 +371,17 @@ class UserNotificationCreate(UserNotificationBase):
     user_id: UUID
 
 
+class NotificationFanOutCreate(BaseModel):
+    type_raw: int
+    title: str
+    subtitle: Optional[str] = None
+    metadata: Optional[NotificationMetadata] = None
+    skip_if_notified: bool = False  # skip members already holding a notification with this type and metadata
+    roles: List[int] = [0, 1, 2]  # 0=host, 1=staff, 2=guest
+    primary_action: Optional[str] = None
+    secondary_action: Optional[str] = None
+
+
 class UserNotificationUpdate(BaseModel):
     is_unread: Optional[bool] = None
 
@@ -312,6 +391,8 @@ class UserNotification(UserNotificationBase):
     user_id: UUID
     timestamp: datetime
     is_unread: bool
+    rollup_count: int = 1
+    last_rolled_up_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
 
@@ -319,6 +400,28 @@ class UserNotification(UserNotificationBase):
         from_attributes = True
 
 
+class UserNotificationCompact(BaseModel):
+    """Inbox list projection without the heavy subtitle and metadata fields."""
+    id: UUID
+    user_id: UUID
+    type_raw: int
+    timestamp: datetime
+    is_unread: bool
+    user_name: Optional[str] = None
+    user_avatar: Optional[str] = None
+    event_name: Optional[str] = None
+    event_id: Optional[UUID] = None
+    event_color: Optional[str] = None
+    title: str
+    primary_action: Optional[str] = None
+    secondary_action: Optional[str] = None
+    rollup_count: int = 1
+    last_rolled_up_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 # Ticket Schemas
 class TicketBase(BaseModel):
     name: str
@@ -339,6 +442,7 @@ class Ticket(TicketBase):
     id: UUID
     event_id: UUID
     sold: int
+    held: int = 0
     created_at: datetime
     updated_at: datetime
 
@@ -346,6 +450,21 @@ class Ticket(TicketBase):
         from_attributes = True
 
 
+class TicketAvailability(BaseModel):
+    ticket_id: UUID
+    event_id: UUID
+    quantity: int
+    sold: int
+    held: int
+    available: int
+
+
+class TicketTierAvailability(TicketAvailability):
+    name: str
+    price_cents: int
+    expires_at: Optional[datetime] = None
+
+
 # Payment Schemas
 class PaymentBase(BaseModel):
     ticket_id: UUID
@@ -0,0 +1,127 @@
+"""In-memory stand-in for the Stripe endpoints used by `stripe_service`.
+
+Run it with `python -m app.services.fake_payment_provider` and set
+`STRIPE_API_BASE=http://localhost:12111` to exercise purchases, retries and
+reconciliation locally. `FAKE_PROVIDER_LATENCY_MS` adds a delay per request
+and `FAKE_PROVIDER_FAILURE_RATE` makes that fraction of requests return 503.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import uuid
+from typing import Any
+
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+LATENCY_SECONDS = float(os.getenv("FAKE_PROVIDER_LATENCY_MS", "0")) / 1000
+FAILURE_RATE = float(os.getenv("FAKE_PROVIDER_FAILURE_RATE", "0"))
+PORT = int(os.getenv("FAKE_PROVIDER_PORT", "12111"))
+
+app = FastAPI(title="Fake payment provider")
+
+intents: dict[str, dict[str, Any]] = {}
+refunds: dict[str, dict[str, Any]] = {}
+idempotent_responses: dict[str, dict[str, Any]] = {}
+
+
+def _unform(form) -> dict[str, Any]:
+    """Inverse of Stripe's `key[sub]=value` encoding (one level deep)."""
+    params: dict[str, Any] = {}
+    for key, value in form.items():
+        if "[" in key:
+            outer, inner = key[:-1].split("[", 1)
+            params.setdefault(outer, {})[inner] = value
+        else:
+            params[key] = value
+    return params
+
+
+@app.middleware("http")
+async def simulate_network(request: Request, call_next):
+    if LATENCY_SECONDS:
+        await asyncio.sleep(LATENCY_SECONDS)
+    if FAILURE_RATE and random.random() < FAILURE_RATE:
+        return JSONResponse({"error": {"message": "Simulated outage"}}, status_code=503)
+    return await call_next(request)
+
+
+def _get_intent(intent_id: str) -> dict[str, Any]:
+    intent = intents.get(intent_id)
+    if intent is None:
+        raise HTTPException(status_code=404, detail={"message": f"No such payment_intent: {intent_id}"})
+    return intent
+
+
+@app.post("/v1/payment_intents")
+async def create_payment_intent(request: Request, idempotency_key: str = Header(None)):
+    if idempotency_key and idempotency_key in idempotent_responses:
+        return idempotent_responses[idempotency_key]
+    params = _unform(await request.form())
+    intent_id = f"pi_{uuid.uuid4().hex[:24]}"
+    intent = {
+        "id": intent_id,
+        "object": "payment_intent",
+        "amount": int(params["amount"]),
+        "currency": params.get("currency", "usd"),
+        "metadata": params.get("metadata", {}),
+        "status": "requires_payment_method",
+        "client_secret": f"{intent_id}_secret_{uuid.uuid4().hex[:12]}",
+        "latest_charge": None,
+    }
+    intents[intent_id] = intent
+    if idempotency_key:
+        idempotent_responses[idempotency_key] = intent
+    return intent
+
+
+@app.get("/v1/payment_intents/{intent_id}")
+async def get_payment_intent(intent_id: str):
+    return _get_intent(intent_id)
+
+
+@app.post("/v1/payment_intents/{intent_id}/confirm")
+async def confirm_payment_intent(intent_id: str):
+    """Settle an intent; amounts ending in 13 cents fail, like a declined card."""
+    intent = _get_intent(intent_id)
+    if intent["amount"] % 100 == 13:
+        intent["status"] = "requires_payment_method"
+        intent["last_payment_error"] = {"message": "Your card was declined."}
+    else:
+        intent["status"] = "succeeded"
+        intent["latest_charge"] = f"ch_{uuid.uuid4().hex[:24]}"
+    return intent
+
+
+@app.post("/v1/payment_intents/{intent_id}/cancel")
+async def cancel_payment_intent(intent_id: str):
+    intent = _get_intent(intent_id)
+    intent["status"] = "canceled"
+    return intent
+
+
+@app.post("/v1/refunds")
+async def create_refund(request: Request, idempotency_key: str = Header(None)):
+    if idempotency_key and idempotency_key in idempotent_responses:
+        return idempotent_responses[idempotency_key]
+    params = _unform(await request.form())
+    refund = {
+        "id": f"re_{uuid.uuid4().hex[:24]}",
+        "object": "refund",
+        "charge": params["charge"],
+        "amount": int(params["amount"]) if "amount" in params else None,
+        "status": "succeeded",
+    }
+    refunds[refund["id"]] = refund
+    if idempotency_key:
+        idempotent_responses[idempotency_key] = refund
+    return refund
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="127.0.0.1", port=PORT)
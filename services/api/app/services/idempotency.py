@@ -0,0 +1,224 @@
+"""Durable store behind `Idempotency-Key` handling.
+
+The first request with a key claims it by inserting an `in_progress` row
+with a short lease; its response is stored on the row when it finishes and
+replayed for retries until the key expires. A key whose lease ran out (the
+process handling it died) can be claimed again.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import and_, delete, func, or_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+TTL = timedelta(hours=float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24")))
+LEASE = timedelta(seconds=float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "60")))
+CLEANUP_INTERVAL_SECONDS = float(os.getenv("IDEMPOTENCY_CLEANUP_SECONDS", "3600"))
+DEFAULT_BATCH_SIZE = 5000
+
+CLAIMED = "claimed"
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used for a different request."""
+
+
+@dataclass
+class StoredResponse:
+    status_code: int
+    headers: list[tuple[str, str]]  # in order, repeats kept (Set-Cookie, Vary, Link)
+    body: bytes
+
+
+def _claim_values(request_hash: str, now: datetime) -> dict:
+    return {
+        "request_hash": request_hash,
+        "state": IN_PROGRESS,
+        "locked_until": now + LEASE,
+        "status_code": None,
+        "response_headers": None,
+        "response_body": None,
+        "created_at": now,
+        "expires_at": now + TTL,
+    }
+
+
+def claim(db: Session, user_id: UUID, key: str, request_hash: str) -> tuple[str, Optional[StoredResponse]]:
+    """Try to become the request that executes under `key`.
+
+    Returns `(CLAIMED, None)` if the caller should run the handler,
+    `(COMPLETED, response)` if it should replay, or `(IN_PROGRESS, None)` if
+    another request holds the key. Raises `IdempotencyConflict` when the key
+    was used with a different request.
+    """
+    result = _try_claim(db, user_id, key, request_hash)
+    db.commit()
+    return result
+
+
+def _try_claim(db: Session, user_id: UUID, key: str, request_hash: str) -> tuple[str, Optional[StoredResponse]]:
+    now = datetime.utcnow()
+    pk = and_(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+    stmt = (
+        insert(IdempotencyKey)
+        .values(user_id=user_id, key=key, **_claim_values(request_hash, now))
+        .on_conflict_do_nothing(index_elements=[IdempotencyKey.user_id, IdempotencyKey.key])
+        .returning(IdempotencyKey.key)
+    )
+    if db.execute(stmt).scalar() is not None:
+        return CLAIMED, None
+
+    # Expired keys are free for anyone; an abandoned claim only for the same request
+    taken = db.execute(
+        update(IdempotencyKey)
+        .where(
+            pk,
+            or_(
+                IdempotencyKey.expires_at < now,
+                and_(
+                    IdempotencyKey.state == IN_PROGRESS,
+                    IdempotencyKey.locked_until < now,
+                    IdempotencyKey.request_hash == request_hash,
+                ),
+            ),
+        )
+        .values(**_claim_values(request_hash, now))
+        .returning(IdempotencyKey.key)
+    ).scalar()
+    if taken is not None:
+        return CLAIMED, None
+
+    row = db.execute(select(IdempotencyKey).where(pk)).scalars().first()
+    if row is None:
+        # Purged between statements; the next poll claims it
+        return IN_PROGRESS, None
+    if row.request_hash != request_hash:
+        raise IdempotencyConflict(key)
+    if row.state == COMPLETED:
+        headers = row.response_headers or []
+        if isinstance(headers, dict):
+            # Stored before headers were kept as a list
+            headers = headers.items()
+        return COMPLETED, StoredResponse(
+            row.status_code, [(name, value) for name, value in headers], row.response_body or b""
+        )
+    return IN_PROGRESS, None
+
+
+def complete(db: Session, user_id: UUID, key: str, response: StoredResponse) -> None:
+    """Store the response of a claimed request for replay."""
+    now = datetime.utcnow()
+    db.execute(
+        update(IdempotencyKey)
+        .where(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key,
+            IdempotencyKey.state == IN_PROGRESS,
+        )
+        .values(
+            state=COMPLETED,
+            locked_until=None,
+            status_code=response.status_code,
+            response_headers=response.headers,
+            response_body=response.body,
+            expires_at=now + TTL,
+        )
+    )
+    db.commit()
+
+
+def release(db: Session, user_id: UUID, key: str) -> None:
+    """Give up a claim without storing anything, so a retry runs again."""
+    db.execute(
+        delete(IdempotencyKey).where(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key,
+            IdempotencyKey.state == IN_PROGRESS,
+        )
+    )
+    db.commit()
+
+
+def purge_expired_keys(
+    db: Session,
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    dry_run: bool = False,
+) -> dict[str, float]:
+    """Delete expired keys in committed batches and return progress metrics."""
+    started = time.monotonic()
+    now = datetime.utcnow()
+    summary: dict[str, float] = {"rows_deleted": 0}
+
+    if dry_run:
+        summary["rows_deleted"] = db.execute(
+            select(func.count()).select_from(IdempotencyKey).where(IdempotencyKey.expires_at < now)
+        ).scalar()
+    else:
+        while True:
+            expired = (
+                select(IdempotencyKey.user_id, IdempotencyKey.key)
+                .where(IdempotencyKey.expires_at < now)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            deleted = db.execute(
+                delete(IdempotencyKey)
+                .where(tuple_(IdempotencyKey.user_id, IdempotencyKey.key).in_(expired))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+            summary["rows_deleted"] += deleted
+            if deleted < batch_size:
+                break
+        logger.info("idempotency cleanup: deleted %d expired keys", summary["rows_deleted"])
+
+    elapsed = time.monotonic() - started
+    summary["elapsed_seconds"] = round(elapsed, 3)
+    summary["rows_per_second"] = round(summary["rows_deleted"] / elapsed, 1) if elapsed else 0.0
+    return summary
+
+
+def cleanup_job() -> dict[str, float]:
+    """Periodic-job entry point."""
+    with SessionLocal() as session:
+        return purge_expired_keys(session)
+
+
+def run_cli() -> None:
+    """CLI entry point used by scripts/Makefile."""
+    parser = argparse.ArgumentParser(description="Delete expired idempotency keys.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="Count expired keys without deleting")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with SessionLocal() as session:
+        summary = purge_expired_keys(session, batch_size=args.batch_size, dry_run=args.dry_run)
+    print(
+        ("Idempotency key cleanup dry run " if args.dry_run else "Idempotency key cleanup finished ")
+        + "("
+        + ", ".join(f"{key}={value}" for key, value in summary.items())
+        + ")"
+    )
+
+
+if __name__ == "__main__":
+    run_cli()
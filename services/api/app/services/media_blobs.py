@@ -0,0 +1,147 @@
+"""Content-addressed media blobs with a reference-counted index."""
+
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime
+from typing import BinaryIO, Callable, Optional
+
+from fastapi import UploadFile
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models import MediaBlob
+from .media_storage import delete_blob
+
+CHUNK_SIZE = 1024 * 1024
+
+# File extensions for stored blobs, keyed by the validated upload content type.
+EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+}
+
+
+class BlobTooLarge(Exception):
+    """Raised when an upload exceeds the allowed size while it is being hashed."""
+
+
+async def hash_upload(file: UploadFile, max_bytes: int) -> tuple[str, int]:
+    """Stream an upload in chunks, returning its SHA-256 hex digest and size.
+
+    The file is rewound afterwards so it can be handed to storage unchanged.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise BlobTooLarge()
+        digest.update(chunk)
+    await file.seek(0)
+    return digest.hexdigest(), size
+
+
+def hash_fileobj(fileobj: BinaryIO) -> tuple[str, int]:
+    """Hash a readable file object in chunks, returning its SHA-256 hex digest and size."""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""):
+        size += len(chunk)
+        digest.update(chunk)
+    return digest.hexdigest(), size
+
+
+def storage_key_for(content_hash: str, content_type: Optional[str]) -> str:
+    """Storage key for a blob; identical bytes always map to the same object."""
+    return f"blobs/{content_hash}{EXTENSIONS.get(content_type or '', '.bin')}"
+
+
+def claim_blob(
+    db: Session,
+    content_hash: str,
+    size_bytes: int,
+    content_type: Optional[str],
+    store: Callable[[str], str],
+    average_color: Optional[Callable[[], Optional[str]]] = None,
+) -> MediaBlob:
+    """Take a reference on the blob for `content_hash`, storing the bytes only if new.
+
+    `store` writes the bytes under the given storage key and returns the public
+    URL. Duplicate uploads only bump the reference count; the storage write (and
+    any image analysis) happens once per distinct content hash. The caller commits.
+    """
+    existing = db.execute(
+        update(MediaBlob)
+        .where(MediaBlob.content_hash == content_hash)
+        .values(ref_count=MediaBlob.ref_count + 1, updated_at=datetime.utcnow())
+        .returning(MediaBlob)
+    ).scalars().first()
+    if existing:
+        return existing
+
+    key = storage_key_for(content_hash, content_type)
+    url = store(key)
+    color = average_color() if average_color is not None else None
+
+    # Concurrent first uploads of the same bytes race to here; both wrote the
+    # same object, and the conflict clause keeps the count correct.
+    now = datetime.utcnow()
+    stmt = insert(MediaBlob).values(
+        content_hash=content_hash,
+        storage_key=key,
+        url=url,
+        mime_type=content_type,
+        size_bytes=size_bytes,
+        average_color_hex=color,
+        ref_count=1,
+        created_at=now,
+        updated_at=now,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MediaBlob.content_hash],
+        set_={"ref_count": MediaBlob.ref_count + 1, "updated_at": now},
+    ).returning(MediaBlob)
+    return db.execute(stmt).scalars().one()
+
+
+def release_blob(db: Session, content_hash: str) -> bool:
+    """Drop one reference; returns True when the blob is no longer referenced.
+
+    The caller commits, then schedules `collect_blob` for unreferenced blobs.
+    """
+    remaining = db.execute(
+        update(MediaBlob)
+        .where(MediaBlob.content_hash == content_hash, MediaBlob.ref_count > 0)
+        .values(ref_count=MediaBlob.ref_count - 1, updated_at=datetime.utcnow())
+        .returning(MediaBlob.ref_count)
+    ).scalar()
+    return remaining == 0
+
+
+def collect_blob(content_hash: str) -> bool:
+    """Delete an unreferenced blob from storage and the index (background task).
+
+    The index row stays locked while the object is deleted, so a concurrent
+    upload of the same bytes waits and then re-creates the object.
+    """
+    with SessionLocal() as db:
+        blob = (
+            db.query(MediaBlob)
+            .filter(MediaBlob.content_hash == content_hash, MediaBlob.ref_count == 0)
+            .with_for_update()
+            .first()
+        )
+        if not blob:
+            return False
+        delete_blob(blob.storage_key)
+        db.delete(blob)
+        db.commit()
+        return True
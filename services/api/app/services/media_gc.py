@@ -0,0 +1,290 @@
+"""Garbage collection for soft-deleted media and unreferenced storage objects."""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models import Media, MediaBlob, MediaUploadSession
+from .media_blobs import collect_blob
+from .media_storage import delete_blob, delete_prefix, key_from_url, parts_prefix
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GRACE_PERIOD = timedelta(days=7)
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_CONCURRENCY = 8
+
+# Objects under this prefix belong to the reference-counted blob index and are
+# only ever removed through `collect_blob`.
+CONTENT_ADDRESSED_PREFIX = "blobs/"
+
+
+def _delete_keys(keys: list[str], concurrency: int) -> set[str]:
+    """Delete storage objects in parallel; returns the keys that failed."""
+    failed = set()
+
+    def delete_one(key: str) -> Optional[str]:
+        try:
+            delete_blob(key)
+        except Exception:
+            logger.exception("media gc: failed to delete %s", key)
+            return key
+        return None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for key in pool.map(delete_one, keys):
+            if key is not None:
+                failed.add(key)
+    return failed
+
+
+def sweep_deleted_media(
+    db: Session,
+    *,
+    grace_period: timedelta = DEFAULT_GRACE_PERIOD,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    dry_run: bool = False,
+) -> dict[str, int]:
+    """Hard-delete media soft-deleted longer than `grace_period` ago.
+
+    Rows are walked in `(deleted_at, id)` order one batch at a time, and each
+    batch is committed separately. Content-addressed rows already released
+    their blob reference when they were soft-deleted, so only legacy rows
+    (stored under their own key) have objects deleted here. A row whose
+    object fails to delete is kept for the next run.
+    """
+    cutoff = datetime.utcnow() - grace_period
+    summary = {"scanned": 0, "rows_deleted": 0, "blobs_deleted": 0, "blob_failures": 0}
+    last: Optional[tuple[datetime, object]] = None
+
+    while True:
+        query = (
+            select(Media.id, Media.deleted_at, Media.url, Media.content_hash)
+            .where(Media.deleted_at.is_not(None), Media.deleted_at < cutoff)
+            .order_by(Media.deleted_at, Media.id)
+            .limit(batch_size)
+        )
+        if last is not None:
+            query = query.where(tuple_(Media.deleted_at, Media.id) > last)
+        rows = db.execute(query).all()
+        if not rows:
+            break
+        last = (rows[-1].deleted_at, rows[-1].id)
+        summary["scanned"] += len(rows)
+
+        keys_by_id = {}
+        for row in rows:
+            key = None if row.content_hash else key_from_url(row.url)
+            if key and not key.startswith(CONTENT_ADDRESSED_PREFIX):
+                keys_by_id[row.id] = key
+
+        if dry_run:
+            summary["rows_deleted"] += len(rows)
+            summary["blobs_deleted"] += len(keys_by_id)
+            continue
+
+        failed = _delete_keys(sorted(set(keys_by_id.values())), concurrency)
+        summary["blobs_deleted"] += len(set(keys_by_id.values()) - failed)
+        summary["blob_failures"] += len(failed)
+
+        ids = [row.id for row in rows if keys_by_id.get(row.id) not in failed]
+        if ids:
+            db.execute(delete(MediaUploadSession).where(MediaUploadSession.media_id.in_(ids)))
+            db.execute(delete(Media).where(Media.id.in_(ids)))
+        db.commit()
+        summary["rows_deleted"] += len(ids)
+        logger.info(
+            "media gc: scanned=%d rows_deleted=%d blobs_deleted=%d blob_failures=%d",
+            summary["scanned"],
+            summary["rows_deleted"],
+            summary["blobs_deleted"],
+            summary["blob_failures"],
+        )
+
+    return summary
+
+
+def _collect_blob(content_hash: str) -> Optional[bool]:
+    """`collect_blob` that logs failures; None means the object could not be deleted."""
+    try:
+        return collect_blob(content_hash)
+    except Exception:
+        logger.exception("media gc: failed to collect blob %s", content_hash)
+        return None
+
+
+def sweep_unreferenced_blobs(
+    db: Session,
+    *,
+    grace_period: timedelta = DEFAULT_GRACE_PERIOD,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    dry_run: bool = False,
+) -> dict[str, int]:
+    """Collect blobs left at zero references (e.g. a background GC task was lost).
+
+    Walks the index in `content_hash` order one batch at a time until a
+    short batch comes back. Blobs that were re-referenced meanwhile or
+    failed to delete are skipped and left for the next run.
+    """
+    cutoff = datetime.utcnow() - grace_period
+    summary = {"orphan_blobs_scanned": 0, "orphan_blobs_collected": 0, "orphan_blob_failures": 0}
+    last: Optional[str] = None
+
+    while True:
+        query = (
+            select(MediaBlob.content_hash)
+            .where(MediaBlob.ref_count == 0, MediaBlob.updated_at < cutoff)
+            .order_by(MediaBlob.content_hash)
+            .limit(batch_size)
+        )
+        if last is not None:
+            query = query.where(MediaBlob.content_hash > last)
+        hashes = db.execute(query).scalars().all()
+        # collect_blob uses its own sessions; don't hold this snapshot open meanwhile
+        db.commit()
+        if not hashes:
+            break
+        last = hashes[-1]
+        summary["orphan_blobs_scanned"] += len(hashes)
+
+        if dry_run:
+            summary["orphan_blobs_collected"] += len(hashes)
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                for collected in pool.map(_collect_blob, hashes):
+                    if collected:
+                        summary["orphan_blobs_collected"] += 1
+                    elif collected is None:
+                        summary["orphan_blob_failures"] += 1
+        if len(hashes) < batch_size:
+            break
+
+    return summary
+
+
+def _discard_upload_objects(row) -> bool:
+    """Delete an expired upload's parts and object; False if storage failed."""
+    try:
+        delete_prefix(parts_prefix(str(row.id)))
+        if row.storage_key:
+            delete_blob(row.storage_key)
+    except Exception:
+        logger.exception("media gc: failed to discard upload %s", row.id)
+        return False
+    return True
+
+
+def sweep_expired_uploads(
+    db: Session,
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    dry_run: bool = False,
+) -> dict[str, int]:
+    """Discard resumable and signed-URL uploads that expired before being finalized.
+
+    Walks expired sessions in `id` order one committed batch at a time until
+    a short batch comes back. A session whose objects fail to delete is kept
+    for the next run.
+    """
+    now = datetime.utcnow()
+    summary = {"expired_uploads": 0, "expired_upload_failures": 0}
+    last = None
+
+    while True:
+        query = (
+            select(MediaUploadSession.id, MediaUploadSession.storage_key)
+            .where(
+                MediaUploadSession.completed_at.is_(None),
+                MediaUploadSession.expires_at < now,
+            )
+            .order_by(MediaUploadSession.id)
+            .limit(batch_size)
+        )
+        if last is not None:
+            query = query.where(MediaUploadSession.id > last)
+        rows = db.execute(query).all()
+        if not rows:
+            break
+        last = rows[-1].id
+
+        if dry_run:
+            summary["expired_uploads"] += len(rows)
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                discarded = [row.id for row, ok in zip(rows, pool.map(_discard_upload_objects, rows)) if ok]
+            if discarded:
+                db.execute(delete(MediaUploadSession).where(MediaUploadSession.id.in_(discarded)))
+            db.commit()
+            summary["expired_uploads"] += len(discarded)
+            summary["expired_upload_failures"] += len(rows) - len(discarded)
+            logger.info(
+                "media gc: expired_uploads=%d expired_upload_failures=%d",
+                summary["expired_uploads"],
+                summary["expired_upload_failures"],
+            )
+        if len(rows) < batch_size:
+            break
+
+    return summary
+
+
+def run_gc(
+    db: Session,
+    *,
+    grace_period: timedelta = DEFAULT_GRACE_PERIOD,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    dry_run: bool = False,
+) -> dict[str, float]:
+    """Run every media sweep and return progress metrics."""
+    started = time.monotonic()
+    options = {"batch_size": batch_size, "concurrency": concurrency, "dry_run": dry_run}
+    summary: dict[str, float] = dict(sweep_deleted_media(db, grace_period=grace_period, **options))
+    summary.update(sweep_unreferenced_blobs(db, grace_period=grace_period, **options))
+    summary.update(sweep_expired_uploads(db, **options))
+    elapsed = time.monotonic() - started
+    summary["elapsed_seconds"] = round(elapsed, 3)
+    summary["rows_per_second"] = round(summary["rows_deleted"] / elapsed, 1) if elapsed else 0.0
+    return summary
+
+
+def run_cli() -> None:
+    """CLI entry point used by scripts/Makefile."""
+    parser = argparse.ArgumentParser(description="Purge soft-deleted media from the database and storage.")
+    parser.add_argument("--grace-days", type=float, default=DEFAULT_GRACE_PERIOD.days)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be deleted without deleting")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with SessionLocal() as session:
+        summary = run_gc(
+            session,
+            grace_period=timedelta(days=args.grace_days),
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+            dry_run=args.dry_run,
+        )
+    print(
+        ("Media GC dry run " if args.dry_run else "Media GC finished ")
+        + "("
+        + ", ".join(f"{key}={value}" for key, value in summary.items())
+        + ")"
+    )
+
+
+if __name__ == "__main__":
+    run_cli()
@@ -0,0 +1,251 @@
+"""Blob storage backend for media (Google Cloud Storage with a local fallback)."""
+import hashlib
+import hmac
+import os
+import shutil
+import time
+from datetime import timedelta
+from typing import BinaryIO, Optional
+from urllib.parse import urlencode
+
+from google.api_core.exceptions import NotFound
+from google.cloud import storage
+
+# Google Cloud Storage configuration
+GCS_BUCKET_NAME = os.getenv("GCS_BUCKET_NAME", "seshy-media")
+GCS_CLIENT = storage.Client() if os.getenv("GOOGLE_APPLICATION_CREDENTIALS") else None
+
+# Local development fallback
+LOCAL_UPLOAD_DIR = "uploads"
+LOCAL_BASE_URL = "http://localhost:8000/uploads"
+LOCAL_DIRECT_UPLOAD_URL = "http://localhost:8000/media/direct-uploads"
+LOCAL_SIGNING_SECRET = os.getenv("MEDIA_SIGNING_SECRET", "local-media-signing-secret")
+
+
+def _local_path(key: str) -> str:
+    """Map a storage key onto the local uploads directory."""
+    return os.path.join(LOCAL_UPLOAD_DIR, *key.split("/"))
+
+
+def key_from_url(url: str) -> Optional[str]:
+    """Storage key for a URL this backend handed out, or None for foreign URLs."""
+    prefixes = [f"{LOCAL_BASE_URL}/"]
+    if GCS_CLIENT:
+        prefixes.append(f"https://storage.googleapis.com/{GCS_BUCKET_NAME}/")
+    for prefix in prefixes:
+        if url.startswith(prefix):
+            return url[len(prefix):]
+    return None
+
+
+def store_blob(fileobj: BinaryIO, key: str, content_type: str) -> str:
+    """Write a file object to storage under `key` and return its public URL."""
+    if not GCS_CLIENT:
+        filepath = _local_path(key)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, "wb") as f:
+            shutil.copyfileobj(fileobj, f)
+        return f"{LOCAL_BASE_URL}/{key}"
+
+    bucket = GCS_CLIENT.bucket(GCS_BUCKET_NAME)
+    blob = bucket.blob(key)
+    blob.upload_from_file(fileobj, content_type=content_type)
+    blob.make_public()
+    return blob.public_url
+
+
+def delete_blob(key: str) -> None:
+    """Delete the object stored under `key` (missing objects are ignored)."""
+    if not GCS_CLIENT:
+        try:
+            os.remove(_local_path(key))
+        except FileNotFoundError:
+            pass
+        return
+
+    bucket = GCS_CLIENT.bucket(GCS_BUCKET_NAME)
+    try:
+        bucket.blob(key).delete()
+    except NotFound:
+        pass
+
+
+def open_blob(key: str) -> BinaryIO:
+    """Open a stored object for streaming reads."""
+    if not GCS_CLIENT:
+        return open(_local_path(key), "rb")
+
+    bucket = GCS_CLIENT.bucket(GCS_BUCKET_NAME)
+    return bucket.blob(key).open("rb")
+
+
+def copy_blob(source_key: str, key: str, content_type: str) -> str:
+    """Copy an object to `key` within storage and return the copy's public URL."""
+    if not GCS_CLIENT:
+        filepath = _local_path(key)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        shutil.copyfile(_local_path(source_key), filepath)
+        return f"{LOCAL_BASE_URL}/{key}"
+
+    bucket = GCS_CLIENT.bucket(GCS_BUCKET_NAME)
+    blob = bucket.copy_blob(bucket.blob(source_key), bucket, key)
+    blob.content_type = content_type
+    blob.patch()
+    blob.make_public()
+    return blob.public_url
+
+
+def delete_prefix(prefix: str) -> None:
+    """Delete every object whose key starts with `prefix` (a directory-style path)."""
+    if not GCS_CLIENT:
+        shutil.rmtree(_local_path(prefix.rstrip("/")), ignore_errors=True)
+        return
+
+    bucket = GCS_CLIENT.bucket(GCS_BUCKET_NAME)
+    for blob in GCS_CLIENT.list_blobs(bucket, prefix=prefix):
+        try:
+            blob.delete()
+        except NotFound:
+            pass
+
+
+# Resumable uploads keep each acknowledged chunk as its own object, named by
+# byte offset, until the upload is finalized and assembled.
+PARTS_PREFIX = "partials"
+GCS_MAX_COMPOSE_SOURCES = 32
+
+
+def parts_prefix(upload_id: str) -> str:
+    """Key prefix holding the parts of a resumable upload."""
+    return f"{PARTS_PREFIX}/{upload_id}/"
+
+
+def store_part(upload_id: str, offset: int, data: bytes) -> None:
+    """Persist one chunk of a resumable upload starting at `offset`."""
+    key = f"{parts_prefix(upload_id)}{offset:012d}"
+    if not GCS_CLIENT:
+        filepath = _local_path(key)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, "wb") as f:
+            f.write(data)
+        return
+
+    bucket = GCS_CLIENT.bucket(GCS_BUCKET_NAME)
+    bucket.blob(key).upload_from_string(data)
+
+
+def _part_chain(part_sizes: dict[int, int], total_bytes: int) -> list[int]:
+    """Offsets of the parts covering [0, total_bytes) back to back.
+
+    Parts left behind by chunks that were never acknowledged are skipped.
+    """
+    chain = []
+    offset = 0
+    while offset < total_bytes:
+        size = part_sizes.get(offset)
+        if not size:
+            raise ValueError(f"Missing upload part at offset {offset}")
+        chain.append(offset)
+        offset += size
+    if offset != total_bytes:
+        raise ValueError("Upload parts overrun the declared size")
+    return chain
+
+
+def assemble_parts(upload_id: str, total_bytes: int) -> str:
+    """Join the parts of a resumable upload into one object and return its key."""
+    prefix = parts_prefix(upload_id)
+    assembled_key = f"{prefix}assembled"
+
+    if not GCS_CLIENT:
+        directory = _local_path(prefix.rstrip("/"))
+        part_sizes = {
+            int(name): os.path.getsize(os.path.join(directory, name))
+            for name in os.listdir(directory)
+            if name.isdigit()
+        }
+        with open(_local_path(assembled_key), "wb") as out:
+            for offset in _part_chain(part_sizes, total_bytes):
+                with open(os.path.join(directory, f"{offset:012d}"), "rb") as part:
+                    shutil.copyfileobj(part, out)
+        return assembled_key
+
+    bucket = GCS_CLIENT.bucket(GCS_BUCKET_NAME)
+    parts = {}
+    for blob in GCS_CLIENT.list_blobs(bucket, prefix=prefix):
+        name = blob.name[len(prefix):]
+        if name.isdigit():
+            parts[int(name)] = blob
+    sources = [parts[offset] for offset in _part_chain({o: b.size for o, b in parts.items()}, total_bytes)]
+
+    # GCS composes at most 32 objects per call, so fold larger uploads in rounds.
+    round_number = 0
+    while len(sources) > GCS_MAX_COMPOSE_SOURCES:
+        folded = []
+        for i in range(0, len(sources), GCS_MAX_COMPOSE_SOURCES):
+            intermediate = bucket.blob(f"{prefix}compose-{round_number}-{i:06d}")
+            intermediate.compose(sources[i:i + GCS_MAX_COMPOSE_SOURCES])
+            folded.append(intermediate)
+        sources = folded
+        round_number += 1
+
+    assembled = bucket.blob(assembled_key)
+    assembled.compose(sources)
+    return assembled_key
+
+
+def blob_size(key: str) -> Optional[int]:
+    """Size in bytes of the object under `key`, or None if it does not exist."""
+    if not GCS_CLIENT:
+        try:
+            return os.path.getsize(_local_path(key))
+        except FileNotFoundError:
+            return None
+
+    bucket = GCS_CLIENT.bucket(GCS_BUCKET_NAME)
+    blob = bucket.get_blob(key)
+    return blob.size if blob else None
+
+
+def publish_blob(key: str) -> str:
+    """Make an object written directly by a client public and return its URL."""
+    if not GCS_CLIENT:
+        return f"{LOCAL_BASE_URL}/{key}"
+
+    bucket = GCS_CLIENT.bucket(GCS_BUCKET_NAME)
+    blob = bucket.blob(key)
+    blob.make_public()
+    return blob.public_url
+
+
+def _local_signature(key: str, content_type: str, expires: int) -> str:
+    """HMAC the local stand-in signer puts on direct upload URLs."""
+    message = f"PUT\n{key}\n{content_type}\n{expires}".encode()
+    return hmac.new(LOCAL_SIGNING_SECRET.encode(), message, hashlib.sha256).hexdigest()
+
+
+def generate_upload_url(key: str, content_type: str, expires_in: timedelta) -> str:
+    """Short-lived URL a client can PUT the object's bytes to, bypassing the API.
+
+    The client must send the same Content-Type. Without GCS credentials a local
+    stand-in signs URLs for `PUT /media/direct-uploads/{key}` instead.
+    """
+    if not GCS_CLIENT:
+        expires = int(time.time() + expires_in.total_seconds())
+        query = urlencode({"expires": expires, "signature": _local_signature(key, content_type, expires)})
+        return f"{LOCAL_DIRECT_UPLOAD_URL}/{key}?{query}"
+
+    bucket = GCS_CLIENT.bucket(GCS_BUCKET_NAME)
+    return bucket.blob(key).generate_signed_url(
+        version="v4",
+        expiration=expires_in,
+        method="PUT",
+        content_type=content_type,
+    )
+
+
+def verify_local_upload_signature(key: str, content_type: str, expires: int, signature: str) -> bool:
+    """Check a URL issued by the local stand-in signer."""
+    if GCS_CLIENT or expires < time.time():
+        return False
+    return hmac.compare_digest(_local_signature(key, content_type, expires), signature)
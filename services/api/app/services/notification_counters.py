@@ -0,0 +1,108 @@
+"""Per-user unread-notification counters."""
+
+from __future__ import annotations
+
+import logging
+import os
+from datetime import datetime
+from typing import Mapping
+from uuid import UUID
+
+from sqlalchemy import func, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models import NotificationCounter
+
+logger = logging.getLogger(__name__)
+
+# How often each worker reconciles counters against user_notifications.
+RECONCILE_INTERVAL_SECONDS = float(os.getenv("NOTIFICATION_COUNTER_RECONCILE_SECONDS", "3600"))
+
+
+def add_unread(db: Session, counts: Mapping[UUID, int]) -> None:
+    """Add to users' unread counts in one statement (caller commits)."""
+    if not counts:
+        return
+
+    now = datetime.utcnow()
+    stmt = insert(NotificationCounter).values(
+        [{"user_id": user_id, "unread_count": count, "updated_at": now} for user_id, count in counts.items()]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[NotificationCounter.user_id],
+        set_={
+            "unread_count": NotificationCounter.unread_count + stmt.excluded.unread_count,
+            "updated_at": now,
+        },
+    )
+    db.execute(stmt)
+
+
+def subtract_unread(db: Session, user_id: UUID, count: int = 1) -> None:
+    """Take `count` off a user's unread count, never below zero (caller commits)."""
+    if count <= 0:
+        return
+
+    db.execute(
+        update(NotificationCounter)
+        .where(NotificationCounter.user_id == user_id)
+        .values(
+            unread_count=func.greatest(NotificationCounter.unread_count - count, 0),
+            updated_at=datetime.utcnow(),
+        )
+    )
+
+
+def get_unread_count(db: Session, user_id: UUID) -> int:
+    """Current unread count for a user (a primary-key lookup)."""
+    return db.execute(
+        select(NotificationCounter.unread_count).where(NotificationCounter.user_id == user_id)
+    ).scalar() or 0
+
+
+_RECONCILE_SQL = text(
+    """
+    WITH actual AS (
+        SELECT user_id, count(*) AS unread_count
+        FROM user_notifications
+        WHERE is_unread
+        GROUP BY user_id
+    ),
+    users AS (
+        SELECT user_id FROM actual
+        UNION
+        SELECT user_id FROM notification_counters
+    )
+    INSERT INTO notification_counters (user_id, unread_count, updated_at)
+    SELECT users.user_id, coalesce(actual.unread_count, 0), :now
+    FROM users LEFT JOIN actual ON actual.user_id = users.user_id
+    ON CONFLICT (user_id) DO UPDATE
+        SET unread_count = excluded.unread_count, updated_at = excluded.updated_at
+        WHERE notification_counters.unread_count <> excluded.unread_count
+    """
+)
+
+
+def reconcile_unread_counters(db: Session) -> int:
+    """Rewrite counters that drifted from `user_notifications`; returns how many.
+
+    Runs without locks, so a write racing the recount can leave a counter off
+    by one until the next pass.
+    """
+    corrected = db.execute(_RECONCILE_SQL, {"now": datetime.utcnow()}).rowcount
+    db.commit()
+    if corrected:
+        logger.info("notification counters: corrected %d users", corrected)
+    return corrected
+
+
+def reconcile_job() -> int:
+    """Periodic-job entry point with a session of its own."""
+    with SessionLocal() as session:
+        return reconcile_unread_counters(session)
+
+
+if __name__ == "__main__":
+    print(f"Reconciled unread counters (corrected={reconcile_job()})")
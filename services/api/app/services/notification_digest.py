@@ -0,0 +1,227 @@
+"""Time-window digests for high-volume notification types.
+
+Occurrences are counted in memory per `(user, type, event)` and spilled to
+`notification_digest_staging` every few seconds (and on shutdown), where
+counts from every worker merge. Once a key's window has been open for
+`WINDOW_SECONDS`, one worker claims the staged row and writes a single
+summary notification through the regular rollup path.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models import NotificationDigestStaging as Staging
+from .notification_counters import add_unread
+from .notification_rollup import ROLLUP_TITLES, record_notification, rollup_key_for, summary_title
+from .notification_stream import publish_created
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SECONDS = float(os.getenv("NOTIFICATION_DIGEST_WINDOW_SECONDS", "60"))
+SPILL_SECONDS = float(os.getenv("NOTIFICATION_DIGEST_SPILL_SECONDS", "2"))
+DEFAULT_BATCH_SIZE = 500
+
+
+@dataclass
+class _Pending:
+    type_raw: int
+    event_id: Optional[UUID]
+    event_name: Optional[str]
+    event_color: Optional[str]
+    user_name: Optional[str]
+    user_avatar: Optional[str]
+    count: int
+    first_seen: datetime
+
+
+class NotificationDigest:
+    """Per-worker in-memory counts, spilled to the staging table in one statement.
+
+    Anything not yet spilled is lost if the process dies without running its
+    shutdown hook; that window is `SPILL_SECONDS` long.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pending: dict[tuple[UUID, str], _Pending] = {}
+
+    def add(
+        self,
+        user_id: UUID,
+        type_raw: int,
+        *,
+        event_id: Optional[UUID] = None,
+        event_name: Optional[str] = None,
+        event_color: Optional[str] = None,
+        user_name: Optional[str] = None,
+        user_avatar: Optional[str] = None,
+    ) -> None:
+        """Count one occurrence for `user_id`; only rollup types are supported."""
+        if type_raw not in ROLLUP_TITLES:
+            raise ValueError(f"Notification type {type_raw} cannot be digested")
+        key = (user_id, rollup_key_for(type_raw, event_id))
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = _Pending(
+                    type_raw, event_id, event_name, event_color, user_name, user_avatar, 1, datetime.utcnow()
+                )
+            else:
+                pending.count += 1
+                pending.user_name = user_name
+                pending.user_avatar = user_avatar
+
+    def _restore(self, pending: dict[tuple[UUID, str], _Pending]) -> None:
+        with self._lock:
+            for key, item in pending.items():
+                current = self._pending.get(key)
+                if current is None:
+                    self._pending[key] = item
+                else:
+                    current.count += item.count
+                    current.first_seen = min(current.first_seen, item.first_seen)
+
+    def spill(self, db: Session) -> int:
+        """Merge buffered counts into the staging table; returns keys written."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        now = datetime.utcnow()
+        stmt = insert(Staging).values(
+            [
+                {
+                    "user_id": user_id,
+                    "digest_key": digest_key,
+                    "type_raw": item.type_raw,
+                    "event_id": item.event_id,
+                    "event_name": item.event_name,
+                    "event_color": item.event_color,
+                    "user_name": item.user_name,
+                    "user_avatar": item.user_avatar,
+                    "count": item.count,
+                    "window_start": item.first_seen,
+                    "updated_at": now,
+                }
+                for (user_id, digest_key), item in pending.items()
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Staging.user_id, Staging.digest_key],
+            set_={
+                "count": Staging.count + stmt.excluded.count,
+                "user_name": stmt.excluded.user_name,
+                "user_avatar": stmt.excluded.user_avatar,
+                "updated_at": now,
+            },
+        )
+        try:
+            db.execute(stmt)
+            db.commit()
+        except Exception:
+            db.rollback()
+            self._restore(pending)
+            raise
+        return len(pending)
+
+
+def flush_due_digests(
+    db: Session,
+    *,
+    window: timedelta = timedelta(seconds=WINDOW_SECONDS),
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> int:
+    """Turn staged rows whose window has closed into notifications.
+
+    Rows are claimed with SKIP LOCKED and deleted in the same transaction
+    that writes their notifications, so concurrent workers never double
+    send and a failed batch stays staged.
+    """
+    flushed = 0
+    while True:
+        due = (
+            select(Staging.user_id, Staging.digest_key)
+            .where(Staging.window_start <= datetime.utcnow() - window)
+            .order_by(Staging.window_start)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        rows = db.execute(
+            delete(Staging)
+            .where(tuple_(Staging.user_id, Staging.digest_key).in_(due))
+            .returning(
+                Staging.user_id,
+                Staging.type_raw,
+                Staging.event_id,
+                Staging.event_name,
+                Staging.event_color,
+                Staging.user_name,
+                Staging.user_avatar,
+                Staging.count,
+            )
+            .execution_options(synchronize_session=False)
+        ).all()
+        if not rows:
+            db.commit()
+            return flushed
+
+        created_counts: dict[UUID, int] = {}
+        published = []
+        for row in rows:
+            notification, created = record_notification(
+                db,
+                {
+                    "user_id": row.user_id,
+                    "type_raw": row.type_raw,
+                    "event_id": row.event_id,
+                    "event_name": row.event_name,
+                    "event_color": row.event_color,
+                    "user_name": row.user_name,
+                    "user_avatar": row.user_avatar,
+                    "title": summary_title(
+                        row.type_raw, row.count, event_name=row.event_name, user_name=row.user_name
+                    ),
+                },
+                count=row.count,
+            )
+            if created:
+                created_counts[row.user_id] = created_counts.get(row.user_id, 0) + 1
+            published.append((notification.id, notification.user_id))
+        add_unread(db, created_counts)
+        publish_created(db, published)
+        db.commit()
+        flushed += len(rows)
+        if len(rows) < batch_size:
+            return flushed
+
+
+def digest_job() -> int:
+    """Periodic-job entry point: spill this worker's buffer, then flush closed windows."""
+    with SessionLocal() as session:
+        notification_digest.spill(session)
+        return flush_due_digests(session)
+
+
+def spill_on_shutdown() -> None:
+    """Shutdown hook: stage whatever this worker still holds."""
+    with SessionLocal() as session:
+        try:
+            notification_digest.spill(session)
+        except Exception:
+            logger.exception("notification digest: failed to spill on shutdown")
+
+
+notification_digest = NotificationDigest()
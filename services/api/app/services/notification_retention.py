@@ -0,0 +1,222 @@
+"""Monthly partition upkeep and retention for `user_notifications`."""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import re
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "user_notifications"
+PARTITION_PREFIX = "user_notifications_p"
+# Catches rows outside every monthly partition; never dropped by retention
+DEFAULT_PARTITION = "user_notifications_default"
+MONTHS_AHEAD = 3
+DEFAULT_BATCH_SIZE = 5000
+RETENTION_DAYS = float(os.getenv("NOTIFICATION_RETENTION_DAYS", "90"))
+RUN_INTERVAL_SECONDS = float(os.getenv("NOTIFICATION_RETENTION_INTERVAL_SECONDS", "86400"))
+
+_PARTITION_NAME = re.compile(rf"{PARTITION_PREFIX}(\d{{4}})(\d{{2}})")
+
+
+def _next_month(value: datetime) -> datetime:
+    return datetime(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y%m}"
+
+
+def list_partitions(db: Session) -> list[tuple[str, datetime]]:
+    """Existing monthly partitions as `(name, month start)`, oldest first."""
+    names = db.execute(
+        text(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            WHERE parent.relname = :parent
+            """
+        ),
+        {"parent": PARENT_TABLE},
+    ).scalars()
+    partitions = []
+    for name in names:
+        match = _PARTITION_NAME.fullmatch(name)
+        if match:
+            partitions.append((name, datetime(int(match[1]), int(match[2]), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def _create_month_partition(db: Session, name: str, month: datetime, upper: datetime) -> None:
+    """Create one monthly partition, moving rows for it out of the default partition.
+
+    Postgres refuses to add a partition while the default one holds rows in
+    its range, so those are moved across with the default detached.
+    """
+    bounds = {"lower": month, "upper": upper}
+    in_range = '"timestamp" >= :lower AND "timestamp" < :upper'
+    create = (
+        f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} "
+        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{upper:%Y-%m-%d}')"
+    )
+    stranded = db.execute(text(f"SELECT to_regclass('{DEFAULT_PARTITION}') IS NOT NULL")).scalar() and db.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range})"), bounds
+    ).scalar()
+    if not stranded:
+        db.execute(text(create))
+        return
+
+    db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+    db.execute(text(create))
+    moved = db.execute(
+        text(f"INSERT INTO {PARENT_TABLE} SELECT * FROM {DEFAULT_PARTITION} WHERE {in_range}"), bounds
+    ).rowcount
+    db.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_range}"), bounds)
+    db.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    logger.warning("notification partitions: moved %d rows from %s into %s", moved, DEFAULT_PARTITION, name)
+
+
+def ensure_partitions(db: Session, *, months_ahead: int = MONTHS_AHEAD) -> list[str]:
+    """Create the default partition, this month's and the next `months_ahead`; returns new names.
+
+    Rows that landed in the default partition while a month was missing
+    (the job was stalled) are moved into that month's partition.
+    """
+    # Every worker runs this on startup; one at a time
+    db.execute(select(func.pg_advisory_xact_lock(func.hashtext(PARENT_TABLE))))
+    db.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"))
+    existing = {name for name, _ in list_partitions(db)}
+    now = datetime.utcnow()
+    month = datetime(now.year, now.month, 1)
+    created = []
+    for _ in range(months_ahead + 1):
+        upper = _next_month(month)
+        name = partition_name(month)
+        if name not in existing:
+            _create_month_partition(db, name, month, upper)
+            created.append(name)
+        month = upper
+    db.commit()
+    return created
+
+
+def prune_read_notifications(
+    db: Session,
+    *,
+    retention: timedelta = timedelta(days=RETENTION_DAYS),
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    dry_run: bool = False,
+) -> dict[str, int]:
+    """Delete read notifications older than `retention`, one partition at a time.
+
+    Deletes run directly against each partition in committed batches.
+    Partitions wholly past the cutoff are detached and dropped once empty;
+    unread rows are never deleted, so they keep their partition alive. Old
+    rows in the default partition are pruned too, but it is never dropped.
+    """
+    cutoff = datetime.utcnow() - retention
+    summary = {"rows_deleted": 0, "partitions_dropped": 0}
+
+    targets = [
+        (name, _next_month(month) <= cutoff) for name, month in list_partitions(db) if month < cutoff
+    ]
+    if db.execute(text(f"SELECT to_regclass('{DEFAULT_PARTITION}') IS NOT NULL")).scalar():
+        targets.append((DEFAULT_PARTITION, False))
+
+    for name, whole in targets:
+        condition = "NOT is_unread" if whole else 'NOT is_unread AND "timestamp" < :cutoff'
+
+        if dry_run:
+            summary["rows_deleted"] += db.execute(
+                text(f"SELECT count(*) FROM {name} WHERE {condition}"), {"cutoff": cutoff}
+            ).scalar()
+            continue
+
+        while True:
+            deleted = db.execute(
+                text(
+                    f"DELETE FROM {name} WHERE ctid IN "
+                    f"(SELECT ctid FROM {name} WHERE {condition} LIMIT :limit)"
+                ),
+                {"cutoff": cutoff, "limit": batch_size},
+            ).rowcount
+            db.commit()
+            summary["rows_deleted"] += deleted
+            if deleted < batch_size:
+                break
+
+        if whole and not db.execute(text(f"SELECT EXISTS (SELECT 1 FROM {name})")).scalar():
+            db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+            db.execute(text(f"DROP TABLE {name}"))
+            db.commit()
+            summary["partitions_dropped"] += 1
+            logger.info("notification retention: dropped partition %s", name)
+
+    return summary
+
+
+def run_retention(
+    db: Session,
+    *,
+    retention: timedelta = timedelta(days=RETENTION_DAYS),
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    months_ahead: int = MONTHS_AHEAD,
+    dry_run: bool = False,
+) -> dict[str, float]:
+    """Create upcoming partitions, prune old read rows and return progress metrics."""
+    started = time.monotonic()
+    summary: dict[str, float] = {
+        "partitions_created": 0 if dry_run else len(ensure_partitions(db, months_ahead=months_ahead))
+    }
+    summary.update(prune_read_notifications(db, retention=retention, batch_size=batch_size, dry_run=dry_run))
+    elapsed = time.monotonic() - started
+    summary["elapsed_seconds"] = round(elapsed, 3)
+    summary["rows_per_second"] = round(summary["rows_deleted"] / elapsed, 1) if elapsed else 0.0
+    return summary
+
+
+def retention_job() -> dict[str, float]:
+    """Periodic-job entry point with a session of its own."""
+    with SessionLocal() as session:
+        return run_retention(session)
+
+
+def run_cli() -> None:
+    """CLI entry point used by scripts/Makefile."""
+    parser = argparse.ArgumentParser(description="Prune old read notifications and manage partitions.")
+    parser.add_argument("--retention-days", type=float, default=RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--months-ahead", type=int, default=MONTHS_AHEAD)
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be deleted without deleting")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with SessionLocal() as session:
+        summary = run_retention(
+            session,
+            retention=timedelta(days=args.retention_days),
+            batch_size=args.batch_size,
+            months_ahead=args.months_ahead,
+            dry_run=args.dry_run,
+        )
+    print(
+        ("Notification retention dry run " if args.dry_run else "Notification retention finished ")
+        + "("
+        + ", ".join(f"{key}={value}" for key, value in summary.items())
+        + ")"
+    )
+
+
+if __name__ == "__main__":
+    run_cli()
@@ -0,0 +1,94 @@
+"""Write-time coalescing of repetitive notifications into one unread row."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Optional
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..models import UserNotification
+
+# Summary titles keyed by NotificationType raw value; only these types roll up.
+ROLLUP_TITLES = {
+    3: "{count} people asked to join {event_name}",  # joinRequestReceived
+    10: "{count} people joined {event_name}",  # newMemberJoined
+    11: "{count} new followers",  # newFollower
+    12: "{count} people liked {event_name}",  # eventLiked
+}
+
+
+# Titles for a single occurrence, used when a digest window saw only one.
+SINGLE_TITLES = {
+    3: "{user_name} asked to join {event_name}",
+    10: "{user_name} joined {event_name}",
+    11: "{user_name} started following you",
+    12: "{user_name} liked {event_name}",
+}
+
+
+def summary_title(type_raw: int, count: int, *, event_name: Optional[str], user_name: Optional[str] = None) -> str:
+    """Title for `count` occurrences of a rollup type."""
+    template = SINGLE_TITLES[type_raw] if count == 1 else ROLLUP_TITLES[type_raw]
+    return template.format(
+        count=count,
+        event_name=event_name or "your event",
+        user_name=user_name or "Someone",
+    )
+
+
+def rollup_key_for(type_raw: int, event_id: Optional[UUID]) -> Optional[str]:
+    """Key shared by notifications that collapse together, or None."""
+    if type_raw not in ROLLUP_TITLES:
+        return None
+    return f"{type_raw}:{event_id or ''}"
+
+
+def record_notification(
+    db: Session,
+    values: dict[str, Any],
+    count: int = 1,
+) -> tuple[UserNotification, bool]:
+    """Insert a notification, or fold it into the recipient's unread rollup row.
+
+    `count` is how many occurrences `values` stands for (a digest passes its
+    window total). Returns the row and whether it was newly created (only new
+    rows add to the unread counter). The rolled-up row takes the latest actor
+    and records the time in `last_rolled_up_at`. Its `timestamp` is left
+    alone: it is the primary and partition key, and rewriting it would move
+    the row between monthly partitions. The caller commits.
+    """
+    key = rollup_key_for(values["type_raw"], values.get("event_id"))
+    if key is not None:
+        # Serializes writers for this recipient and key so repeats can't race
+        # into two rows (a unique index can't help on a partitioned table).
+        db.execute(select(func.pg_advisory_xact_lock(func.hashtext(f"{values['user_id']}:{key}"))))
+        existing = (
+            db.query(UserNotification)
+            .filter(
+                UserNotification.user_id == values["user_id"],
+                UserNotification.rollup_key == key,
+                UserNotification.is_unread == True,
+            )
+            .order_by(UserNotification.timestamp.desc())
+            .first()
+        )
+        if existing:
+            existing.rollup_count += count
+            existing.title = summary_title(
+                existing.type_raw,
+                existing.rollup_count,
+                event_name=existing.event_name,
+            )
+            existing.user_name = values.get("user_name")
+            existing.user_avatar = values.get("user_avatar")
+            existing.last_rolled_up_at = datetime.utcnow()
+            db.flush()
+            return existing, False
+
+    notification = UserNotification(**values, rollup_key=key, rollup_count=count)
+    db.add(notification)
+    db.flush()
+    return notification, True
@@ -0,0 +1,244 @@
+"""Real-time notification delivery over Server-Sent Events.
+
+Writers call `publish_created` inside the transaction that inserts
+notifications, which queues a Postgres NOTIFY carrying `(id, user_id)`
+pairs. Each API worker runs one `NotificationListener` on a dedicated
+connection; it loads only the rows whose recipient has an open stream on
+that worker and hands them to the in-process `NotificationHub`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterable, Optional
+from uuid import UUID
+
+import psycopg2
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..database import DATABASE_URL, SessionLocal
+from ..models import UserNotification as UserNotificationModel
+from ..schemas import UserNotification
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "user_notifications"
+MAX_PAYLOAD_BYTES = 7900  # Postgres rejects NOTIFY payloads of 8000 bytes or more
+QUEUE_SIZE = int(os.getenv("NOTIFICATION_STREAM_QUEUE_SIZE", "100"))
+HEARTBEAT_SECONDS = float(os.getenv("NOTIFICATION_STREAM_HEARTBEAT_SECONDS", "15"))
+RECONNECT_SECONDS = 5.0
+
+
+def _payloads(pairs: Iterable[tuple[UUID, UUID]]) -> list[str]:
+    """Pack `(notification_id, user_id)` pairs into JSON arrays under the NOTIFY limit."""
+    payloads: list[str] = []
+    current: list[str] = []
+    size = 2
+    for notification_id, user_id in pairs:
+        item = f'["{notification_id.hex}","{user_id.hex}"]'
+        if current and size + len(item) + 1 > MAX_PAYLOAD_BYTES:
+            payloads.append("[" + ",".join(current) + "]")
+            current, size = [], 2
+        current.append(item)
+        size += len(item) + 1
+    if current:
+        payloads.append("[" + ",".join(current) + "]")
+    return payloads
+
+
+def publish_created(db: Session, pairs: Iterable[tuple[UUID, UUID]]) -> None:
+    """Announce new notifications to every worker once the caller commits."""
+    payloads = _payloads(pairs)
+    if payloads:
+        db.execute(
+            text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+            {"channel": CHANNEL, "payloads": payloads},
+        )
+
+
+@dataclass(eq=False)
+class Subscription:
+    """One open stream; `overflowed` is set when the client fell too far behind."""
+
+    user_id: UUID
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=QUEUE_SIZE))
+    overflowed: bool = False
+
+
+class NotificationHub:
+    """In-process fan-out from the listener to open streams.
+
+    Only touched from the event loop thread, so it needs no lock. Each stream
+    has a bounded queue; a slow client is told to resync instead of letting
+    its queue grow.
+    """
+
+    def __init__(self) -> None:
+        self._subscribers: dict[UUID, set[Subscription]] = {}
+
+    def subscribe(self, user_id: UUID) -> Subscription:
+        subscription = Subscription(user_id)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscribers.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.user_id]
+
+    def is_subscribed(self, user_id: UUID) -> bool:
+        return user_id in self._subscribers
+
+    def publish(self, user_id: UUID, event: str) -> None:
+        """Queue an already-formatted SSE event for every stream of `user_id`."""
+        for subscription in self._subscribers.get(user_id, ()):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscription.overflowed = True
+
+    def resync_all(self) -> None:
+        """Ask every open stream to refetch (e.g. after the listener missed events)."""
+        for subscriptions in self._subscribers.values():
+            for subscription in subscriptions:
+                subscription.overflowed = True
+                try:
+                    subscription.queue.put_nowait("")
+                except asyncio.QueueFull:
+                    pass
+
+    async def stream(self, user_id: UUID) -> AsyncIterator[str]:
+        """SSE body for one client; ends after a resync event so it reconnects."""
+        subscription = self.subscribe(user_id)
+        try:
+            yield f"retry: {int(RECONNECT_SECONDS * 1000)}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if subscription.overflowed:
+                    yield "event: resync\ndata: {}\n\n"
+                    return
+                yield event
+        finally:
+            self.unsubscribe(subscription)
+
+
+def _open_listen_connection():
+    """Blocking: connect and LISTEN. Run off the event loop."""
+    connection = psycopg2.connect(DATABASE_URL)
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        cursor.execute(f"LISTEN {CHANNEL}")
+    return connection
+
+
+def _load_notifications(ids: list[UUID]) -> list[UserNotificationModel]:
+    with SessionLocal() as session:
+        return session.query(UserNotificationModel).filter(UserNotificationModel.id.in_(ids)).all()
+
+
+class NotificationListener:
+    """LISTENs on a dedicated connection driven by the event loop's reader callbacks."""
+
+    def __init__(self, hub: NotificationHub) -> None:
+        self.hub = hub
+        self._connection = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reconnect: Optional[asyncio.Task] = None
+        self._pending: set[asyncio.Task] = set()
+
+    async def _connect(self) -> None:
+        # Connecting can block for the full TCP/auth timeout while Postgres is down
+        connection = await asyncio.to_thread(_open_listen_connection)
+        self._connection = connection
+        self._loop.add_reader(connection.fileno(), self._on_readable)
+
+    def _disconnect(self) -> None:
+        if self._connection is not None:
+            try:
+                self._loop.remove_reader(self._connection.fileno())
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        try:
+            await self._connect()
+        except Exception:
+            logger.exception("notification listener: connect failed")
+            self._schedule_reconnect()
+
+    async def stop(self) -> None:
+        if self._reconnect is not None:
+            self._reconnect.cancel()
+        for task in list(self._pending):
+            task.cancel()
+        self._disconnect()
+
+    def _schedule_reconnect(self) -> None:
+        if self._reconnect is None or self._reconnect.done():
+            self._reconnect = self._loop.create_task(self._reconnect_loop())
+
+    async def _reconnect_loop(self) -> None:
+        while True:
+            await asyncio.sleep(RECONNECT_SECONDS)
+            try:
+                await self._connect()
+            except Exception:
+                logger.warning("notification listener: reconnect failed, retrying")
+                continue
+            # Anything sent while disconnected was missed
+            self.hub.resync_all()
+            return
+
+    def _on_readable(self) -> None:
+        try:
+            self._connection.poll()
+        except Exception:
+            logger.exception("notification listener: connection lost")
+            self._disconnect()
+            self._schedule_reconnect()
+            return
+
+        wanted: dict[UUID, UUID] = {}
+        while self._connection.notifies:
+            notify = self._connection.notifies.pop(0)
+            try:
+                pairs = json.loads(notify.payload)
+            except ValueError:
+                continue
+            for notification_id, user_id in pairs:
+                user_id = UUID(user_id)
+                if self.hub.is_subscribed(user_id):
+                    wanted[UUID(notification_id)] = user_id
+
+        if wanted:
+            task = self._loop.create_task(self._deliver(list(wanted)))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    async def _deliver(self, ids: list[UUID]) -> None:
+        try:
+            rows = await asyncio.to_thread(_load_notifications, ids)
+        except Exception:
+            logger.exception("notification listener: failed to load %d notifications", len(ids))
+            return
+        for row in rows:
+            data = UserNotification.model_validate(row).model_dump_json()
+            self.hub.publish(row.user_id, f"event: notification\nid: {row.id}\ndata: {data}\n\n")
+
+
+notification_hub = NotificationHub()
+notification_listener = NotificationListener(notification_hub)
@@ -0,0 +1,210 @@
+"""Resolve payments stuck in `pending` against the payment provider."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models import Payment
+from .stripe_service import PaymentProviderError, StripeClient
+from .stripe_webhooks import apply_event
+from .ticket_holds import release_hold
+from .ticket_inventory import transition_payment
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_AGE = timedelta(minutes=30)
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_CONCURRENCY = 10
+DEFAULT_RATE = 20.0  # provider requests per second
+RUN_INTERVAL_SECONDS = float(os.getenv("PAYMENT_RECONCILE_INTERVAL_SECONDS", "900"))
+
+
+class RateLimiter:
+    """Spaces calls at least `1 / rate` seconds apart across all tasks."""
+
+    def __init__(self, rate: float):
+        self._interval = 1.0 / rate
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            delay = self._next - now
+            self._next = max(now, self._next) + self._interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def _outcome(intent: Optional[dict[str, Any]]) -> Optional[str]:
+    """Webhook event type equivalent to an intent's state, or None if unresolved."""
+    if intent is None:
+        return "payment_intent.payment_failed"
+    status = intent.get("status")
+    if status == "succeeded":
+        return "payment_intent.succeeded"
+    if status == "canceled" or (status == "requires_payment_method" and intent.get("last_payment_error")):
+        return "payment_intent.payment_failed"
+    return None
+
+
+async def _fetch_intents(
+    client: StripeClient,
+    intent_ids: list[str],
+    limiter: RateLimiter,
+    concurrency: int,
+) -> dict[str, Optional[dict[str, Any]]]:
+    """Fetch intents in parallel; a missing intent maps to None, other errors are skipped."""
+    semaphore = asyncio.Semaphore(concurrency)
+    results: dict[str, Optional[dict[str, Any]]] = {}
+
+    async def fetch(intent_id: str) -> None:
+        async with semaphore:
+            await limiter.wait()
+            try:
+                results[intent_id] = await client.get_payment_intent(intent_id)
+            except PaymentProviderError as exc:
+                if exc.status_code == 404:
+                    results[intent_id] = None
+                else:
+                    logger.warning("payment reconciliation: fetching %s failed: %s", intent_id, exc)
+
+    await asyncio.gather(*(fetch(intent_id) for intent_id in intent_ids))
+    return results
+
+
+async def reconcile_pending_payments(
+    db: Session,
+    client: StripeClient,
+    *,
+    min_age: timedelta = DEFAULT_MIN_AGE,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    rate: float = DEFAULT_RATE,
+    dry_run: bool = False,
+) -> dict[str, float]:
+    """Page through old pending payments and apply what the provider reports.
+
+    Payments are walked in `(created_at, id)` order. Each page's intents are
+    fetched concurrently under a shared rate limit, then every resolved
+    payment in the page is applied in one transaction through the same code
+    path as webhooks (holds, inventory, oversold). Payments that never got
+    an intent are failed and their holds released. Returns counts and
+    throughput.
+    """
+    started = time.monotonic()
+    cutoff = datetime.utcnow() - min_age
+    limiter = RateLimiter(rate)
+    summary: dict[str, float] = {"scanned": 0, "succeeded": 0, "failed": 0, "unresolved": 0}
+    last: Optional[tuple[datetime, object]] = None
+
+    while True:
+        query = (
+            select(Payment.id, Payment.created_at, Payment.stripe_payment_intent_id)
+            .where(Payment.status == "pending", Payment.created_at < cutoff)
+            .order_by(Payment.created_at, Payment.id)
+            .limit(batch_size)
+        )
+        if last is not None:
+            query = query.where(tuple_(Payment.created_at, Payment.id) > last)
+        rows = db.execute(query).all()
+        if not rows:
+            break
+        last = (rows[-1].created_at, rows[-1].id)
+        summary["scanned"] += len(rows)
+
+        intent_ids = [row.stripe_payment_intent_id for row in rows if row.stripe_payment_intent_id]
+        intents = await _fetch_intents(client, intent_ids, limiter, concurrency)
+
+        for row in rows:
+            if row.stripe_payment_intent_id is None:
+                outcome, intent = "payment_intent.payment_failed", None
+            elif row.stripe_payment_intent_id not in intents:
+                outcome, intent = None, None  # fetch failed; try next run
+            else:
+                intent = intents[row.stripe_payment_intent_id]
+                outcome = _outcome(intent)
+
+            if outcome is None:
+                summary["unresolved"] += 1
+                continue
+            summary["succeeded" if outcome == "payment_intent.succeeded" else "failed"] += 1
+            if dry_run:
+                continue
+            if intent is not None:
+                # The provider's metadata is authoritative only for its own intent
+                intent = {**intent, "metadata": {**(intent.get("metadata") or {}), "payment_id": str(row.id)}}
+                apply_event(db, outcome, intent)
+            elif transition_payment(db, row.id, "pending", "failed"):
+                release_hold(db, row.id)
+        db.commit()
+        logger.info(
+            "payment reconciliation: scanned=%d succeeded=%d failed=%d unresolved=%d",
+            summary["scanned"],
+            summary["succeeded"],
+            summary["failed"],
+            summary["unresolved"],
+        )
+
+    elapsed = time.monotonic() - started
+    summary["elapsed_seconds"] = round(elapsed, 3)
+    summary["rows_per_second"] = round(summary["scanned"] / elapsed, 1) if elapsed else 0.0
+    return summary
+
+
+async def _run(**options) -> dict[str, float]:
+    # A client of its own: the shared one belongs to the API's event loop
+    client = StripeClient()
+    try:
+        with SessionLocal() as session:
+            return await reconcile_pending_payments(session, client, **options)
+    finally:
+        await client.aclose()
+
+
+def reconcile_job() -> dict[str, float]:
+    """Periodic-job entry point (runs in a worker thread with its own loop)."""
+    return asyncio.run(_run())
+
+
+def run_cli() -> None:
+    """CLI entry point used by scripts/Makefile."""
+    parser = argparse.ArgumentParser(description="Resolve pending payments against the payment provider.")
+    parser.add_argument("--min-age-minutes", type=float, default=DEFAULT_MIN_AGE.total_seconds() / 60)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Provider requests per second")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without changing it")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    summary = asyncio.run(
+        _run(
+            min_age=timedelta(minutes=args.min_age_minutes),
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            dry_run=args.dry_run,
+        )
+    )
+    print(
+        ("Payment reconciliation dry run " if args.dry_run else "Payment reconciliation finished ")
+        + "("
+        + ", ".join(f"{key}={value}" for key, value in summary.items())
+        + ")"
+    )
+
+
+if __name__ == "__main__":
+    run_cli()
@@ -0,0 +1,41 @@
+"""Periodic background jobs run inside the API process."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+_jobs: list[tuple[str, float, Callable[[], object]]] = []
+_tasks: list[asyncio.Task] = []
+
+
+def register(name: str, interval_seconds: float, job: Callable[[], object]) -> None:
+    """Run the sync callable `job` every `interval_seconds` (<= 0 disables it)."""
+    if interval_seconds > 0:
+        _jobs.append((name, interval_seconds, job))
+
+
+async def _run(name: str, interval_seconds: float, job: Callable[[], object]) -> None:
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await asyncio.to_thread(job)
+        except Exception:
+            logger.exception("periodic job %s failed", name)
+
+
+def start() -> None:
+    """Start every registered job on the running event loop."""
+    for name, interval_seconds, job in _jobs:
+        _tasks.append(asyncio.create_task(_run(name, interval_seconds, job), name=name))
+
+
+async def stop() -> None:
+    """Cancel running jobs (a job mid-run finishes its current thread call)."""
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
@@ -1,43 +1,168 @@
-"""Stripe service for payment processing."""
-import os
-import stripe
-from typing import Optional
-
-stripe.api_key = os.getenv("STRIPE_SECRET_KEY", "sk_test_...")
-STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "whsec_...")
-
-
-def create_payment_intent(amount_cents: int, metadata: dict) -> stripe.PaymentIntent:
-    """Create a Stripe Payment Intent."""
-    return stripe.PaymentIntent.create(
-        amount=amount_cents,
-        currency="usd",
-        metadata=metadata
-    )
-
-
-def get_payment_intent(payment_intent_id: str) -> stripe.PaymentIntent:
-    """Retrieve a Stripe Payment Intent."""
-    return stripe.PaymentIntent.retrieve(payment_intent_id)
-
-
-def cancel_payment_intent(payment_intent_id: str) -> stripe.PaymentIntent:
-    """Cancel a Stripe Payment Intent."""
-    return stripe.PaymentIntent.cancel(payment_intent_id)
-
-
-def create_refund(charge_id: str, amount_cents: Optional[int] = None) -> stripe.Refund:
-    """Create a refund for a charge."""
-    params = {"charge": charge_id}
-    if amount_cents:
-        params["amount"] = amount_cents
-    return stripe.Refund.create(**params)
-
-
-
+"""Async Stripe API client.
 
+Talks to the Stripe REST API over one pooled `httpx.AsyncClient` per process,
+so provider round trips never block the event loop. Requests have timeouts,
+and transient failures (connection errors, 429, 5xx) are retried with jittered
+backoff under the same idempotency key, so a retried create can't charge
+or refund twice. POSTs without a key are never retried. Point `STRIPE_API_BASE` at `app.services.fake_payment_provider` to run
+without Stripe.
+"""
 
+from __future__ import annotations
 
+import asyncio
+import os
+import random
+from typing import Any, Optional
 
+import httpx
 
+STRIPE_API_BASE = os.getenv("STRIPE_API_BASE", "https://api.stripe.com")
+STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY", "sk_test_...")
+STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "whsec_...")
 
+TIMEOUT = httpx.Timeout(float(os.getenv("STRIPE_TIMEOUT_SECONDS", "10")), connect=3.0)
+MAX_RETRIES = int(os.getenv("STRIPE_MAX_RETRIES", "2"))
+MAX_CONNECTIONS = int(os.getenv("STRIPE_MAX_CONNECTIONS", "100"))
+# Not 409: Stripe's answer to a key reused with different parameters, which a retry repeats
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class PaymentProviderError(Exception):
+    """A provider request failed for good (after any retries)."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _form(params: dict[str, Any], prefix: str = "") -> dict[str, str]:
+    """Flatten nested params into Stripe's `key[sub]=value` form encoding."""
+    form = {}
+    for key, value in params.items():
+        name = f"{prefix}[{key}]" if prefix else key
+        if isinstance(value, dict):
+            form.update(_form(value, name))
+        elif value is not None:
+            form[name] = str(value)
+    return form
+
+
+class StripeClient:
+    """Pooled async client for the handful of Stripe endpoints the API uses."""
+
+    def __init__(
+        self,
+        api_key: str = STRIPE_SECRET_KEY,
+        base_url: str = STRIPE_API_BASE,
+        timeout: httpx.Timeout = TIMEOUT,
+        max_retries: int = MAX_RETRIES,
+        max_connections: int = MAX_CONNECTIONS,
+    ):
+        self._max_retries = max_retries
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            auth=(api_key, ""),
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[dict[str, Any]] = None,
+        idempotency_key: Optional[str] = None,
+    ) -> dict[str, Any]:
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else {}
+        data = _form(params) if params and method == "POST" else None
+        query = _form(params) if params and method != "POST" else None
+        # A POST retried without a key could apply twice
+        max_retries = self._max_retries if idempotency_key or method != "POST" else 0
+
+        for attempt in range(max_retries + 1):
+            last_attempt = attempt == max_retries
+            try:
+                response = await self._client.request(method, path, data=data, params=query, headers=headers)
+            except httpx.TransportError as exc:
+                if last_attempt:
+                    raise PaymentProviderError(f"Stripe request failed: {exc}") from exc
+            else:
+                should_retry = response.headers.get("Stripe-Should-Retry")
+                retryable = (
+                    should_retry == "true"
+                    or (should_retry is None and response.status_code in RETRY_STATUSES)
+                )
+                if response.status_code < 400:
+                    return response.json()
+                if last_attempt or not retryable:
+                    try:
+                        message = response.json()["error"]["message"]
+                    except (ValueError, KeyError, TypeError):
+                        message = response.text
+                    raise PaymentProviderError(message, response.status_code)
+            await asyncio.sleep(min(0.5 * 2 ** attempt, 8) * random.uniform(0.5, 1.0))
+        raise AssertionError("unreachable")
+
+    async def create_payment_intent(
+        self,
+        amount_cents: int,
+        metadata: dict[str, str],
+        idempotency_key: str,
+        currency: str = "usd",
+    ) -> dict[str, Any]:
+        """Create a Payment Intent (idempotent per key)."""
+        return await self._request(
+            "POST",
+            "/v1/payment_intents",
+            {"amount": amount_cents, "currency": currency, "metadata": metadata},
+            idempotency_key=idempotency_key,
+        )
+
+    async def get_payment_intent(self, payment_intent_id: str) -> dict[str, Any]:
+        """Retrieve a Payment Intent."""
+        return await self._request("GET", f"/v1/payment_intents/{payment_intent_id}")
+
+    async def cancel_payment_intent(self, payment_intent_id: str) -> dict[str, Any]:
+        """Cancel a Payment Intent."""
+        return await self._request(
+            "POST",
+            f"/v1/payment_intents/{payment_intent_id}/cancel",
+            idempotency_key=f"cancel-{payment_intent_id}",
+        )
+
+    async def create_refund(
+        self,
+        charge_id: str,
+        idempotency_key: str,
+        amount_cents: Optional[int] = None,
+    ) -> dict[str, Any]:
+        """Create a refund for a charge (idempotent per key; reuse it when retrying the refund)."""
+        return await self._request(
+            "POST",
+            "/v1/refunds",
+            {"charge": charge_id, "amount": amount_cents},
+            idempotency_key=idempotency_key,
+        )
+
+
+_client: Optional[StripeClient] = None
+
+
+def get_stripe_client() -> StripeClient:
+    """The process-wide client, created on first use."""
+    global _client
+    if _client is None:
+        _client = StripeClient()
+    return _client
+
+
+async def close_stripe_client() -> None:
+    """Close the pooled connections (app shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
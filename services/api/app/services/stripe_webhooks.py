@@ -0,0 +1,169 @@
+"""Inbox-based Stripe webhook processing.
+
+The webhook endpoint only verifies an event and records it in
+`stripe_webhook_events` (deduplicated by Stripe's event ID). A pool of
+worker threads applies recorded events: a worker claims the oldest pending
+event of a payment intent with SKIP LOCKED, and only the oldest, so events
+for one intent are applied in order while different intents proceed in
+parallel.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Optional
+from uuid import UUID
+
+from sqlalchemy import exists, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, aliased
+
+from ..database import SessionLocal
+from ..models import StripeWebhookEvent
+from .ticket_holds import convert_hold, release_hold
+from .ticket_inventory import sell_one, transition_payment
+
+logger = logging.getLogger(__name__)
+
+HANDLED_TYPES = {"payment_intent.succeeded", "payment_intent.payment_failed"}
+WORKERS = int(os.getenv("STRIPE_WEBHOOK_WORKERS", "4"))
+POLL_SECONDS = float(os.getenv("STRIPE_WEBHOOK_POLL_SECONDS", "1"))
+MAX_ATTEMPTS = 8
+MAX_BACKOFF_SECONDS = 300
+
+
+def record_event(db: Session, event: dict[str, Any]) -> bool:
+    """Store a verified event unless it was already received; returns True if new."""
+    obj = event["data"]["object"]
+    stmt = (
+        insert(StripeWebhookEvent)
+        .values(
+            event_id=event["id"],
+            type=event["type"],
+            payment_intent_id=obj.get("id") if obj.get("object") == "payment_intent" else None,
+            payload=obj,
+            stripe_created=datetime.utcfromtimestamp(event["created"]),
+            received_at=datetime.utcnow(),
+        )
+        .on_conflict_do_nothing(index_elements=[StripeWebhookEvent.event_id])
+        .returning(StripeWebhookEvent.event_id)
+    )
+    inserted = db.execute(stmt).scalar() is not None
+    db.commit()
+    return inserted
+
+
+def apply_event(db: Session, event_type: str, payment_intent: dict[str, Any]) -> None:
+    """Apply one payment-intent event to payments and inventory (caller commits)."""
+    payment_id = (payment_intent.get("metadata") or {}).get("payment_id")
+    if not payment_id:
+        return
+
+    if event_type == "payment_intent.succeeded":
+        # Conditional transitions make repeated events no-ops
+        payment = transition_payment(db, UUID(payment_id), "pending", "succeeded")
+        if payment and not convert_hold(db, payment.id):
+            # The hold expired first, so the sale needs a free ticket
+            if sell_one(db, payment.ticket_id) is None:
+                # Paid after the last ticket went; needs a refund
+                transition_payment(db, payment.id, "succeeded", "oversold")
+
+    elif event_type == "payment_intent.payment_failed":
+        if transition_payment(db, UUID(payment_id), "pending", "failed"):
+            release_hold(db, UUID(payment_id))
+
+
+def _claim_next(db: Session) -> Optional[StripeWebhookEvent]:
+    """Lock the oldest ready event that is first in line for its payment intent."""
+    earlier = aliased(StripeWebhookEvent)
+    now = datetime.utcnow()
+    return db.execute(
+        select(StripeWebhookEvent)
+        .where(
+            StripeWebhookEvent.processed_at.is_(None),
+            or_(StripeWebhookEvent.next_attempt_at.is_(None), StripeWebhookEvent.next_attempt_at <= now),
+            ~exists().where(
+                earlier.payment_intent_id == StripeWebhookEvent.payment_intent_id,
+                earlier.processed_at.is_(None),
+                tuple_(earlier.stripe_created, earlier.event_id)
+                < tuple_(StripeWebhookEvent.stripe_created, StripeWebhookEvent.event_id),
+            ),
+        )
+        .order_by(StripeWebhookEvent.stripe_created)
+        .limit(1)
+        .with_for_update(skip_locked=True, of=StripeWebhookEvent)
+    ).scalars().first()
+
+
+def process_next(db: Session) -> bool:
+    """Apply one pending event; returns False when nothing was ready.
+
+    A failing event is retried with exponential backoff (holding back later
+    events for the same intent) and given up on after `MAX_ATTEMPTS`.
+    """
+    event = _claim_next(db)
+    if event is None:
+        db.commit()
+        return False
+
+    now = datetime.utcnow()
+    try:
+        with db.begin_nested():
+            apply_event(db, event.type, event.payload)
+        event.processed_at = now
+    except Exception as exc:
+        event.attempts += 1
+        event.last_error = repr(exc)
+        if event.attempts >= MAX_ATTEMPTS:
+            event.processed_at = now
+            logger.error("stripe webhook %s: giving up after %d attempts", event.event_id, event.attempts)
+        else:
+            event.next_attempt_at = now + timedelta(seconds=min(2 ** event.attempts, MAX_BACKOFF_SECONDS))
+            logger.warning("stripe webhook %s: attempt %d failed: %r", event.event_id, event.attempts, exc)
+    db.commit()
+    return True
+
+
+class WebhookWorkers:
+    """Thread pool draining the webhook inbox; woken on new events, polling otherwise."""
+
+    def __init__(self, workers: int = WORKERS):
+        self._workers = workers
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        self._stopping.clear()
+        for index in range(self._workers):
+            thread = threading.Thread(target=self._run, name=f"stripe-webhooks-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                with SessionLocal() as db:
+                    processed = process_next(db)
+            except Exception:
+                logger.exception("stripe webhook worker failed")
+                processed = False
+            if not processed:
+                self._wake.wait(POLL_SECONDS)
+                self._wake.clear()
+
+
+webhook_workers = WebhookWorkers()
@@ -0,0 +1,163 @@
+"""Delta sync feed: rows changed since a client's watermark, as NDJSON.
+
+Each syncable table is walked in `(updated_at, id)` order from the
+client's position for that table, in keyset pages. Live rows are sent in
+full; soft-deleted rows go out as tombstones carrying only their ID. The
+last line is the new watermark, which the client sends back as `since`.
+
+The feed is scoped to the caller: places and vibes are shared catalogs,
+events are the discoverable ones plus those the caller belongs to or is
+invited to, and members, invites and media only come from events the
+caller belongs to (plus the caller's own invites and profile media).
+Invite tokens are never included. Rows that drop out of scope (for
+example after leaving an event) produce no tombstone.
+
+`updated_at` is stamped by the application before commit, so a
+transaction can become visible with a timestamp older than rows already
+read. Rows newer than `SAFETY_LAG_SECONDS` are therefore held back until
+a later call, which covers transactions shorter than the lag.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, Mapping, Optional
+from uuid import UUID
+
+from pydantic import TypeAdapter
+from sqlalchemy import or_, select, true, tuple_
+from sqlalchemy.sql.elements import ColumnElement
+
+from ..database import Base, SessionLocal
+from ..models import EventItem as EventItemModel, Invite as InviteModel, Media as MediaModel
+from ..models import Member as MemberModel, Place as PlaceModel, Vibe as VibeModel
+from ..pagination import encode_watermark
+from ..schemas import EventItem, Invite, Media, Member, Place, Vibe
+
+SAFETY_LAG_SECONDS = float(os.getenv("SYNC_SAFETY_LAG_SECONDS", "5"))
+PAGE_SIZE = 500
+DEFAULT_LIMIT = 5000  # rows per type per call
+DIRECT_INVITES_VISIBILITY = 0  # EventVisibility.directInvites: not discoverable
+
+
+def _member_event_ids(user_id: UUID):
+    return select(MemberModel.event_id).where(MemberModel.user_id == user_id, MemberModel.deleted_at.is_(None))
+
+
+def _visible_events(user_id: UUID) -> ColumnElement:
+    invited = select(InviteModel.event_id).where(InviteModel.user_id == user_id, InviteModel.deleted_at.is_(None))
+    return or_(
+        EventItemModel.visibility_raw != DIRECT_INVITES_VISIBILITY,
+        EventItemModel.id.in_(_member_event_ids(user_id)),
+        EventItemModel.id.in_(invited),
+    )
+
+
+@dataclass(frozen=True)
+class SyncType:
+    model: type[Base]
+    adapter: TypeAdapter
+    scope: Callable[[UUID], ColumnElement] = lambda user_id: true()
+    exclude: Optional[set[str]] = None  # fields never sent
+
+
+SYNC_TYPES: dict[str, SyncType] = {
+    "places": SyncType(PlaceModel, TypeAdapter(Place)),
+    "vibes": SyncType(VibeModel, TypeAdapter(Vibe)),
+    "events": SyncType(EventItemModel, TypeAdapter(EventItem), _visible_events),
+    "members": SyncType(
+        MemberModel,
+        TypeAdapter(Member),
+        lambda user_id: MemberModel.event_id.in_(_member_event_ids(user_id)),
+    ),
+    "invites": SyncType(
+        InviteModel,
+        TypeAdapter(Invite),
+        lambda user_id: or_(InviteModel.user_id == user_id, InviteModel.event_id.in_(_member_event_ids(user_id))),
+        exclude={"token"},
+    ),
+    "media": SyncType(
+        MediaModel,
+        TypeAdapter(Media),
+        lambda user_id: or_(
+            MediaModel.event_id.in_(_member_event_ids(user_id)),
+            MediaModel.user_profile_id == user_id,
+            MediaModel.public_profile_id == user_id,
+        ),
+    ),
+}
+
+_line = TypeAdapter(dict)  # tombstones and the watermark line
+
+
+def stream_changes(
+    user_id: UUID,
+    types: list[str],
+    since: Mapping[str, tuple[datetime, UUID]],
+    *,
+    limit: int = DEFAULT_LIMIT,
+    safety_lag: timedelta = timedelta(seconds=SAFETY_LAG_SECONDS),
+) -> Iterator[bytes]:
+    """Yield NDJSON lines for every change visible to `user_id` after `since`, ending with the new watermark.
+
+    Runs in a worker thread under `StreamingResponse` and uses its own
+    session, since it outlives the request's dependencies.
+    """
+    horizon = datetime.utcnow() - safety_lag
+    positions = dict(since)
+    has_more = False
+
+    with SessionLocal() as db:
+        for name in types:
+            sync_type = SYNC_TYPES[name]
+            model = sync_type.model
+            adapter = sync_type.adapter
+            prefix = b'{"type":"' + name.encode() + b'",'
+            position: Optional[tuple[datetime, UUID]] = positions.get(name)
+            sent = 0
+
+            while sent < limit:
+                page_size = min(PAGE_SIZE, limit - sent)
+                query = (
+                    select(model)
+                    .where(model.updated_at < horizon, sync_type.scope(user_id))
+                    .order_by(model.updated_at, model.id)
+                    .limit(page_size)
+                )
+                if position is not None:
+                    query = query.where(tuple_(model.updated_at, model.id) > position)
+                rows = db.execute(query).scalars().all()
+                if not rows:
+                    break
+
+                chunk = []
+                for row in rows:
+                    if row.deleted_at is not None:
+                        chunk.append(
+                            _line.dump_json({"type": name, "op": "delete", "id": row.id, "deleted_at": row.deleted_at})
+                        )
+                    else:
+                        chunk.append(
+                            prefix
+                            + b'"op":"upsert","data":'
+                            + adapter.dump_json(
+                                adapter.validate_python(row, from_attributes=True), exclude=sync_type.exclude
+                            )
+                            + b"}"
+                        )
+                yield b"\n".join(chunk) + b"\n"
+
+                sent += len(rows)
+                position = (rows[-1].updated_at, rows[-1].id)
+                positions[name] = position
+                # Keep the transaction short between pages
+                db.commit()
+                if len(rows) < page_size:
+                    break
+            else:
+                # Stopped at the limit rather than running out of rows
+                has_more = True
+
+    yield _line.dump_json({"op": "watermark", "watermark": encode_watermark(positions), "has_more": has_more}) + b"\n"
@@ -0,0 +1,187 @@
+"""Short-lived per-worker caches of ticket availability.
+
+Per-ticket entries serve the purchase page; per-event snapshots (all
+unexpired tiers, pre-serialized) serve event pages. Inventory changes made
+in this process invalidate both as soon as they commit; the TTL bounds how
+stale another worker's changes can look. Expired entries are swept out when
+new ones are stored, so the caches only hold recently read tickets and events.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+
+from pydantic import TypeAdapter
+from sqlalchemy import event, or_, select
+from sqlalchemy.orm import Session, SessionTransaction
+
+from ..models import Ticket
+from ..schemas import TicketAvailability, TicketTierAvailability
+
+AVAILABILITY_TTL_SECONDS = float(os.getenv("TICKET_AVAILABILITY_TTL_SECONDS", "1"))
+SWEEP_INTERVAL_SECONDS = 60.0
+_PENDING_KEY = "ticket_availability_pending"  # in `Session.info`
+
+_tier_list = TypeAdapter(List[TicketTierAvailability])
+
+
+class TicketAvailabilityCache:
+    """`quantity - sold - held` per ticket and per event, cached briefly."""
+
+    def __init__(self, ttl_seconds: float = AVAILABILITY_TTL_SECONDS):
+        self._ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: dict[UUID, tuple[float, TicketAvailability]] = {}
+        # Snapshot time, body and the tiers it covers
+        self._events: dict[UUID, tuple[float, bytes, tuple[UUID, ...]]] = {}
+        # Only for tickets with a cached entry or in a cached snapshot
+        self._event_of: dict[UUID, UUID] = {}
+        self._last_sweep = time.monotonic()
+        # Bumped by every invalidation; a read that overlapped one doesn't store its result
+        self._generation = 0
+
+    def invalidate(self, ticket_id: Optional[UUID] = None) -> None:
+        """Drop a ticket's entry and its event's snapshot (everything if None)."""
+        with self._lock:
+            self._generation += 1
+            if ticket_id is None:
+                self._entries.clear()
+                self._events.clear()
+                self._event_of.clear()
+                return
+            event_id = self._event_of.get(ticket_id)
+            self._drop_entry(ticket_id)
+            if event_id is not None:
+                self._drop_event(event_id)
+
+    def invalidate_event(self, event_id: UUID) -> None:
+        """Drop an event's snapshot (e.g. after a tier is added)."""
+        with self._lock:
+            self._generation += 1
+            self._drop_event(event_id)
+
+    def invalidate_after_commit(self, db: Session, ticket_id: UUID) -> None:
+        """Invalidate `ticket_id` once `db`'s transaction ends, so no reader can re-cache the old row."""
+        db.info.setdefault(_PENDING_KEY, set()).add(ticket_id)
+
+    # The helpers below expect `self._lock` to be held
+
+    def _forget_if_uncached(self, ticket_id: UUID) -> None:
+        event_id = self._event_of.get(ticket_id)
+        if ticket_id not in self._entries and event_id not in self._events:
+            self._event_of.pop(ticket_id, None)
+
+    def _drop_entry(self, ticket_id: UUID) -> None:
+        if self._entries.pop(ticket_id, None) is not None:
+            self._forget_if_uncached(ticket_id)
+
+    def _drop_event(self, event_id: UUID) -> None:
+        snapshot = self._events.pop(event_id, None)
+        if snapshot is not None:
+            for ticket_id in snapshot[2]:
+                self._forget_if_uncached(ticket_id)
+
+    def _sweep(self, now: float) -> None:
+        """Drop expired entries and snapshots, at most once per `SWEEP_INTERVAL_SECONDS`."""
+        if now - self._last_sweep < SWEEP_INTERVAL_SECONDS:
+            return
+        self._last_sweep = now
+        for ticket_id in [key for key, entry in self._entries.items() if now - entry[0] >= self._ttl]:
+            self._drop_entry(ticket_id)
+        for event_id in [key for key, entry in self._events.items() if now - entry[0] >= self._ttl]:
+            self._drop_event(event_id)
+
+    def get(self, db: Session, ticket_id: UUID) -> Optional[TicketAvailability]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(ticket_id)
+            generation = self._generation
+        if entry is not None and now - entry[0] < self._ttl:
+            return entry[1]
+
+        row = db.execute(
+            select(Ticket.event_id, Ticket.quantity, Ticket.sold, Ticket.held).where(Ticket.id == ticket_id)
+        ).first()
+        if row is None:
+            return None
+        availability = TicketAvailability(
+            ticket_id=ticket_id,
+            event_id=row.event_id,
+            quantity=row.quantity,
+            sold=row.sold,
+            held=row.held,
+            available=max(row.quantity - row.sold - row.held, 0),
+        )
+        with self._lock:
+            if generation != self._generation:
+                return availability
+            self._sweep(now)
+            self._entries[ticket_id] = (now, availability)
+            self._event_of[ticket_id] = row.event_id
+        return availability
+
+    def get_event(self, db: Session, event_id: UUID) -> bytes:
+        """JSON list of an event's unexpired tiers with availability."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._events.get(event_id)
+            generation = self._generation
+        if entry is not None and now - entry[0] < self._ttl:
+            return entry[1]
+
+        rows = db.execute(
+            select(
+                Ticket.id,
+                Ticket.name,
+                Ticket.price_cents,
+                Ticket.expires_at,
+                Ticket.quantity,
+                Ticket.sold,
+                Ticket.held,
+            )
+            .where(
+                Ticket.event_id == event_id,
+                or_(Ticket.expires_at.is_(None), Ticket.expires_at > datetime.utcnow()),
+            )
+            .order_by(Ticket.price_cents, Ticket.id)
+        ).all()
+        tiers = [
+            TicketTierAvailability(
+                ticket_id=row.id,
+                event_id=event_id,
+                name=row.name,
+                price_cents=row.price_cents,
+                expires_at=row.expires_at,
+                quantity=row.quantity,
+                sold=row.sold,
+                held=row.held,
+                available=max(row.quantity - row.sold - row.held, 0),
+            )
+            for row in rows
+        ]
+        body = _tier_list.dump_json(tiers)
+        with self._lock:
+            if generation != self._generation:
+                return body
+            self._sweep(now)
+            self._drop_event(event_id)
+            self._events[event_id] = (now, body, tuple(row.id for row in rows))
+            for row in rows:
+                self._event_of[row.id] = event_id
+        return body
+
+
+ticket_availability = TicketAvailabilityCache()
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _invalidate_when_transaction_ends(session: Session, transaction: SessionTransaction) -> None:
+    # Only the outermost transaction; after a rollback the extra invalidation is harmless
+    if transaction.parent is None:
+        for ticket_id in session.info.pop(_PENDING_KEY, ()):
+            ticket_availability.invalidate(ticket_id)
@@ -0,0 +1,162 @@
+"""Time-limited ticket holds for pending payments.
+
+A hold is a `ticket_holds` row plus one unit of `tickets.held`, taken in
+the same transaction with a conditional UPDATE, so availability is always
+`quantity - sold - held` on a single row.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models import Ticket, TicketHold
+from .ticket_availability import ticket_availability
+
+logger = logging.getLogger(__name__)
+
+HOLD_TTL = timedelta(seconds=float(os.getenv("TICKET_HOLD_TTL_SECONDS", "600")))
+SWEEP_INTERVAL_SECONDS = float(os.getenv("TICKET_HOLD_SWEEP_SECONDS", "30"))
+DEFAULT_BATCH_SIZE = 1000
+
+
+def place_hold(
+    db: Session,
+    ticket_id: UUID,
+    payment_id: UUID,
+    user_id: UUID,
+    ttl: timedelta = HOLD_TTL,
+) -> Optional[TicketHold]:
+    """Reserve one ticket for `payment_id`; returns None when none are left.
+
+    The caller commits (the payment row must be flushed first).
+    """
+    reserved = db.execute(
+        update(Ticket)
+        .where(Ticket.id == ticket_id, Ticket.sold + Ticket.held < Ticket.quantity)
+        .values(held=Ticket.held + 1, updated_at=datetime.utcnow())
+        .returning(Ticket.id)
+    ).scalar()
+    if reserved is None:
+        return None
+
+    hold = TicketHold(
+        ticket_id=ticket_id,
+        payment_id=payment_id,
+        user_id=user_id,
+        expires_at=datetime.utcnow() + ttl,
+    )
+    db.add(hold)
+    ticket_availability.invalidate_after_commit(db, ticket_id)
+    return hold
+
+
+def _drop_hold(db: Session, payment_id: UUID) -> Optional[UUID]:
+    """Delete the hold for a payment, returning its ticket ID if there was one."""
+    return db.execute(
+        delete(TicketHold)
+        .where(TicketHold.payment_id == payment_id)
+        .returning(TicketHold.ticket_id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+
+
+def convert_hold(db: Session, payment_id: UUID) -> bool:
+    """Turn a payment's hold into a sale; False if it had already expired (caller commits)."""
+    ticket_id = _drop_hold(db, payment_id)
+    if ticket_id is None:
+        return False
+    db.execute(
+        update(Ticket)
+        .where(Ticket.id == ticket_id)
+        .values(held=Ticket.held - 1, sold=Ticket.sold + 1, updated_at=datetime.utcnow())
+    )
+    ticket_availability.invalidate_after_commit(db, ticket_id)
+    return True
+
+
+def release_hold(db: Session, payment_id: UUID) -> bool:
+    """Give a payment's held ticket back to inventory (caller commits)."""
+    ticket_id = _drop_hold(db, payment_id)
+    if ticket_id is None:
+        return False
+    db.execute(
+        update(Ticket)
+        .where(Ticket.id == ticket_id)
+        .values(held=Ticket.held - 1, updated_at=datetime.utcnow())
+    )
+    ticket_availability.invalidate_after_commit(db, ticket_id)
+    return True
+
+
+def sweep_expired_holds(db: Session, *, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Release expired holds in committed batches; returns how many were released.
+
+    Holds are claimed with SKIP LOCKED so sweepers on several workers split
+    the work, and each batch decrements `held` once per affected ticket (in
+    ticket order, so concurrent batches can't deadlock).
+    """
+    released = 0
+    while True:
+        expired = (
+            select(TicketHold.id)
+            .where(TicketHold.expires_at < datetime.utcnow())
+            .order_by(TicketHold.expires_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        ticket_ids = db.execute(
+            delete(TicketHold)
+            .where(TicketHold.id.in_(expired))
+            .returning(TicketHold.ticket_id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        if not ticket_ids:
+            db.commit()
+            return released
+
+        for ticket_id, count in sorted(Counter(ticket_ids).items()):
+            db.execute(
+                update(Ticket)
+                .where(Ticket.id == ticket_id)
+                .values(held=Ticket.held - count, updated_at=datetime.utcnow())
+            )
+        db.commit()
+        for ticket_id in set(ticket_ids):
+            ticket_availability.invalidate(ticket_id)
+        released += len(ticket_ids)
+        if len(ticket_ids) < batch_size:
+            return released
+
+
+def sweep_job() -> int:
+    """Periodic-job entry point with a session of its own."""
+    with SessionLocal() as session:
+        return sweep_expired_holds(session)
+
+
+def run_cli() -> None:
+    """CLI entry point used to release expired holds by hand."""
+    parser = argparse.ArgumentParser(description="Release expired ticket holds.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    started = time.monotonic()
+    with SessionLocal() as session:
+        released = sweep_expired_holds(session, batch_size=args.batch_size)
+    print(f"Released expired ticket holds (released={released}, elapsed={time.monotonic() - started:.3f}s)")
+
+
+if __name__ == "__main__":
+    run_cli()
@@ -0,0 +1,70 @@
+"""Atomic ticket inventory changes.
+
+Every change is one conditional UPDATE, so concurrent buyers contend on the
+ticket row only for the duration of that statement and the `sold + held <=
+quantity` invariant holds without reading the row first.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from ..models import Payment, Ticket
+from .ticket_availability import ticket_availability
+
+
+def sell_one(db: Session, ticket_id: UUID) -> Optional[int]:
+    """Count one sale without a hold; returns the new `sold`, or None when sold out.
+
+    Seats held for other buyers are not available. The caller commits.
+    """
+    ticket_availability.invalidate_after_commit(db, ticket_id)
+    return db.execute(
+        update(Ticket)
+        .where(Ticket.id == ticket_id, Ticket.sold + Ticket.held < Ticket.quantity)
+        .values(sold=Ticket.sold + 1, updated_at=datetime.utcnow())
+        .returning(Ticket.sold)
+    ).scalar()
+
+
+def unsell_one(db: Session, ticket_id: UUID) -> Optional[int]:
+    """Return one sale to inventory (e.g. a refund); never drops below zero."""
+    ticket_availability.invalidate_after_commit(db, ticket_id)
+    return db.execute(
+        update(Ticket)
+        .where(Ticket.id == ticket_id, Ticket.sold > 0)
+        .values(sold=Ticket.sold - 1, updated_at=datetime.utcnow())
+        .returning(Ticket.sold)
+    ).scalar()
+
+
+def set_quantity(db: Session, ticket_id: UUID, quantity: int) -> bool:
+    """Change a ticket's quantity unless it would fall below what is sold or held."""
+    ticket_availability.invalidate_after_commit(db, ticket_id)
+    updated = db.execute(
+        update(Ticket)
+        .where(Ticket.id == ticket_id, Ticket.sold + Ticket.held <= quantity)
+        .values(quantity=quantity, updated_at=datetime.utcnow())
+        .returning(Ticket.id)
+    ).scalar()
+    return updated is not None
+
+
+def transition_payment(db: Session, payment_id: UUID, from_status: str, to_status: str) -> Optional[Payment]:
+    """Move a payment between statuses only if it is still in `from_status`.
+
+    Returns the updated payment, or None if another request (or a retried
+    webhook) got there first.
+    """
+    return db.execute(
+        update(Payment)
+        .where(Payment.id == payment_id, Payment.status == from_status)
+        .values(status=to_status, updated_at=datetime.utcnow())
+        .returning(Payment)
+        .execution_options(synchronize_session=False)
+    ).scalars().first()
@@ -0,0 +1,96 @@
+"""In-process cache of the serialized vibe catalog, versioned through the database."""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..etag import compute_etag
+from ..models import CatalogVersion, Vibe as VibeModel
+from ..schemas import Vibe
+
+CATALOG_NAME = "vibes"
+
+# How long a worker trusts its cached version before re-reading the version
+# row; bounds how stale other workers' writes can look.
+VERSION_CHECK_SECONDS = float(os.getenv("VIBE_CATALOG_CHECK_SECONDS", "5"))
+
+_vibe_list = TypeAdapter(List[Vibe])
+
+
+def bump_catalog_version(db: Session) -> None:
+    """Mark the vibe catalog as changed for every worker (caller commits)."""
+    now = datetime.utcnow()
+    stmt = insert(CatalogVersion).values(name=CATALOG_NAME, version=1, updated_at=now)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CatalogVersion.name],
+        set_={"version": CatalogVersion.version + 1, "updated_at": now},
+    )
+    db.execute(stmt)
+
+
+class VibeCatalog:
+    """Pre-serialized `GET /vibes` responses and their ETags, keyed by the catalog version.
+
+    Between version checks a request is answered from memory without touching
+    the database, including `If-None-Match` revalidation.
+    """
+
+    def __init__(self, check_seconds: float = VERSION_CHECK_SECONDS):
+        self._check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._entries: dict[tuple[bool, bool], tuple[str, bytes]] = {}
+
+    def invalidate(self) -> None:
+        """Force a version check on the next read (call after committing a bump)."""
+        with self._lock:
+            self._checked_at = 0.0
+
+    def _current_version(self, db: Session) -> int:
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self._check_seconds:
+            return self._version
+
+        version = db.execute(
+            select(CatalogVersion.version).where(CatalogVersion.name == CATALOG_NAME)
+        ).scalar() or 0
+        with self._lock:
+            if version != self._version:
+                self._entries = {}
+                self._version = version
+            self._checked_at = now
+        return version
+
+    def get(self, db: Session, active_only: bool, system_only: bool) -> tuple[str, bytes]:
+        """Return `(etag, json_body)` for a catalog listing."""
+        version = self._current_version(db)
+        key = (active_only, system_only)
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+
+        query = db.query(VibeModel).filter(VibeModel.deleted_at.is_(None))
+        if active_only:
+            query = query.filter(VibeModel.is_active == True)
+        if system_only:
+            query = query.filter(VibeModel.system_defined == True)
+
+        body = _vibe_list.dump_json(_vibe_list.validate_python(query.all(), from_attributes=True))
+        entry = (compute_etag(body), body)
+        with self._lock:
+            if self._version == version:
+                self._entries[key] = entry
+        return entry
+
+
+vibe_catalog = VibeCatalog()
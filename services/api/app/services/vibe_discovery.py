@@ -0,0 +1,90 @@
+"""Vibe-based event discovery: tag filters and per-vibe upcoming-event counts."""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import Select, func, select
+from sqlalchemy.orm import Session
+
+from ..models import EventItem, Vibe, event_vibes
+
+# Per-worker lifetime of the cached counts; writes on this worker invalidate
+# immediately, writes on other workers show up within this window.
+COUNTS_TTL_SECONDS = float(os.getenv("VIBE_EVENT_COUNTS_TTL_SECONDS", "60"))
+
+
+def upcoming_event_filter(now: datetime) -> list:
+    """Criteria for upcoming events (same as `GET /events?status=upcoming`)."""
+    return [
+        EventItem.deleted_at.is_(None),
+        EventItem.start_time > now,
+        EventItem.schedule_status_raw != 2,  # not cancelled
+        EventItem.schedule_status_raw != 3,  # not ended
+    ]
+
+
+def events_tagged_with(slugs: Iterable[str], match: str = "any") -> Select:
+    """Select event IDs tagged with any (or all) of the given vibe slugs.
+
+    Runs entirely on the `(vibe_id, event_id)` index of `event_vibes`; "all"
+    intersects by counting matched vibes per event.
+    """
+    slugs = set(slugs)
+    vibe_ids = select(Vibe.id).where(
+        Vibe.slug.in_(slugs),
+        Vibe.deleted_at.is_(None),
+        Vibe.is_active == True,
+    )
+    stmt = select(event_vibes.c.event_id).where(event_vibes.c.vibe_id.in_(vibe_ids))
+    if match == "all":
+        stmt = stmt.group_by(event_vibes.c.event_id).having(func.count() == len(slugs))
+    return stmt
+
+
+class VibeEventCounts:
+    """Cached upcoming-event counts per vibe for the vibe picker."""
+
+    def __init__(self, ttl_seconds: float = COUNTS_TTL_SECONDS):
+        self._ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._counts: Optional[list[dict]] = None
+        self._loaded_at = 0.0
+
+    def invalidate(self) -> None:
+        """Drop the cached counts (call after committing an event/vibe change)."""
+        with self._lock:
+            self._counts = None
+
+    def get(self, db: Session) -> list[dict]:
+        counts = self._counts
+        if counts is not None and time.monotonic() - self._loaded_at < self._ttl_seconds:
+            return counts
+
+        rows = db.execute(
+            select(Vibe.id, Vibe.slug, Vibe.name, func.count(EventItem.id))
+            .join(event_vibes, event_vibes.c.vibe_id == Vibe.id)
+            .join(EventItem, EventItem.id == event_vibes.c.event_id)
+            .where(
+                Vibe.deleted_at.is_(None),
+                Vibe.is_active == True,
+                *upcoming_event_filter(datetime.utcnow()),
+            )
+            .group_by(Vibe.id, Vibe.slug, Vibe.name)
+            .order_by(func.count(EventItem.id).desc(), Vibe.slug)
+        ).all()
+        counts = [
+            {"vibe_id": vibe_id, "slug": slug, "name": name, "upcoming_events": count}
+            for vibe_id, slug, name, count in rows
+        ]
+        with self._lock:
+            self._counts = counts
+            self._loaded_at = time.monotonic()
+        return counts
+
+
+vibe_event_counts = VibeEventCounts()
@@ -2,78 +2,143 @@
 
 from __future__ import annotations
 
-from typing import Iterable, Mapping
+import hashlib
+import json
+import uuid
+from datetime import datetime
 
+from sqlalchemy import func, literal_column, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
 from ..database import SessionLocal
-from ..models import Vibe
+from ..models import CatalogVersion, Vibe
 from ..seed_data import DEFAULT_VIBES
+from .vibe_catalog import CATALOG_NAME, bump_catalog_version, vibe_catalog
+
+# Bump when the way seed rows are applied changes, so every environment
+# re-runs the upsert even though DEFAULT_VIBES itself did not change.
+SEED_FORMAT_VERSION = 1
+
+
+def default_vibes_hash() -> str:
+    """Stable content hash of the canonical seed list."""
+    canonical = json.dumps(
+        {"format": SEED_FORMAT_VERSION, "vibes": DEFAULT_VIBES},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _stored_seed_hash(db: Session) -> str | None:
+    return db.execute(
+        select(CatalogVersion.seed_hash).where(CatalogVersion.name == CATALOG_NAME)
+    ).scalar()
+
+
+def _record_seed_hash(db: Session, seed_hash: str) -> None:
+    stmt = insert(CatalogVersion).values(
+        name=CATALOG_NAME, version=0, seed_hash=seed_hash, updated_at=datetime.utcnow()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CatalogVersion.name],
+        set_={"seed_hash": stmt.excluded.seed_hash},
+    )
+    db.execute(stmt)
+
+
+def upsert_default_vibes(
+    db: Session, *, commit: bool = True, track_catalog: bool = True
+) -> dict[str, int]:
+    """Ensure every default vibe exists as a system-defined row.
+
+    Applies the whole seed list with one `INSERT ... ON CONFLICT (slug) DO
+    UPDATE` that only touches rows that differ, plus one `UPDATE` that
+    inactivates system vibes dropped from the list. With `track_catalog`,
+    the seed list's hash is stored next to the catalog version and the work
+    is skipped entirely while it is unchanged, so every worker starting at
+    once costs a single-row read. Migrations that run before
+    `catalog_versions` exists turn it off.
+    """
+    summary = {"inserted": 0, "updated": 0, "inactivated": 0}
+    seed_hash = default_vibes_hash()
+
+    if track_catalog:
+        if _stored_seed_hash(db) == seed_hash:
+            return summary
+        # Serialize concurrent cold starts; later workers see the new hash.
+        db.execute(select(func.pg_advisory_xact_lock(func.hashtext("upsert_default_vibes"))))
+        if _stored_seed_hash(db) == seed_hash:
+            if commit:
+                db.commit()
+            return summary
+
+    vibes = Vibe.__table__
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "name": payload["name"],
+            "slug": payload["slug"],
+            "category_raw": payload["category_raw"],
+            "system_defined": True,
+            "is_active": payload["is_active"],
+            "created_at": now,
+            "updated_at": now,
+        }
+        for payload in DEFAULT_VIBES
+    ]
+
+    stmt = insert(vibes).values(rows)
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[vibes.c.slug],
+        set_={
+            "name": excluded.name,
+            "category_raw": excluded.category_raw,
+            "is_active": excluded.is_active,
+            "system_defined": True,
+            "deleted_at": None,
+            "updated_at": excluded.updated_at,
+        },
+        where=or_(
+            vibes.c.name != excluded.name,
+            vibes.c.category_raw != excluded.category_raw,
+            vibes.c.is_active != excluded.is_active,
+            vibes.c.deleted_at.is_not(None),
+            vibes.c.system_defined.is_(False),
+        ),
+    ).returning(literal_column("xmax = 0").label("inserted"))
+
+    # Only inserted rows and rows that actually changed come back.
+    for (was_inserted,) in db.execute(stmt):
+        summary["inserted" if was_inserted else "updated"] += 1
 
-
-def upsert_default_vibes(db: Session, *, commit: bool = True) -> dict[str, int]:
-    """Ensure every default vibe exists as a system-defined row."""
-    existing = {
-        vibe.slug: vibe
-        for vibe in db.query(Vibe).filter(Vibe.system_defined.is_(True))
-    }
-    desired_slugs = set()
-    inserted = 0
-    updated = 0
-    inactivated = 0
-
-    for payload in DEFAULT_VIBES:
-        slug = payload["slug"]
-        desired_slugs.add(slug)
-        vibe = existing.get(slug)
-
-        if vibe:
-            changed = False
-            if (
-                vibe.name != payload["name"]
-                or vibe.category_raw != payload["category_raw"]
-                or vibe.is_active != payload["is_active"]
-            ):
-                vibe.name = payload["name"]
-                vibe.category_raw = payload["category_raw"]
-                vibe.is_active = payload["is_active"]
-                changed = True
-
-            if vibe.deleted_at is not None:
-                vibe.deleted_at = None
-                changed = True
-
-            if not vibe.system_defined:
-                vibe.system_defined = True
-                changed = True
-
-            if changed:
-                updated += 1
-            continue
-
-        db.add(
-            Vibe(
-                name=payload["name"],
-                slug=slug,
-                category_raw=payload["category_raw"],
-                system_defined=True,
-                is_active=payload["is_active"],
-            )
+    # Inactivate system vibes that are no longer part of the canonical list.
+    result = db.execute(
+        update(vibes)
+        .where(
+            vibes.c.system_defined.is_(True),
+            vibes.c.is_active.is_(True),
+            vibes.c.slug.not_in([payload["slug"] for payload in DEFAULT_VIBES]),
         )
-        inserted += 1
+        .values(is_active=False, updated_at=now)
+    )
+    summary["inactivated"] = result.rowcount
 
-    # Inactivate system vibes that are no longer part of the canonical list.
-    for slug, vibe in existing.items():
-        if slug in desired_slugs:
-            continue
-        if vibe.is_active:
-            vibe.is_active = False
-            inactivated += 1
+    changed = any(summary.values())
+    if track_catalog:
+        _record_seed_hash(db, seed_hash)
+        if changed:
+            bump_catalog_version(db)
 
     if commit:
         db.commit()
+        if changed and track_catalog:
+            vibe_catalog.invalidate()
 
-    return {"inserted": inserted, "updated": updated, "inactivated": inactivated}
+    return summary
 
 
 def run_cli() -> None:
@@ -90,4 +155,3 @@ def run_cli() -> None:
 
 if __name__ == "__main__":
     run_cli()
-
@@ -0,0 +1,126 @@
+"""Hold many idle `GET /notifications/stream` connections against a running API.
+
+Measures what an idle stream costs a worker instead of assuming it: opens
+`--connections` streams, keeps them open for `--hold` seconds while
+heartbeats flow, and reports how many opened, how many stayed up, and
+(with `--pid`, on Linux) the worker's resident memory and open file
+descriptors before and after.
+
+    python scripts/sse_load.py --url http://localhost:8000 --connections 10000 --pid <worker pid>
+
+Run the API with a single worker (`uvicorn app.main:app --workers 1`) so
+the numbers are per worker, and raise `ulimit -n` on both sides first.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import resource
+import time
+from typing import Optional
+
+import httpx
+
+
+def _worker_stats(pid: Optional[int]) -> Optional[dict]:
+    if pid is None:
+        return None
+    rss_kb = 0
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                rss_kb = int(line.split()[1])
+    return {"rss_mb": round(rss_kb / 1024, 1), "fds": len(os.listdir(f"/proc/{pid}/fd"))}
+
+
+async def _hold_stream(client: httpx.AsyncClient, url: str, stop: asyncio.Event, counts: dict) -> None:
+    try:
+        async with client.stream("GET", url) as response:
+            if response.status_code != 200:
+                counts["failed"] += 1
+                return
+            counts["open"] += 1
+            try:
+                async for line in response.aiter_lines():
+                    if line.startswith(": heartbeat"):
+                        counts["heartbeats"] += 1
+                    elif line.startswith("event: resync"):
+                        counts["resyncs"] += 1
+                    if stop.is_set():
+                        return
+            finally:
+                counts["open"] -= 1
+                if not stop.is_set():
+                    counts["dropped"] += 1
+    except httpx.HTTPError:
+        counts["failed"] += 1
+
+
+async def run(url: str, connections: int, hold: float, ramp: float, pid: Optional[int]) -> dict:
+    stream_url = url.rstrip("/") + "/notifications/stream"
+    counts = {"open": 0, "failed": 0, "dropped": 0, "heartbeats": 0, "resyncs": 0}
+    before = _worker_stats(pid)
+    stop = asyncio.Event()
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=0)
+    timeout = httpx.Timeout(connect=30.0, read=None, write=30.0, pool=None)
+
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        tasks = []
+        started = time.monotonic()
+        for index in range(connections):
+            tasks.append(asyncio.create_task(_hold_stream(client, stream_url, stop, counts)))
+            # Spread connects over `ramp` seconds so the accept queue keeps up
+            if ramp and index % 100 == 99:
+                await asyncio.sleep(ramp * 100 / connections)
+        ramp_seconds = time.monotonic() - started
+
+        await asyncio.sleep(hold)
+        peak_open = counts["open"]
+        during = _worker_stats(pid)
+        stop.set()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    summary = {
+        "connections": connections,
+        "open_at_end_of_hold": peak_open,
+        "failed": counts["failed"],
+        "dropped": counts["dropped"],
+        "heartbeats": counts["heartbeats"],
+        "resyncs": counts["resyncs"],
+        "ramp_seconds": round(ramp_seconds, 1),
+        "hold_seconds": hold,
+    }
+    if before is not None:
+        summary["worker_before"] = before
+        summary["worker_during"] = during
+        if peak_open:
+            summary["worker_kb_per_stream"] = round((during["rss_mb"] - before["rss_mb"]) * 1024 / peak_open, 1)
+    return summary
+
+
+def run_cli() -> None:
+    parser = argparse.ArgumentParser(description="Hold idle notification streams open and report their cost")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--hold", type=float, default=60.0, help="Seconds to keep every stream open")
+    parser.add_argument("--ramp", type=float, default=10.0, help="Seconds over which to open the streams")
+    parser.add_argument("--pid", type=int, help="API worker PID to sample (Linux /proc)")
+    args = parser.parse_args()
+
+    # Each stream is a socket; lift the soft limit as far as the hard one allows
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = args.connections + 100
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        if hard != resource.RLIM_INFINITY:
+            wanted = min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+
+    print(asyncio.run(run(args.url, args.connections, args.hold, args.ramp, args.pid)))
+
+
+if __name__ == "__main__":
+    run_cli()
@@ -0,0 +1,45 @@
+"""Body-hashed ETags and 304s from `ConditionalGetMiddleware`."""
+
+from app.etag import compute_etag, etag_matches
+from app.models import Place
+
+
+def test_matching_if_none_match_is_not_modified(client, db):
+    place = Place(name="Test Place", latitude=40.7, longitude=-74.0, radius=50.0)
+    db.add(place)
+    db.commit()
+    url = f"/places/{place.id}"
+
+    fetched = client.get(url)
+    assert fetched.status_code == 200
+    etag = fetched.headers["ETag"]
+    assert etag == compute_etag(fetched.content)
+
+    not_modified = client.get(url, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+    assert "content-type" not in not_modified.headers
+
+    # Weak and listed validators match too
+    assert client.get(url, headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+
+    place.name = "Renamed Place"
+    db.commit()
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_errors_carry_no_etag(client):
+    missing = client.get("/places/00000000-0000-0000-0000-0000000000ff", headers={"If-None-Match": "*"})
+    assert missing.status_code == 404
+    assert "etag" not in missing.headers
+
+
+def test_etag_matches():
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches('W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
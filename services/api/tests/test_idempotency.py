@@ -0,0 +1,110 @@
+"""`Idempotency-Key`: replay, reuse with a different request, and release on server errors."""
+
+import uuid
+
+import pytest
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, select
+
+from app.idempotency import REPLAYED_HEADER, IdempotencyMiddleware, IdempotentReplay, idempotent, replay_stored_response
+from app.models import IdempotencyKey, UserSettings
+
+from .conftest import TEST_USER_ID
+from .test_me import SETTINGS
+
+
+@pytest.fixture(autouse=True)
+def clean_keys(db, user):
+    db.execute(delete(UserSettings).where(UserSettings.user_id == TEST_USER_ID))
+    db.execute(delete(IdempotencyKey).where(IdempotencyKey.user_id == TEST_USER_ID))
+    db.commit()
+
+
+def _stored(db, key):
+    db.expire_all()
+    return db.execute(
+        select(IdempotencyKey).where(IdempotencyKey.user_id == TEST_USER_ID, IdempotencyKey.key == key)
+    ).scalar_one_or_none()
+
+
+def test_retry_replays_stored_response(client, db):
+    key = str(uuid.uuid4())
+    first = client.put("/me/settings", json=SETTINGS, headers={"Idempotency-Key": key})
+    assert first.status_code == 200
+    assert REPLAYED_HEADER not in first.headers
+    assert _stored(db, key).state == "completed"
+
+    retry = client.put("/me/settings", json=SETTINGS, headers={"Idempotency-Key": key})
+    assert retry.status_code == 200
+    assert retry.headers[REPLAYED_HEADER] == "true"
+    assert retry.content == first.content
+    # Replayed, not re-run: the row was written once
+    assert retry.headers["ETag"] == first.headers["ETag"]
+    assert db.execute(select(UserSettings.version).where(UserSettings.user_id == TEST_USER_ID)).scalar_one() == 1
+
+
+def test_key_reused_with_different_body_is_rejected(client, db):
+    key = str(uuid.uuid4())
+    assert client.put("/me/settings", json=SETTINGS, headers={"Idempotency-Key": key}).status_code == 200
+
+    reused = client.put("/me/settings", json={**SETTINGS, "mapZoomLevel": 3.0}, headers={"Idempotency-Key": key})
+    assert reused.status_code == 422
+    assert client.get("/me/settings").json()["mapZoomLevel"] == 12.0
+
+
+def _idempotent_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(IdempotencyMiddleware)
+    app.add_exception_handler(IdempotentReplay, replay_stored_response)
+    return app
+
+
+def test_server_error_releases_key(engine, db):
+    """A 5xx is not stored, so a retry with the same key runs the handler again."""
+    app = _idempotent_app()
+    calls = []
+
+    @app.post("/flaky", dependencies=[Depends(idempotent)])
+    async def flaky():
+        calls.append(None)
+        if len(calls) == 1:
+            raise HTTPException(status_code=503, detail="Try again")
+        return {"calls": len(calls)}
+
+    test_client = TestClient(app)
+    key = str(uuid.uuid4())
+
+    failed = test_client.post("/flaky", json={}, headers={"Idempotency-Key": key})
+    assert failed.status_code == 503
+    assert _stored(db, key) is None
+
+    retried = test_client.post("/flaky", json={}, headers={"Idempotency-Key": key})
+    assert retried.status_code == 200
+    assert retried.json() == {"calls": 2}
+    assert _stored(db, key).status_code == 200
+
+
+def test_replay_keeps_repeated_headers(engine, db):
+    app = _idempotent_app()
+
+    @app.post("/cookies", dependencies=[Depends(idempotent)])
+    async def cookies():
+        response = JSONResponse({"ok": True})
+        response.set_cookie("a", "1")
+        response.set_cookie("b", "2")
+        response.headers.append("Vary", "Accept")
+        response.headers.append("Vary", "Accept-Language")
+        return response
+
+    test_client = TestClient(app)
+    key = str(uuid.uuid4())
+    first = test_client.post("/cookies", json={}, headers={"Idempotency-Key": key})
+    replayed = test_client.post("/cookies", json={}, headers={"Idempotency-Key": key})
+
+    assert replayed.headers[REPLAYED_HEADER] == "true"
+    for name in ("set-cookie", "vary"):
+        assert replayed.headers.get_list(name) == first.headers.get_list(name)
+    assert len(replayed.headers.get_list("set-cookie")) == 2
+    assert replayed.content == first.content
@@ -0,0 +1,87 @@
+"""`/me` resources: version-derived ETags and optimistic concurrency."""
+
+import uuid
+
+import pytest
+from sqlalchemy import delete, update
+
+from app.database import get_db
+from app.models import IdempotencyKey, UserLogin, UserSettings
+
+from .conftest import TEST_USER_ID
+
+SETTINGS = {
+    "appearanceModeRaw": 1,
+    "mapStyleRaw": 0,
+    "mapCenterLatitude": 40.7,
+    "mapCenterLongitude": -74.0,
+    "mapZoomLevel": 12.0,
+    "updatedAt": "2026-10-19T12:00:00",
+    "idempotencyKey": "unused",
+}
+
+
+@pytest.fixture(autouse=True)
+def clean_me(db, user):
+    for model in (UserSettings, UserLogin):
+        db.execute(delete(model).where(model.user_id == TEST_USER_ID))
+    db.execute(delete(IdempotencyKey).where(IdempotencyKey.user_id == TEST_USER_ID))
+    db.commit()
+
+
+def _put_settings(client, **changes):
+    return client.put(
+        "/me/settings",
+        json={**SETTINGS, **changes},
+        headers={"Idempotency-Key": str(uuid.uuid4())},
+    )
+
+
+def test_settings_etag_follows_version(client):
+    assert client.get("/me/settings").status_code == 404
+
+    created = _put_settings(client)
+    assert created.status_code == 200
+    etag = created.headers["ETag"]
+    assert etag.endswith('-v1"')
+
+    fetched = client.get("/me/settings")
+    assert fetched.headers["ETag"] == etag
+    assert fetched.json()["mapZoomLevel"] == 12.0
+
+    not_modified = client.get("/me/settings", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    updated = _put_settings(client, mapZoomLevel=14.0)
+    assert updated.headers["ETag"].endswith('-v2"')
+    assert client.get("/me/settings", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_stale_version_is_a_conflict(client, session_factory):
+    assert _put_settings(client).status_code == 200
+
+    # The request's session loads version 1, then another writer bumps it
+    stale = session_factory()
+    # Held so the identity map keeps the version-1 instance the route will reuse
+    loaded = stale.query(UserSettings).filter(UserSettings.user_id == TEST_USER_ID).one()
+    assert loaded.version == 1
+    with session_factory() as other:
+        other.execute(
+            update(UserSettings).where(UserSettings.user_id == TEST_USER_ID).values(version=UserSettings.version + 1)
+        )
+        other.commit()
+
+    def stale_db():
+        try:
+            yield stale
+        finally:
+            stale.close()
+
+    client.app.dependency_overrides[get_db] = stale_db
+    response = _put_settings(client, mapZoomLevel=3.0)
+
+    assert response.status_code == 409
+    client.app.dependency_overrides.clear()
+    assert client.get("/me/settings").json()["mapZoomLevel"] == 12.0
+
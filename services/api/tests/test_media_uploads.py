@@ -0,0 +1,88 @@
+"""Upload size limits, and deduplication only of bytes the server has hashed."""
+
+import hashlib
+import os
+import uuid
+
+from app.models import Media, MediaBlob
+from app.routers.media import MAX_CHUNK_BYTES
+
+from .conftest import TEST_USER_ID
+
+
+def test_oversized_content_length_is_rejected(client):
+    response = client.put(
+        f"/media/uploads/{uuid.uuid4()}",
+        content=b"\0" * (MAX_CHUNK_BYTES + 1),
+        headers={"Upload-Offset": "0"},
+    )
+    assert response.status_code == 413
+
+
+def test_oversized_chunked_body_is_rejected(client):
+    def body():
+        for _ in range(MAX_CHUNK_BYTES // (1024 * 1024) + 1):
+            yield b"\0" * (1024 * 1024)
+
+    # A generator body is sent with Transfer-Encoding: chunked and no Content-Length
+    response = client.put(f"/media/uploads/{uuid.uuid4()}", content=body(), headers={"Upload-Offset": "0"})
+    assert response.status_code == 413
+
+
+def _signed_upload(client, data: bytes, **fields):
+    response = client.post(
+        "/media/upload-urls",
+        json={"content_type": "image/png", "size_bytes": len(data), "public_profile_id": str(TEST_USER_ID), **fields},
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+def _put_bytes(client, upload, data: bytes):
+    assert client.put(upload["upload_url"], content=data, headers=upload["headers"]).status_code == 200
+
+
+def _blob(db, content_hash):
+    db.expire_all()
+    return db.get(MediaBlob, content_hash)
+
+
+def test_digest_without_bytes_attaches_nothing(client, db, user):
+    """Knowing the digest of stored content must not yield a media row for it."""
+    data = os.urandom(64)
+    content_hash = hashlib.sha256(data).hexdigest()
+    db.add(MediaBlob(content_hash=content_hash, storage_key="blobs/other.png", url="http://example.com/other.png",
+                     mime_type="image/png", size_bytes=len(data), ref_count=1))
+    db.commit()
+
+    upload = _signed_upload(client, data, sha256=content_hash)
+    # Same answer whether or not the content exists
+    assert upload["upload_required"] is True and upload["upload_url"]
+
+    finalized = client.post(f"/media/upload-urls/{upload['upload_id']}/finalize")
+    assert finalized.status_code == 409
+    assert _blob(db, content_hash).ref_count == 1
+    assert db.query(Media).filter(Media.content_hash == content_hash).count() == 0
+
+
+def test_uploaded_bytes_must_match_declared_digest(client, db, user):
+    data = os.urandom(64)
+    upload = _signed_upload(client, data, sha256=hashlib.sha256(b"something else" + data).hexdigest())
+    _put_bytes(client, upload, data)
+
+    assert client.post(f"/media/upload-urls/{upload['upload_id']}/finalize").status_code == 400
+    assert _blob(db, hashlib.sha256(data).hexdigest()) is None
+
+
+def test_identical_signed_uploads_share_one_blob(client, db, user):
+    data = os.urandom(64)
+    urls = []
+    for _ in range(2):
+        upload = _signed_upload(client, data)
+        _put_bytes(client, upload, data)
+        finalized = client.post(f"/media/upload-urls/{upload['upload_id']}/finalize")
+        assert finalized.status_code == 201
+        urls.append(finalized.json()["url"])
+
+    assert urls[0] == urls[1]
+    assert _blob(db, hashlib.sha256(data).hexdigest()).ref_count == 2
@@ -0,0 +1,55 @@
+"""Rollups and partition routing for `user_notifications`."""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app.models import UserNotification
+from app.services.notification_retention import DEFAULT_PARTITION, ensure_partitions
+from app.services.notification_rollup import record_notification
+
+from .conftest import TEST_USER_ID
+
+
+def _partition_of(db, notification_id):
+    return db.execute(
+        text("SELECT tableoid::regclass::text FROM user_notifications WHERE id = :id"), {"id": notification_id}
+    ).scalar()
+
+
+def test_rollup_keeps_timestamp_and_partition(db, user, make_event):
+    ensure_partitions(db)
+    event = make_event()
+    values = {
+        "user_id": TEST_USER_ID,
+        "type_raw": 10,
+        "event_id": event.id,
+        "event_name": event.name,
+        "title": "Someone joined",
+    }
+
+    first, created = record_notification(db, values)
+    db.commit()
+    assert created
+    timestamp, partition = first.timestamp, _partition_of(db, first.id)
+
+    again, created = record_notification(db, {**values, "user_name": "Sam"})
+    db.commit()
+    db.expire_all()
+    row = db.get(UserNotification, (again.id, again.timestamp))
+
+    assert not created and row.id == first.id
+    assert row.rollup_count == 2
+    assert row.timestamp == timestamp
+    assert row.last_rolled_up_at is not None and row.last_rolled_up_at >= timestamp
+    assert _partition_of(db, row.id) == partition
+
+
+def test_insert_outside_monthly_partitions_lands_in_default(db, user):
+    ensure_partitions(db)
+    far_future = datetime.utcnow() + timedelta(days=5 * 365)
+    notification = UserNotification(user_id=TEST_USER_ID, type_raw=0, title="Later", timestamp=far_future)
+    db.add(notification)
+    db.commit()
+
+    assert _partition_of(db, notification.id) == DEFAULT_PARTITION
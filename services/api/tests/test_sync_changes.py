@@ -0,0 +1,72 @@
+"""Delta sync: watermark round-trips, tombstones and per-user scope."""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import Place
+from app.pagination import decode_watermark, encode_watermark
+from app.services.sync_changes import stream_changes
+
+from .conftest import TEST_USER_ID
+
+# The tests commit before reading, so nothing needs holding back
+NO_LAG = timedelta(0)
+
+
+def _sync(types, since=None):
+    """Run one sync call; returns `(change lines, watermark line)`."""
+    lines = [json.loads(line) for chunk in stream_changes(TEST_USER_ID, types, since or {}, safety_lag=NO_LAG)
+             for line in chunk.splitlines()]
+    return lines[:-1], lines[-1]
+
+
+def _add_place(db, name):
+    place = Place(name=name, latitude=40.7, longitude=-74.0, radius=50.0)
+    db.add(place)
+    db.commit()
+    return place
+
+
+def test_watermark_round_trip():
+    positions = {"places": (datetime(2026, 10, 19, 12, 0, 0, 123456), TEST_USER_ID)}
+    assert decode_watermark(encode_watermark(positions)) == positions
+    with pytest.raises(ValueError):
+        decode_watermark("not-a-watermark")
+
+
+def test_next_call_resumes_after_watermark(db):
+    first = _add_place(db, "Before")
+    changes, mark = _sync(["places"])
+    assert mark["op"] == "watermark" and mark["has_more"] is False
+    assert str(first.id) in {line["data"]["id"] for line in changes}
+
+    second = _add_place(db, "After")
+    changes, _ = _sync(["places"], decode_watermark(mark["watermark"]))
+    assert [(line["op"], line["data"]["id"]) for line in changes] == [("upsert", str(second.id))]
+
+
+def test_soft_delete_is_sent_as_tombstone(db):
+    place = _add_place(db, "Doomed")
+    _, mark = _sync(["places"])
+
+    place.deleted_at = datetime.utcnow()
+    db.commit()
+    changes, _ = _sync(["places"], decode_watermark(mark["watermark"]))
+
+    assert len(changes) == 1
+    tombstone = changes[0]
+    assert tombstone["type"] == "places" and tombstone["op"] == "delete"
+    assert tombstone["id"] == str(place.id)
+    assert "data" not in tombstone and "name" not in tombstone
+
+
+def test_private_events_need_membership(db, user, make_event):
+    public = make_event(name="Discoverable", visibility_raw=1)
+    private = make_event(name="Invite only", visibility_raw=0)
+
+    changes, _ = _sync(["events"])
+    ids = {line["data"]["id"] for line in changes if line["op"] == "upsert"}
+    assert str(public.id) in ids
+    assert str(private.id) not in ids
@@ -0,0 +1,54 @@
+"""The availability cache: pruning, sweeping, and invalidation on commit."""
+
+import time
+
+from app.services import ticket_availability as availability
+from app.services.ticket_availability import TicketAvailabilityCache, ticket_availability
+from app.services.ticket_inventory import sell_one
+
+
+def test_event_index_is_pruned_with_cached_rows(db, make_ticket):
+    cache = TicketAvailabilityCache(ttl_seconds=60)
+    ticket = make_ticket(5)
+
+    cache.get(db, ticket.id)
+    cache.get_event(db, ticket.event_id)
+    assert cache._event_of == {ticket.id: ticket.event_id}
+
+    # Still referenced by the per-ticket entry
+    cache.invalidate_event(ticket.event_id)
+    assert ticket.id in cache._event_of
+
+    cache.get_event(db, ticket.event_id)
+    cache.invalidate(ticket.id)
+    assert cache._event_of == {} and cache._events == {} and cache._entries == {}
+
+
+def test_expired_rows_are_swept(db, make_ticket, monkeypatch):
+    cache = TicketAvailabilityCache(ttl_seconds=0)
+    first, second = make_ticket(5), make_ticket(5)
+    cache.get(db, first.id)
+    cache.get_event(db, first.event_id)
+
+    monkeypatch.setattr(availability, "SWEEP_INTERVAL_SECONDS", 0)
+    time.sleep(0.01)
+    cache.get(db, second.id)
+
+    assert set(cache._entries) == {second.id}
+    assert cache._events == {}
+    assert cache._event_of == {second.id: second.event_id}
+
+
+def test_sale_invalidates_once_committed(session_factory, db, make_ticket):
+    ticket_id = make_ticket(5).id
+    assert ticket_availability.get(db, ticket_id).available == 5
+
+    with session_factory() as session:
+        assert sell_one(session, ticket_id) == 1
+        # Not committed yet: the cached entry still matches what readers can see
+        assert ticket_id in ticket_availability._entries
+        session.commit()
+
+    assert ticket_id not in ticket_availability._entries
+    db.rollback()
+    assert ticket_availability.get(db, ticket_id).available == 4
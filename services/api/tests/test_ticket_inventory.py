@@ -0,0 +1,110 @@
+"""Concurrent purchasers can never oversell a ticket."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.models import Payment, Ticket
+from app.services.ticket_holds import convert_hold, place_hold
+from app.services.ticket_inventory import sell_one
+
+from .conftest import TEST_USER_ID
+
+PURCHASERS = 500
+QUANTITY = 7
+
+
+def _run_at_once(purchase, count=PURCHASERS):
+    """Run `purchase(i)` on `count` threads released together; returns results in order."""
+    start = threading.Event()
+
+    def run(index):
+        start.wait()
+        return purchase(index)
+
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        futures = [pool.submit(run, index) for index in range(count)]
+        start.set()
+        return [future.result() for future in futures]
+
+
+def _assert_invariant(db, ticket_id, sold, held):
+    db.expire_all()
+    ticket = db.get(Ticket, ticket_id)
+    assert (ticket.sold, ticket.held) == (sold, held)
+    assert ticket.sold + ticket.held <= ticket.quantity
+
+
+def test_sell_one_sells_exactly_quantity(session_factory, db, user, make_ticket):
+    ticket_id = make_ticket(QUANTITY).id
+
+    def purchase(_):
+        with session_factory() as session:
+            sold = sell_one(session, ticket_id)
+            session.commit()
+            return sold
+
+    results = _run_at_once(purchase)
+
+    assert sorted(result for result in results if result is not None) == list(range(1, QUANTITY + 1))
+    assert results.count(None) == PURCHASERS - QUANTITY
+    _assert_invariant(db, ticket_id, sold=QUANTITY, held=0)
+
+
+def test_holds_and_direct_sales_share_inventory(session_factory, db, user, make_ticket):
+    """Half the purchasers hold then convert, half buy outright; all race for the same seats."""
+    ticket_id = make_ticket(QUANTITY).id
+
+    def purchase(index):
+        with session_factory() as session:
+            if index % 2:
+                sold = sell_one(session, ticket_id)
+                session.commit()
+                return sold is not None
+
+            payment = Payment(ticket_id=ticket_id, user_id=TEST_USER_ID, amount_cents=1500, status="pending")
+            session.add(payment)
+            session.flush()
+            if place_hold(session, ticket_id, payment.id, TEST_USER_ID) is None:
+                session.rollback()
+                return False
+            session.commit()
+
+            assert convert_hold(session, payment.id)
+            session.commit()
+            return True
+
+    results = _run_at_once(purchase)
+
+    assert results.count(True) == QUANTITY
+    assert results.count(False) == PURCHASERS - QUANTITY
+    _assert_invariant(db, ticket_id, sold=QUANTITY, held=0)
+
+
+def test_holds_alone_never_exceed_quantity(session_factory, db, user, make_ticket):
+    ticket_id = make_ticket(QUANTITY).id
+
+    def hold(_):
+        with session_factory() as session:
+            payment = Payment(ticket_id=ticket_id, user_id=TEST_USER_ID, amount_cents=1500, status="pending")
+            session.add(payment)
+            session.flush()
+            placed = place_hold(session, ticket_id, payment.id, TEST_USER_ID)
+            if placed is None:
+                session.rollback()
+                return None
+            session.commit()
+            return payment.id
+
+    results = _run_at_once(hold)
+
+    held = [payment_id for payment_id in results if payment_id is not None]
+    assert len(held) == QUANTITY
+    _assert_invariant(db, ticket_id, sold=0, held=QUANTITY)
+
+    # Every hold converts, and nothing else can be sold while they were held
+    with session_factory() as session:
+        assert sell_one(session, ticket_id) is None
+        for payment_id in held:
+            assert convert_hold(session, payment_id)
+        session.commit()
+    _assert_invariant(db, ticket_id, sold=QUANTITY, held=0)